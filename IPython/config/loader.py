@@ -19,11 +19,15 @@ Authors
 #-----------------------------------------------------------------------------
 
 import builtins
+import hashlib
+import os
+import pickle
 import re
 import sys
+import time
 
 from IPython.external import argparse
-from IPython.utils.path import filefind, get_ipython_dir
+from IPython.utils.path import filefind, filefind_paths, get_ipython_dir
 
 #-----------------------------------------------------------------------------
 # Exceptions
@@ -119,6 +123,10 @@ class Config(dict):
         import copy
         return type(self)(copy.deepcopy(list(self.items())))
 
+    def __reduce__(self):
+        # The default would pickle __dict__, which is the Config itself
+        return type(self), (dict(self),)
+
     def __getitem__(self, key):
         # We cannot use directly self._is_section_key, because it triggers
         # infinite recursion on top of PyPy. Instead, we manually fish the
@@ -253,6 +261,9 @@ class PyFileConfigLoader(FileConfigLoader):
         self.path = path
         self.full_filename = ''
         self.data = None
+        # (path, file_signature(path)) pairs for the paths where the config
+        # file and its sub-configs were looked for, before they were read.
+        self.dependencies = []
 
     def load_config(self):
         """Load the config from a file and return it as a Struct."""
@@ -264,6 +275,8 @@ class PyFileConfigLoader(FileConfigLoader):
 
     def _find_file(self):
         """Try to find the file by searching the paths."""
+        self.dependencies.extend((path, file_signature(path)) for path in
+                                 filefind_paths(self.filename, self.path))
         self.full_filename = filefind(self.filename, self.path)
 
     def _read_file_as_dict(self):
@@ -302,6 +315,8 @@ class PyFileConfigLoader(FileConfigLoader):
                 pass
             else:
                 self.config._merge(sub_config)
+            finally:
+                self.dependencies.extend(loader.dependencies)
         
         # Again, this needs to be a closure and should be used in config
         # files to get the config being loaded.
@@ -319,6 +334,92 @@ class PyFileConfigLoader(FileConfigLoader):
             ConfigLoaderError('self.data does not exist')
 
 
+def file_signature(path):
+    """Return the modification time and size of a file, or None if it doesn't
+    exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+class ConfigCache(object):
+    """A cache of a configuration loaded from config files, in a pickle file.
+
+    Parameters
+    ----------
+    location : str
+      The directory of the cache files.
+    key : object with a stable repr
+      What the configuration depends on besides the content of the files,
+      e.g. the names of the config files and the command line.  Each key has
+      its own cache file in `location`.
+
+    The configuration is saved with the signatures (modification time and
+    size) of the files it was loaded from, and of those which could have
+    been loaded instead, as returned by :attr:`PyFileConfigLoader.dependencies`.
+    It is only loaded back while they are all unchanged.  Any error reading
+    or writing the cache is ignored: the config files are then loaded as
+    usual.
+    """
+
+    # Files modified less than this many seconds before they were read are
+    # not cached: a change in the same tick of the clock would go unnoticed.
+    min_age = 2.0
+
+    def __init__(self, location, key):
+        self.location = location
+        self.key = key
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        self.filename = os.path.join(location, 'config-%s.pickle' % digest)
+
+    def load(self):
+        """Return the cached config, or None if there is none, or it is
+        stale."""
+        try:
+            with open(self.filename, 'rb') as f:
+                key, dependencies, config = pickle.load(f)
+        except Exception:
+            # missing, corrupt, or written by another version
+            return None
+        if key != self.key:
+            return None
+        for path, signature in dependencies:
+            if file_signature(path) != signature:
+                return None
+        return config
+
+    def save(self, config, dependencies):
+        """Save config, loaded from the given dependencies, and return whether
+        it was cached."""
+        now = time.time()
+        if any(sig is not None and now - sig[0] < self.min_age
+               for path, sig in dependencies):
+            return False
+        tmpname = '%s.%i.tmp' % (self.filename, os.getpid())
+        try:
+            data = pickle.dumps((self.key, dependencies, config),
+                                pickle.HIGHEST_PROTOCOL)
+            if not os.path.isdir(self.location):
+                os.makedirs(self.location)
+            with open(tmpname, 'wb') as f:
+                f.write(data)
+            try:
+                # atomic, so that concurrent processes never read a partial file
+                os.rename(tmpname, self.filename)
+            except OSError:
+                # Windows doesn't replace existing files
+                os.remove(self.filename)
+                os.rename(tmpname, self.filename)
+        except Exception:
+            # e.g. a config value which can't be pickled
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            return False
+        return True
+
+
 class CommandLineConfigLoader(ConfigLoader):
     """A config loader for command line arguments.
 
@@ -21,13 +21,17 @@ Authors:
 #-----------------------------------------------------------------------------
 
 import os
-from tempfile import mkstemp
+import pickle
+import shutil
+import time
+from tempfile import mkdtemp, mkstemp
 from unittest import TestCase
 
 from IPython.utils.traitlets import Int, Unicode
 from IPython.config.configurable import Configurable
 from IPython.config.loader import (
     Config,
+    ConfigCache,
     PyFileConfigLoader,
     KeyValueConfigLoader,
     ArgParseConfigLoader,
@@ -64,6 +68,70 @@ class TestPyFileCL(TestCase):
         self.assertEquals(config.Foo.Bam.value, list(range(10)))
         self.assertEquals(config.D.C.value, 'hi there')
 
+
+class TestConfigCache(TestCase):
+
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        self.fname = os.path.join(self.tmpdir, 'test_config.py')
+        self.write(pyfile + "load_subconfig('sub_config.py')\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text, fname='test_config.py', age=10):
+        fname = os.path.join(self.tmpdir, fname)
+        with open(fname, 'w') as f:
+            f.write(text)
+        # older than the files too recent to be cached
+        t = time.time() - age
+        os.utime(fname, (t, t))
+
+    def load(self):
+        cl = PyFileConfigLoader('test_config.py', self.tmpdir)
+        return cl.load_config(), cl.dependencies
+
+    def test_cache(self):
+        config, deps = self.load()
+        self.assertEquals([path for path, sig in deps], [self.fname,
+                          os.path.join(self.tmpdir, 'sub_config.py')])
+        cache = ConfigCache(os.path.join(self.tmpdir, 'cache'), ('a', 1))
+        self.assertEquals(cache.load(), None)
+        self.assertTrue(cache.save(config, deps))
+        cached = cache.load()
+        self.assertEquals(cached, config)
+        self.assertEquals(cached.Foo.Bam.value, list(range(10)))
+        self.assertTrue(isinstance(cached.Foo, Config))
+        # another key
+        cache2 = ConfigCache(cache.location, ('a', 2))
+        self.assertEquals(cache2.load(), None)
+
+    def test_stale(self):
+        cache = ConfigCache(self.tmpdir, 'key')
+        cache.save(*self.load())
+        # a sub-config appears
+        self.write('c = get_config()\nc.a = 30\n', 'sub_config.py')
+        self.assertEquals(cache.load(), None)
+        config, deps = self.load()
+        self.assertEquals(config.a, 30)
+        cache.save(config, deps)
+        self.assertEquals(cache.load().a, 30)
+        # the config changes
+        self.write('c = get_config()\nc.b = 1\n', age=5)
+        self.assertEquals(cache.load(), None)
+
+    def test_recent(self):
+        """Files modified just before they were read are not cached"""
+        self.write(pyfile, age=0)
+        cache = ConfigCache(self.tmpdir, 'key')
+        self.assertFalse(cache.save(*self.load()))
+        self.assertEquals(cache.load(), None)
+
+    def test_pickle(self):
+        config = self.load()[0]
+        self.assertEquals(pickle.loads(pickle.dumps(config)), config)
+
+
 class MyLoader1(ArgParseConfigLoader):
     def _add_arguments(self):
         p = self.parser
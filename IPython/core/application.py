@@ -27,6 +27,7 @@ Authors:
 # Imports
 #-----------------------------------------------------------------------------
 
+import copy
 import logging
 import os
 import shutil
@@ -34,7 +35,7 @@ import sys
 
 from IPython.config.application import Application
 from IPython.config.configurable import Configurable
-from IPython.config.loader import Config
+from IPython.config.loader import Config, ConfigCache, PyFileConfigLoader
 from IPython.core import release, crashhandler
 from IPython.core.profiledir import ProfileDir, ProfileDirError
 from IPython.utils.path import get_ipython_dir, get_ipython_package_dir
@@ -65,7 +66,10 @@ base_flags = dict(
     init = ({'BaseIPythonApplication' : {
                     'copy_config_files' : True,
                     'auto_create' : True}
-            }, "Initialize profile with default config files")
+            }, "Initialize profile with default config files"),
+    cache_config = ({'BaseIPythonApplication' : {'cache_config' : True}},
+            "Reuse the config loaded from the config files while they are "
+            "unchanged, instead of running them again."),
 )
 
 
@@ -115,6 +119,19 @@ class BaseIPythonApplication(Application):
         """
     )
     
+    cache_config = Bool(False, config=True,
+        help="""
+        Cache the configuration loaded from the config files in the profile
+        directory, and reuse it instead of running them again while they are
+        unchanged, and the command line is the same.  This speeds up starting
+        many processes with one profile, e.g. engines.  As the config files
+        don't run when the cache is used, don't enable this if they have
+        side effects besides setting the configuration.  Whether to use the
+        cache is decided before the config files are loaded, so give this
+        on the command line (--cache-config): setting it in a config file
+        doesn't make that file cached.
+        """
+    )
     overwrite = Bool(False, config=True,
         help="""Whether to overwrite existing config files when copying""")
     auto_create = Bool(False, config=True,
@@ -167,41 +184,69 @@ class BaseIPythonApplication(Application):
         By default, errors in loading config are handled, and a warning
         printed on screen. For testing, the suppress_errors option is set
         to False, so errors will make tests fail.
+
+        With cache_config, the config is loaded from the cache in the profile
+        directory if it is up to date, and saved there otherwise.
         """
+        # The config files may turn caching on, so decide before loading them
+        use_cache = self.cache_config
+        cache = self.config_cache() if use_cache else None
+        if use_cache:
+            config = cache.load()
+            if config is not None:
+                self.log.debug("Loaded config from cache: %s" %
+                               cache.filename)
+                self.update_config(config)
+                return
+        # The config of the files, and what it depends on, for the cache
+        file_config = Config()
+        dependencies = []
+        def load(filename):
+            loader = PyFileConfigLoader(filename, path=self.config_file_paths)
+            try:
+                config = loader.load_config()
+            finally:
+                dependencies.extend(loader.dependencies)
+            file_config._merge(copy.deepcopy(config))
+            self.update_config(config)
+
         base_config = 'ipython_config.py'
         self.log.debug("Attempting to load config file: %s" %
                        base_config)
         try:
-            Application.load_config_file(
-                self,
-                base_config, 
-                path=self.config_file_paths
-            )
+            load(base_config)
         except IOError:
             # ignore errors loading parent
             pass
-        if self.config_file_name == base_config:
-            # don't load secondary config
-            return
-        self.log.debug("Attempting to load config file: %s" %
-                       self.config_file_name)
-        try:
-            Application.load_config_file(
-                self,
-                self.config_file_name, 
-                path=self.config_file_paths
-            )
-        except IOError:
-            # Only warn if the default config file was NOT being used.
-            if self.config_file_specified:
-                self.log.warn("Config file not found, skipping: %s" %
-                               self.config_file_name)
-        except:
-            # For testing purposes.
-            if not suppress_errors:
-                raise
-            self.log.warn("Error loading config file: %s" %
-                          self.config_file_name, exc_info=True)
+        if self.config_file_name != base_config:
+            # load secondary config
+            self.log.debug("Attempting to load config file: %s" %
+                           self.config_file_name)
+            try:
+                load(self.config_file_name)
+            except IOError:
+                # Only warn if the default config file was NOT being used.
+                if self.config_file_specified:
+                    self.log.warn("Config file not found, skipping: %s" %
+                                   self.config_file_name)
+            except:
+                # For testing purposes.
+                if not suppress_errors:
+                    raise
+                self.log.warn("Error loading config file: %s" %
+                              self.config_file_name, exc_info=True)
+                # Don't cache a broken config
+                return
+        if use_cache and cache.save(file_config, dependencies):
+            self.log.debug("Saved config to cache: %s" % cache.filename)
+
+    def config_cache(self):
+        """Return the :class:`ConfigCache` of the config files, which depends
+        on their names and search path, and on the command line."""
+        key = (self.name, self.config_file_name, list(self.config_file_paths),
+               list(sys.argv), release.version, sys.version)
+        location = os.path.join(self.profile_dir.location, 'config_cache')
+        return ConfigCache(location, key)
 
     def init_profile_dir(self):
         """initialize the profile dir"""
@@ -31,7 +31,9 @@ Authors
 import codeop
 import hashlib
 import linecache
-import time
+import types
+import weakref
+from collections import OrderedDict
 
 #-----------------------------------------------------------------------------
 # Local utilities
@@ -48,16 +50,66 @@ def code_name(code, number=0):
     # even with truncated hashes, and the full one makes tracebacks too long
     return '<ipython-input-{0}-{1}>'.format(number, hash_digest[:12])
 
+
+def rename_code(code, filename):
+    """Return a copy of a code object, and of the code objects nested in it,
+    with their filename set to `filename`."""
+    if code.co_filename == filename:
+        return code
+    consts = tuple(rename_code(c, filename) if isinstance(c, types.CodeType)
+                   else c for c in code.co_consts)
+    if hasattr(code, 'replace'):
+        # Python 3.8+, whose CodeType constructor takes more arguments
+        return code.replace(co_filename=filename, co_consts=consts)
+    return types.CodeType(code.co_argcount, code.co_kwonlyargcount,
+                          code.co_nlocals, code.co_stacksize, code.co_flags,
+                          code.co_code, consts, code.co_names,
+                          code.co_varnames, filename, code.co_name,
+                          code.co_firstlineno, code.co_lnotab,
+                          code.co_freevars, code.co_cellvars)
+
+
+def iter_code(code):
+    """Yield a code object and all the code objects nested in it."""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            for c in iter_code(const):
+                yield c
+
 #-----------------------------------------------------------------------------
 # Classes and functions
 #-----------------------------------------------------------------------------
 
 class CachingCompiler(codeop.Compile):
     """A compiler that caches code compiled from interactive statements.
+
+    Besides registering the source of each cell with linecache (see
+    :meth:`cache`), it keeps the code objects compiled for recent cells, keyed
+    on the cell source and the compiler flags in effect, so that running the
+    same cell again needs neither parsing nor compiling (see
+    :meth:`get_cell_code` and :meth:`store_cell_code`).
+
+    The linecache registry is bounded too: only the sources of the most recent
+    cells are kept, plus those of older cells whose code is still alive (e.g.
+    a function defined in the cell, or a frame in a saved traceback), so that
+    tracebacks keep showing their source.
     """
 
+    # Maximum number of cells whose code objects are kept.
+    code_cache_size = 200
+
+    # Number of cell sources kept in linecache, not counting the cells whose
+    # code is still referenced.
+    linecache_size = 1000
+
     def __init__(self):
         codeop.Compile.__init__(self)
+        # Map of (source, flags) -> list of code objects, least recently used
+        # first, and its statistics.
+        self.code_cache = OrderedDict()
+        self.code_cache_hits = 0
+        self.code_cache_misses = 0
         
         # This is ugly, but it must be done this way to allow multiple
         # simultaneous ipython instances to coexist.  Since Python itself
@@ -69,8 +121,17 @@ class CachingCompiler(codeop.Compile):
         # separate caches (one in each CachingCompiler instance), any call made
         # by Python itself to linecache.checkcache() would obliterate the
         # cached data from the other IPython instances.
-        if not hasattr(linecache, '_ipython_cache'):
-            linecache._ipython_cache = {}
+        #
+        # The IPython cache is ordered from oldest to newest, and the weak
+        # references to the code objects compiled from each entry (see
+        # _ipython_code_refs) are also shared, so that any instance can tell
+        # which entries may be evicted.
+        if not isinstance(getattr(linecache, '_ipython_cache', None),
+                          OrderedDict):
+            linecache._ipython_cache = OrderedDict(
+                getattr(linecache, '_ipython_cache', {}))
+        if not hasattr(linecache, '_ipython_code_refs'):
+            linecache._ipython_code_refs = {}
         if not hasattr(linecache, '_checkcache_ori'):
             linecache._checkcache_ori = linecache.checkcache
         # Now, we must monkeypatch the linecache directly so that parts of the
@@ -101,17 +162,122 @@ class CachingCompiler(codeop.Compile):
         argument to compilation, so that tracebacks are correctly hooked up.
         """
         name = code_name(code, number)
-        entry = (len(code), time.time(),
+        # A mtime of None tells linecache.checkcache() that the entry has no
+        # file on disk to be checked against, so it is left alone.
+        entry = (len(code), None,
                  [line+'\n' for line in code.splitlines()], name)
         linecache.cache[name] = entry
-        linecache._ipython_cache[name] = entry
+        registry = linecache._ipython_cache
+        registry.pop(name, None)
+        registry[name] = entry
+        self.evict_linecache()
         return name
 
+    def __call__(self, source, filename, symbol, **kwargs):
+        code = codeop.Compile.__call__(self, source, filename, symbol,
+                                       **kwargs)
+        self.track_code(code)
+        return code
+
+    def track_code(self, code):
+        """Keep the source of a cached cell in linecache as long as `code`,
+        or any code object nested in it, is alive."""
+        refs = linecache._ipython_code_refs
+        if code.co_filename not in linecache._ipython_cache:
+            return
+        refs.setdefault(code.co_filename, []).extend(
+            weakref.ref(c) for c in iter_code(code))
+
+    def _code_alive(self, name):
+        """Whether code compiled from the cached cell `name` is alive."""
+        refs = linecache._ipython_code_refs
+        alive = [r for r in refs.get(name, ()) if r() is not None]
+        if alive:
+            refs[name] = alive
+        else:
+            refs.pop(name, None)
+        return bool(alive)
+
+    def evict_linecache(self):
+        """Drop the oldest cell sources from linecache, beyond the
+        `linecache_size` most recent ones, whose code is no longer alive."""
+        registry = linecache._ipython_cache
+        # Entries still in use are moved to the end, so each one is checked
+        # at most once per call, and never the newest (just cached) one.
+        to_check = len(registry) - 1
+        while len(registry) > self.linecache_size and to_check > 0:
+            to_check -= 1
+            name = next(iter(registry))
+            if self._code_alive(name):
+                registry.move_to_end(name)
+            else:
+                del registry[name]
+                linecache.cache.pop(name, None)
+
+    def get_cell_code(self, source, cell_name):
+        """Return the code objects previously compiled for a cell, or None.
+
+        The code objects are only reused if they were compiled with the
+        current compiler flags.  They are renamed to `cell_name`, and the
+        __future__ features they enable are enabled, exactly as if they had
+        just been compiled.
+        """
+        key = (source, self.flags)
+        codes = self.code_cache.get(key)
+        if codes is None:
+            self.code_cache_misses += 1
+            return None
+        self.code_cache_hits += 1
+        # Mark as most recently used
+        del self.code_cache[key]
+        self.code_cache[key] = codes
+        for code in codes:
+            for feature in codeop._features:
+                if code.co_flags & feature.compiler_flag:
+                    self.flags |= feature.compiler_flag
+        codes = [rename_code(code, cell_name) for code in codes]
+        for code in codes:
+            self.track_code(code)
+        return codes
+
+    def store_cell_code(self, source, flags, codes):
+        """Remember the code objects compiled for a cell.
+
+        Parameters
+        ----------
+        source : str
+          The (transformed) source of the cell.
+        flags : int
+          The compiler flags in effect *before* the cell was compiled.
+        codes : list
+          The code objects the cell was compiled to, in execution order.
+        """
+        if self.code_cache_size <= 0:
+            return
+        self.code_cache[(source, flags)] = list(codes)
+        while len(self.code_cache) > self.code_cache_size:
+            self.code_cache.popitem(last=False)
+
+    def clear_code_cache(self):
+        """Forget all the compiled cells, and reset the statistics."""
+        self.code_cache.clear()
+        self.code_cache_hits = self.code_cache_misses = 0
+
     def check_cache(self, *args):
         """Call linecache.checkcache() safely protecting our cached values.
         """
         # First call the orignal checkcache as intended
         linecache._checkcache_ori(*args)
-        # Then, update back the cache with our data, so that tracebacks related
-        # to our compiled codes can be produced.
-        linecache.cache.update(linecache._ipython_cache)
+        # Then, put back whatever of our data it dropped, so that tracebacks
+        # related to our compiled codes can be produced.  Our entries have no
+        # mtime, so checkcache() itself keeps them; they only go away with
+        # linecache.clearcache() (or an older linecache), which drops the
+        # newest one as well.
+        registry = linecache._ipython_cache
+        cache = linecache.cache
+        filename = args[0] if args else None
+        if filename is not None:
+            if filename in registry and filename not in cache:
+                cache[filename] = registry[filename]
+        elif registry and next(reversed(registry)) not in cache:
+            cache.update(registry)
@@ -68,6 +68,7 @@ used, and this module (and the readline module) are silently inactive.
 # Imports
 #-----------------------------------------------------------------------------
 
+import bisect
 import builtins
 import __main__
 import glob
@@ -93,6 +94,9 @@ from IPython.utils.process import arg_split
 # Public API
 __all__ = ['Completer','IPCompleter']
 
+# The keywords, as a namespace for NameIndex
+_keywords = dict.fromkeys(keyword.kwlist)
+
 if sys.platform == 'win32':
     PROTECTABLES = ' '
 else:
@@ -212,6 +216,50 @@ def single_dir_expand(matches):
 class Bunch(object): pass
 
 
+class NameIndex(object):
+    """A sorted list of the names defined in a namespace, for fast prefix
+    searches.
+
+    The index is brought up to date incrementally, from the names added to and
+    removed from the namespace since it was last used.  Finding these still
+    takes a pass over the namespace, but no sorting.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.names = []
+        self._keys = set()
+
+    def update(self):
+        """Bring the index up to date with its namespace."""
+        # Copied at once, as other threads may change the namespace meanwhile
+        # (e.g. code running while the kernel's control thread completes)
+        keys = set(self.namespace)
+        if keys == self._keys:
+            return
+        added = keys - self._keys
+        removed = self._keys - keys
+        names = self.names
+        if len(added) + len(removed) > len(names) // 4:
+            self._keys = keys
+            self.names = sorted(k for k in keys if isinstance(k, str))
+            return
+        for name in removed:
+            if isinstance(name, str):
+                del names[bisect.bisect_left(names, name)]
+        for name in added:
+            if isinstance(name, str):
+                bisect.insort(names, name)
+        self._keys = keys
+
+    def matches(self, text):
+        """Return the sorted list of the names starting with `text`."""
+        names = self.names
+        # No identifier contains the last unicode character
+        return names[bisect.bisect_left(names, text):
+                     bisect.bisect_left(names, text + '\U0010ffff')]
+
+
 class CompletionSplitter(object):
     """An object to split an input line in a manner similar to readline.
 
@@ -296,6 +344,9 @@ class Completer(object):
         else:
             self.global_namespace = global_namespace
 
+        # NameIndex instances for the namespaces searched by global_matches
+        self._name_indexes = {}
+
     def complete(self, text, state):
         """Return the next possible completion for 'text'.
 
@@ -324,18 +375,27 @@ class Completer(object):
 
         """
         #print 'Completer->global_matches, txt=%r' % text # dbg
+        # The namespaces are diffed against their index on each call.
+        namespaces = [('keywords', _keywords),
+                      ('builtins', builtins.__dict__),
+                      ('namespace', self.namespace)]
+        if self.global_namespace is not self.namespace:
+            namespaces.append(('global', self.global_namespace))
         matches = []
-        match_append = matches.append
-        n = len(text)
-        for lst in [keyword.kwlist,
-                    list(builtins.__dict__.keys()),
-                    list(self.namespace.keys()),
-                    list(self.global_namespace.keys())]:
-            for word in lst:
-                if word[:n] == text and word != "__builtins__":
-                    match_append(word)
+        for name, namespace in namespaces:
+            matches.extend(self.name_index(name, namespace).matches(text))
+        if "__builtins__".startswith(text):
+            matches = [word for word in matches if word != "__builtins__"]
         return matches
 
+    def name_index(self, name, namespace):
+        """Return the up to date NameIndex for one of the namespaces."""
+        index = self._name_indexes.get(name)
+        if index is None or index.namespace is not namespace:
+            index = self._name_indexes[name] = NameIndex(namespace)
+        index.update()
+        return index
+
     def attr_matches(self, text):
         """Compute matches when text contains a dot.
 
@@ -803,7 +863,9 @@ class IPCompleter(Completer):
         # different types of objects.  The rlcomplete() method could then
         # simply collapse the dict into a list for readline, but we'd have
         # richer completion semantics in other evironments.
-        self.matches = sorted(set(self.matches))
+        # The matchers mostly return sorted runs of names, which sort quickly:
+        # sort first, then drop the duplicates.
+        self.matches = [m for m, _ in itertools.groupby(sorted(self.matches))]
         #io.rprint('COMP TEXT, MATCHES: %r, %r' % (text, self.matches)) # dbg
         return text, self.matches
 
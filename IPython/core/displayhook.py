@@ -23,6 +23,9 @@ Authors:
 #-----------------------------------------------------------------------------
 
 import builtins
+import sys
+from collections import OrderedDict
+from itertools import islice
 
 from IPython.config.configurable import Configurable
 from IPython.core import prompts
@@ -30,6 +33,37 @@ from IPython.utils import io
 from IPython.utils.traitlets import Instance, List
 from IPython.utils.warn import warn
 
+#-----------------------------------------------------------------------------
+# Utilities
+#-----------------------------------------------------------------------------
+
+def estimate_size(obj, sample=100):
+    """Return a cheap estimate of the memory held by obj, in bytes.
+
+    Objects exposing an integer ``nbytes`` (e.g. numpy arrays) report their
+    data buffer.  For builtin containers, the size of up to `sample` items is
+    extrapolated to the whole container; items are not recursed into.
+    """
+    try:
+        size = sys.getsizeof(obj, 0)
+    except Exception:
+        # Some objects have broken __sizeof__ implementations.
+        size = 0
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return size + nbytes
+    if isinstance(obj, dict):
+        items = [x for kv in islice(obj.items(), sample) for x in kv]
+        n = 2 * len(obj)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(islice(obj, sample))
+        n = len(obj)
+    else:
+        return size
+    if items:
+        size += sum(sys.getsizeof(x, 0) for x in items) * n // len(items)
+    return size
+
 #-----------------------------------------------------------------------------
 # Main displayhook class
 #-----------------------------------------------------------------------------
@@ -59,7 +93,7 @@ class DisplayHook(Configurable):
                  colors='NoColor', input_sep='\n',
                  output_sep='\n', output_sep2='',
                  ps1 = None, ps2 = None, ps_out = None, pad_left=True,
-                 config=None):
+                 config=None, cache_max_bytes=0):
         super(DisplayHook, self).__init__(shell=shell, config=config)
 
         cache_size_min = 3
@@ -75,6 +109,10 @@ class DisplayHook(Configurable):
             self.do_full_cache = 1
 
         self.cache_size = cache_size
+        self.cache_max_bytes = cache_max_bytes
+        # Estimated size of each cached output, oldest first, and their sum.
+        self.cache_sizes = OrderedDict()
+        self.cache_bytes = 0
         self.input_sep = input_sep
 
         # we need a reference to the user-level namespace
@@ -250,14 +288,12 @@ class DisplayHook(Configurable):
 
         # Avoid recursive reference when displaying _oh/Out
         if result is not self.shell.user_ns['_oh']:
-            if len(self.shell.user_ns['_oh']) >= self.cache_size and self.do_full_cache:
-                warn('Output cache limit (currently '+
-                      repr(self.cache_size)+' entries) hit.\n'
-                     'Flushing cache and resetting history counter...\n'
-                     'The only history variables available will be _,__,___ and _1\n'
-                     'with the current result.')
-
-                self.flush()
+            if self.do_full_cache:
+                # The displayhook may run more than once for a prompt: drop
+                # the previous output's size from the total.
+                self.cache_bytes -= self.cache_sizes.pop(self.prompt_count, 0)
+                size = estimate_size(result)
+                self.cull_cache(size)
             # Don't overwrite '_' and friends if '_' is in builtins (otherwise
             # we cause buggy behavior for things like gettext).
 
@@ -276,6 +312,42 @@ class DisplayHook(Configurable):
                 to_main[new_result] = result
                 self.shell.user_ns.update(to_main)
                 self.shell.user_ns['_oh'][self.prompt_count] = result
+                self.cache_sizes[self.prompt_count] = size
+                self.cache_bytes += size
+
+    def cull_cache(self, incoming=0):
+        """Evict the oldest cached outputs until there is room for one more
+        entry of `incoming` estimated bytes.
+
+        The eviction order is that of the outputs' creation (FIFO), not that
+        of their last use: _N variables are plain names in the user
+        namespace, whose reads can't be tracked, and tracking only the reads
+        through Out/_oh would make the order depend on how an output is
+        accessed.
+
+        Evicted outputs lose their _N variable, their Out/_oh entry and their
+        text repr in the history manager; _, __ and ___ are left alone.  With
+        db_log_output, the repr of an output has already been queued for the
+        database by store_output() when its cell finished, so it's kept there.
+        """
+        oh = self.shell.user_ns['_oh']
+        reprs = self.shell.history_manager.output_hist_reprs
+        max_bytes = self.cache_max_bytes
+        sizes = self.cache_sizes
+        while sizes and (len(sizes) >= self.cache_size or
+                         (max_bytes and self.cache_bytes + incoming > max_bytes)):
+            n, size = sizes.popitem(last=False)
+            self.cache_bytes -= size
+            oh.pop(n, None)
+            reprs.pop(n, None)
+            self.shell.user_ns.pop('_%i' % n, None)
+
+    def cache_info(self):
+        """Return a list of (prompt number, type name, estimated bytes) for
+        the cached outputs, oldest first."""
+        oh = self.shell.user_ns['_oh']
+        return [(n, type(oh[n]).__name__, size)
+                for n, size in self.cache_sizes.items() if n in oh]
 
     def log_output(self, format_dict):
         """Log the output."""
@@ -317,6 +389,8 @@ class DisplayHook(Configurable):
                 del self.shell.user_ns[key]
             except: pass
         self.shell.user_ns['_oh'].clear()
+        self.cache_sizes.clear()
+        self.cache_bytes = 0
         
         # Release our own references to objects:
         self._, self.__, self.___ = '', '', ''
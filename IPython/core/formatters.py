@@ -28,7 +28,8 @@ from io import StringIO
 # Our own imports
 from IPython.config.configurable import Configurable
 from IPython.lib import pretty
-from IPython.utils.traitlets import Bool, Dict, Int, Unicode, CUnicode, ObjectName
+from IPython.utils.traitlets import (Bool, Dict, Int, List, Unicode,
+                                     CUnicode, ObjectName)
 
 
 #-----------------------------------------------------------------------------
@@ -41,6 +42,13 @@ class DisplayFormatter(Configurable):
     # When set to true only the default plain text formatter will be used.
     plain_text_only = Bool(False, config=True)
 
+    # The format types (MIME types) computed by format() when it is not given
+    # an explicit include list.  An empty list means all of them.  Frontends
+    # that can only show some types set this, so that the other (possibly
+    # expensive) representations are never computed.  text/plain is always
+    # computed.
+    active_types = List(config=True)
+
     # A dict of formatter whose keys are format types (MIME types) and whose
     # values are subclasses of BaseFormatter.
     formatters = Dict(config=True)
@@ -64,7 +72,8 @@ class DisplayFormatter(Configurable):
     def format(self, obj, include=None, exclude=None):
         """Return a format data dict for an object.
 
-        By default all format types will be computed.
+        By default all format types listed in :attr:`active_types` (or all
+        format types, if it is empty) will be computed.
 
         The following MIME types are currently implemented:
 
@@ -82,7 +91,7 @@ class DisplayFormatter(Configurable):
         include : list or tuple, optional
             A list of format type strings (MIME types) to include in the
             format data dict. If this is set *only* the format types included
-            in this list will be computed.
+            in this list will be computed, regardless of :attr:`active_types`.
         exclude : list or tuple, optional
             A list of format type string (MIME types) to exclue in the format
             data dict. If this is set all format types will be computed,
@@ -111,10 +120,16 @@ class DisplayFormatter(Configurable):
                 format_dict['text/plain'] = data
             return format_dict
 
-        for format_type, formatter in list(self.formatters.items()):
-            if include is not None:
-                if format_type not in include:
-                    continue
+        if include is None and self.active_types:
+            include = ['text/plain'] + list(self.active_types)
+        if include is not None:
+            formatters = [(t, self.formatters[t]) for t in include
+                          if t in self.formatters]
+        else:
+            formatters = list(self.formatters.items())
+        for format_type, formatter in formatters:
+            if format_type in format_dict:
+                continue
             if exclude is not None:
                 if format_type in exclude:
                     continue
@@ -214,6 +229,16 @@ class BaseFormatter(Configurable):
     def _deferred_printers_default(self):
         return {}
 
+    def _type_printers_changed(self):
+        self.clear_type_cache()
+
+    def _deferred_printers_changed(self):
+        self.clear_type_cache()
+
+    def __init__(self, **kwargs):
+        super(BaseFormatter, self).__init__(**kwargs)
+        self.clear_type_cache()
+
     def __call__(self, obj):
         """Compute the format for an object."""
         if self.enabled:
@@ -228,13 +253,9 @@ class BaseFormatter(Configurable):
                 else:
                     return printer(obj)
                 # Next look for type_printers.
-                for cls in pretty._get_mro(obj_class):
-                    if cls in self.type_printers:
-                        return self.type_printers[cls](obj)
-                    else:
-                        printer = self._in_deferred_types(cls)
-                        if printer is not None:
-                            return printer(obj)
+                printer = self._type_printer(obj_class)
+                if printer is not None:
+                    return printer(obj)
                 # Finally look for special method names.
                 if hasattr(obj_class, self.print_method):
                     printer = getattr(obj_class, self.print_method)
@@ -264,6 +285,7 @@ class BaseFormatter(Configurable):
             # To support easy restoration of old printers, we need to ignore
             # Nones.
             self.type_printers[typ] = func
+            self.clear_type_cache()
         return oldfunc
 
     def for_type_by_name(self, type_module, type_name, func):
@@ -290,8 +312,42 @@ class BaseFormatter(Configurable):
             # To support easy restoration of old printers, we need to ignore
             # Nones.
             self.deferred_printers[key] = func
+            self.clear_type_cache()
         return oldfunc
 
+    def clear_type_cache(self):
+        """Forget the printer found for each class.
+
+        :meth:`for_type` and :meth:`for_type_by_name` call this; code that
+        modifies :attr:`type_printers` or :attr:`deferred_printers` directly
+        must call it too.
+        """
+        # Maps classes to the class whose type printer they use, or None.
+        self._type_cache = {}
+
+    def _type_printer(self, obj_class):
+        """Return the type printer for obj_class, or None.
+
+        The MRO of each class is only walked once.
+        """
+        cache = self._type_cache
+        try:
+            cls = cache[obj_class]
+        except (KeyError, TypeError):
+            cls = None
+            for base in pretty._get_mro(obj_class):
+                if (base in self.type_printers or
+                    self._in_deferred_types(base) is not None):
+                    cls = base
+                    break
+            try:
+                cache[obj_class] = cls
+            except TypeError:
+                pass
+        if cls is None:
+            return None
+        return self.type_printers.get(cls)
+
     def _in_deferred_types(self, cls):
         """
         Check if the given class is specified in the deferred type registry.
@@ -357,6 +413,14 @@ class PlainTextFormatter(BaseFormatter):
 
     # The newline character.
     newline = Unicode('\n', config=True)
+
+    # Limits on the output, so that displaying a huge container doesn't
+    # freeze the session (0 means no limit).  Only this many items of each
+    # sequence/set/dict are shown, objects nested deeper than max_depth are
+    # shown as '...', and the output is cut after max_chars characters.
+    max_seq_length = Int(1000, config=True)
+    max_depth = Int(0, config=True)
+    max_chars = Int(1000000, config=True)
     
     # format-string for pprinting floats
     float_format = Unicode('%r')
@@ -436,7 +500,11 @@ class PlainTextFormatter(BaseFormatter):
                 self.max_width, self.newline,
                 singleton_pprinters=self.singleton_printers,
                 type_pprinters=self.type_printers,
-                deferred_pprinters=self.deferred_printers)
+                deferred_pprinters=self.deferred_printers,
+                type_cache=self._type_cache,
+                max_seq_length=self.max_seq_length,
+                max_depth=self.max_depth,
+                max_chars=self.max_chars)
             printer.pretty(obj)
             printer.flush()
             return stream.getvalue()
@@ -25,7 +25,8 @@ from IPython.config.configurable import Configurable
 
 from IPython.testing.skipdoctest import skip_doctest
 from IPython.utils import io
-from IPython.utils.traitlets import Bool, Dict, Instance, Int, List, Unicode
+from IPython.utils.traitlets import (Bool, CaselessStrEnum, Dict, Instance,
+                                     Int, List, Unicode)
 from IPython.utils.warn import warn
 
 #-----------------------------------------------------------------------------
@@ -66,12 +67,31 @@ class HistoryManager(Configurable):
     session_number = Int()
     # Should we log output to the database? (default no)
     db_log_output = Bool(False, config=True)
+    # Should we log the memory used by cells (see MemoryTracker) to the
+    # database? (default no)
+    db_log_memory = Bool(False, config=True)
     # Write to database every x commands (higher values save disk access & power)
     #  Values of 1 or less effectively disable caching. 
     db_cache_size = Int(0, config=True)
     # The input and output caches
     db_input_cache = List()
     db_output_cache = List()
+    db_memory_cache = List()
+    # SQLite journal mode of the history file.  In WAL mode, readers don't
+    # block the writer and vice versa, which matters when several processes
+    # (e.g. kernels) share one profile's history.
+    db_journal_mode = CaselessStrEnum(['delete', 'truncate', 'persist', 'wal'],
+                                      default_value='wal', config=True)
+    # SQLite 'synchronous' level used by our connections.  With WAL, 'normal'
+    # is safe against corruption and only syncs at checkpoints.
+    db_synchronous = CaselessStrEnum(['off', 'normal', 'full'],
+                                     default_value='normal', config=True)
+    # Seconds to wait for a lock held by another connection.
+    db_timeout = Int(10, config=True)
+    # Maintain an SQLite full-text (FTS4) index of the history, used by
+    # fulltext_search, and by search to narrow down the lines to match.
+    # Ignored if the sqlite library lacks FTS4.
+    fts_index = Bool(False, config=True)
     
     # History saving in separate thread
     save_thread = Instance('IPython.core.history.HistorySavingThread')
@@ -104,6 +124,27 @@ class HistoryManager(Configurable):
             histfname = 'history'
             self.hist_file = os.path.join(shell.profile_dir.location, histfname + '.sqlite')
 
+        # sqlite connections can only be used in the thread that created them;
+        # other threads (e.g. a kernel's control thread) get their own.
+        self._db_thread = threading.current_thread()
+        self._thread_db = threading.local()
+
+        self.save_flag = threading.Event()
+        # Set once the full-text index covers the whole history
+        self.fts_ready = threading.Event()
+        self.db_input_cache_lock = threading.Lock()
+        self.db_output_cache_lock = threading.Lock()
+
+        # With the shell's deferred_init, this waits for the first use of the
+        # database: the first input stored, or the first query.
+        if not shell.deferred_init:
+            self.open()
+
+    def open(self):
+        """Open the database, start a new session in it, and the thread
+        saving the history to it.  Does nothing if it is already open."""
+        if self.db is not None:
+            return
         try:
             self.init_db()
         except sqlite3.DatabaseError:
@@ -117,19 +158,22 @@ class HistoryManager(Configurable):
             else:
                 # The hist_file is probably :memory: or something else.
                 raise
-                
-        self.save_flag = threading.Event()
-        self.db_input_cache_lock = threading.Lock()
-        self.db_output_cache_lock = threading.Lock()
+
         self.save_thread = HistorySavingThread(self)
         self.save_thread.start()
 
         self.new_session()
 
-        
+    def connect(self):
+        """Open a new connection to the database, with our settings."""
+        conn = sqlite3.connect(self.hist_file, timeout=self.db_timeout)
+        conn.execute("PRAGMA synchronous=%s" % self.db_synchronous)
+        return conn
+
     def init_db(self):
         """Connect to the database, and create tables if necessary."""
-        self.db = sqlite3.connect(self.hist_file)
+        self.db = self.connect()
+        self.init_journal_mode(self.db)
         self.db.execute("""CREATE TABLE IF NOT EXISTS sessions (session integer
                         primary key autoincrement, start timestamp,
                         end timestamp, num_cmds integer, remark text)""")
@@ -141,11 +185,127 @@ class HistoryManager(Configurable):
         self.db.execute("""CREATE TABLE IF NOT EXISTS output_history
                         (session integer, line integer, output text,
                         PRIMARY KEY (session, line))""")
+        # Likewise for the memory used by cells, in bytes
+        self.db.execute("""CREATE TABLE IF NOT EXISTS memory_history
+                        (session integer, line integer, peak integer,
+                        net integer, PRIMARY KEY (session, line))""")
         self.db.commit()
+        if self.fts_index:
+            self.init_fts()
+
+    def init_journal_mode(self, conn):
+        """Set the journal mode of the database on connection conn.
+
+        The journal mode is persistent, so this also applies to the other
+        connections to the file.  SQLite leaves the mode unchanged when it
+        can't use WAL (e.g. on a network filesystem without shared memory), so
+        check the mode it reports and fall back to 'delete' in that case.
+        """
+        mode = conn.execute("PRAGMA journal_mode=%s" %
+                            self.db_journal_mode).fetchone()[0]
+        if self.db_journal_mode == 'wal' and mode not in ('wal', 'memory'):
+            warn("The history file %s can't use WAL journaling; falling back "
+                 "to journal_mode 'delete'." % self.hist_file)
+            conn.execute("PRAGMA journal_mode=delete")
+            self.db_journal_mode = 'delete'
+
+    # The tables indexed when fts_index is enabled: table -> indexed columns.
+    # The index of each table is named <table>_fts, and its docids are the
+    # rowids of the indexed rows.
+    _fts_tables = {'history' : ('source', 'source_raw'),
+                   'output_history' : ('output',)}
+
+    def init_fts(self):
+        """Create the full-text index tables if needed.
+
+        The rows added since the index was last updated (e.g. the whole
+        history, the first time) are indexed by :meth:`index_fts`, which the
+        saving thread runs when it starts.
+        """
+        try:
+            with self.db:
+                for table, columns in self._fts_tables.items():
+                    self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS "
+                        "%s_fts USING fts4(%s)" % (table, ', '.join(columns)))
+                # The words in the input index, see fts_terms
+                self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS "
+                                "history_fts_terms USING fts4aux(history_fts)")
+                # The rowid up to which each table has been indexed
+                self.db.execute("""CREATE TABLE IF NOT EXISTS fts_state
+                        (tbl text primary key, last_rowid integer)""")
+        except sqlite3.OperationalError as e:
+            warn("Full-text history index disabled: %s" % e)
+            self.fts_index = False
+
+    # Number of rows of each table indexed per transaction by index_fts, so
+    # that the other connections aren't locked out for long.
+    fts_batch_size = 5000
+    # Maximum number of index words a word of a glob pattern is looked up as
+    # (e.g. '*umpy*' as 'numpy' OR 'numpyversion'), see fts_terms.
+    fts_max_terms = 100
+
+    def index_fts(self, conn=None):
+        """Index the rows not indexed yet, in batches, and set
+        :attr:`fts_ready` once the index covers all of the history."""
+        if conn is None:
+            conn = self.get_db()
+        while not self.fts_ready.is_set():
+            with conn:
+                # Take the write lock first, see _update_fts
+                conn.execute("INSERT OR IGNORE INTO fts_state "
+                             "VALUES ('history', 0)")
+                if self._update_fts(conn, self.fts_batch_size):
+                    # Writeouts committed from now on index their own rows
+                    self.fts_ready.set()
+
+    def _update_fts(self, conn, limit=-1):
+        """Add the rows not indexed yet, at most limit of each table, to the
+        full-text index, and return whether all the rows are indexed.
+
+        This must run in a transaction which already holds the database's
+        write lock (e.g. the one that added the rows), so that fts_state
+        can't change once read.
+        """
+        done = True
+        for table, columns in self._fts_tables.items():
+            cur = conn.execute("SELECT last_rowid FROM fts_state WHERE tbl=?",
+                               (table,))
+            row = cur.fetchone()
+            last = row[0] if row else 0
+            cur = conn.execute("SELECT MAX(rowid), COUNT(*) FROM (SELECT rowid "
+                               "FROM %s WHERE rowid > ? ORDER BY rowid "
+                               "LIMIT ?)" % table, (last, limit))
+            new_last, count = cur.fetchone()
+            if not count:
+                continue
+            if count == limit:
+                done = False
+            cols = ', '.join(columns)
+            conn.execute("INSERT INTO %s_fts (docid, %s) SELECT rowid, %s "
+                         "FROM %s WHERE rowid > ? AND rowid <= ?" %
+                         (table, cols, cols, table), (last, new_last))
+            conn.execute("INSERT OR REPLACE INTO fts_state VALUES (?, ?)",
+                         (table, new_last))
+        return done
+
+    def get_db(self):
+        """Return a connection to the database usable from the calling
+        thread: :attr:`db` in the thread that created the manager, a per-thread
+        connection otherwise."""
+        if threading.current_thread() is self._db_thread:
+            self.open()
+            return self.db
+        conn = getattr(self._thread_db, 'conn', None)
+        if conn is None:
+            conn = self._thread_db.conn = self.connect()
+        return conn
     
     def new_session(self, conn=None):
         """Get a new session number."""
         if conn is None:
+            if self.db is None:
+                # Not opened yet: open() will start the session
+                return
             conn = self.db
         
         with conn:
@@ -155,6 +315,9 @@ class HistoryManager(Configurable):
             
     def end_session(self):
         """Close the database session, filling in the end time and line count."""
+        if self.db is None:
+            # Never opened: there is no session to close
+            return
         self.writeout_cache()
         with self.db:
             self.db.execute("""UPDATE sessions SET end=?, num_cmds=? WHERE
@@ -164,6 +327,7 @@ class HistoryManager(Configurable):
                             
     def name_session(self, name):
         """Give the current session a name in the history database."""
+        self.open()
         with self.db:
             self.db.execute("UPDATE sessions SET remark=? WHERE session==?",
                             (name, self.session_number))
@@ -185,7 +349,8 @@ class HistoryManager(Configurable):
     ## -------------------------------
     ## Methods for retrieving history:
     ## -------------------------------
-    def _run_sql(self, sql, params, raw=True, output=False):
+    def _run_sql(self, sql, params, raw=True, output=False, limit=None,
+                 offset=0):
         """Prepares and runs an SQL query for the history database.
         
         Parameters
@@ -196,24 +361,30 @@ class HistoryManager(Configurable):
           Parameters passed to the SQL query (to replace "?")
         raw, output : bool
           See :meth:`get_range`
+        limit, offset : int
+          See :meth:`get_range`
         
         Returns
         -------
         Tuples as :meth:`get_range`
         """
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += (-1 if limit is None else limit, offset)
         toget = 'source_raw' if raw else 'source'
         sqlfrom = "history"
         if output:
             sqlfrom = "history LEFT JOIN output_history USING (session, line)"
             toget = "history.%s, output_history.output" % toget
-        cur = self.db.execute("SELECT session, line, %s FROM %s " %\
+        cur = self.get_db().execute("SELECT session, line, %s FROM %s " %\
                                 (toget, sqlfrom) + sql, params)
         if output:    # Regroup into 3-tuples, and parse JSON
             return ((ses, lin, (inp, out)) for ses, lin, inp, out in cur)
         return cur
         
     
-    def get_tail(self, n=10, raw=True, output=False, include_latest=False):
+    def get_tail(self, n=10, raw=True, output=False, include_latest=False,
+                 limit=None, offset=0):
         """Get the last n lines from the history database.
         
         Parameters
@@ -222,6 +393,8 @@ class HistoryManager(Configurable):
           The number of lines to get
         raw, output : bool
           See :meth:`get_range`
+        limit, offset : int
+          See :meth:`get_range`
         include_latest : bool
           If False (default), n+1 lines are fetched, and the latest one
           is discarded. This is intended to be used where the function
@@ -229,19 +402,31 @@ class HistoryManager(Configurable):
         
         Returns
         -------
-        Tuples as :meth:`get_range`
+        Tuples as :meth:`get_range`, in chronological order.  They are
+        streamed from the database rather than collected in a list.
         """
         self.writeout_cache()
-        if not include_latest:
-            n += 1
-        cur = self._run_sql("ORDER BY session DESC, line DESC LIMIT ?",
-                                (n,), raw=raw, output=output)
-        if not include_latest:
-            return reversed(list(cur)[1:])
-        return reversed(list(cur))
+        # Pick the rowids of the last n lines in the subquery, so that the
+        # rows themselves can be streamed back in chronological order.
+        latest = ("SELECT rowid FROM history ORDER BY session DESC, line DESC "
+                  "LIMIT ? OFFSET ?")
+        return self._run_sql("WHERE history.rowid IN (%s) "
+                             "ORDER BY session, line" % latest,
+                             (n, 0 if include_latest else 1), raw=raw,
+                             output=output, limit=limit, offset=offset)
         
+    def fts_terms(self, glob):
+        """Return the words in the full-text index of the input which match
+        the glob pattern, or None if there are more than
+        :attr:`fts_max_terms` of them."""
+        cur = self.get_db().execute("SELECT term FROM history_fts_terms "
+                                    "WHERE col='*' AND term GLOB ? LIMIT ?",
+                                    (glob, self.fts_max_terms + 1))
+        terms = [row[0] for row in cur]
+        return terms if len(terms) <= self.fts_max_terms else None
+
     def search(self, pattern="*", raw=True, search_raw=True,
-                                                        output=False):
+                output=False, n=None, unique=False, limit=None, offset=0):
         """Search the database using unix glob-style matching (wildcards
         * and ?).
         
@@ -253,19 +438,98 @@ class HistoryManager(Configurable):
           If True, search the raw input, otherwise, the parsed input
         raw, output : bool
           See :meth:`get_range`
+        n : None or int
+          If an integer is given, it defines the limit of
+          returned entries; the n most recent matches are returned.
+        unique : bool
+          When True, return only the most recent occurrence of each
+          distinct input.
+        limit, offset : int
+          See :meth:`get_range`
         
         Returns
         -------
-        Tuples as :meth:`get_range`
+        Tuples as :meth:`get_range`, streamed from the database.
         """
         tosearch = "source_raw" if search_raw else "source"
-        if output:
-            tosearch = "history." + tosearch
         self.writeout_cache()
-        return self._run_sql("WHERE %s GLOB ?" % tosearch, (pattern,),
-                                    raw=raw, output=output)
+        # The lines to match against the pattern: all of them, or those the
+        # full-text index finds for the words of the pattern.
+        glob = "%s GLOB ?" % tosearch
+        params = (pattern,)
+        if self.fts_index and self.fts_ready.is_set():
+            query = glob_fts_query(pattern, self.fts_terms)
+        else:
+            query = None
+        if query:
+            glob = ("rowid IN (SELECT docid FROM history_fts WHERE %s MATCH ?) "
+                    "AND %s" % (tosearch, glob))
+            params = (query,) + params
+        if n is None and not unique:
+            return self._run_sql("WHERE history.%s" % glob, params,
+                                 raw=raw, output=output, limit=limit,
+                                 offset=offset)
+
+        if unique:
+            matches = ("SELECT MAX(rowid) FROM history WHERE %s "
+                       "GROUP BY %s" % (glob, tosearch))
+        else:
+            matches = "SELECT rowid FROM history WHERE %s" % glob
+        if n is not None:
+            matches = ("SELECT rowid FROM history WHERE rowid IN (%s) "
+                       "ORDER BY session DESC, line DESC LIMIT ?" % matches)
+            params += (n,)
+        return self._run_sql("WHERE history.rowid IN (%s) "
+                             "ORDER BY session, line" % matches, params,
+                             raw=raw, output=output, limit=limit,
+                             offset=offset)
                                 
-    def _get_range_session(self, start=1, stop=None, raw=True, output=False):
+    def fulltext_search(self, query, raw=True, search_raw=True, output=False,
+                                            search_output=False, n=None):
+        """Search the full-text index of the history (see :attr:`fts_index`).
+
+        Parameters
+        ----------
+        query : str
+          An SQLite FTS query: words match whole tokens, ``word*`` matches
+          tokens by prefix, and ``"some words"`` matches a phrase.  All the
+          terms must match.
+        search_raw : bool
+          If True, search the raw input, otherwise, the parsed input
+        search_output : bool
+          If True, search the logged output instead of the input.
+        raw, output : bool
+          See :meth:`get_range`
+        n : None or int
+          The maximum number of entries to return.
+
+        Returns
+        -------
+        Tuples as :meth:`get_range`, most recent first.
+        """
+        if not self.fts_index:
+            raise ValueError("The full-text history index is not enabled, "
+                             "see HistoryManager.fts_index.")
+        self.writeout_cache()
+        # Don't wait for the saving thread to finish indexing the history
+        self.index_fts()
+        if search_output:
+            matches = ("SELECT h.rowid FROM history AS h JOIN output_history "
+                "AS o USING (session, line) WHERE o.rowid IN (SELECT docid "
+                "FROM output_history_fts WHERE output MATCH ?)")
+        else:
+            column = "source_raw" if search_raw else "source"
+            matches = "SELECT docid FROM history_fts WHERE %s MATCH ?" % column
+        sql = ("WHERE history.rowid IN (%s) "
+               "ORDER BY session DESC, line DESC" % matches)
+        params = (query,)
+        if n is not None:
+            sql += " LIMIT ?"
+            params += (n,)
+        return self._run_sql(sql, params, raw=raw, output=output)
+
+    def _get_range_session(self, start=1, stop=None, raw=True, output=False,
+                           limit=None, offset=0):
         """Get input and output history from the current session. Called by
         get_range, and takes similar parameters."""
         input_hist = self.input_hist_raw if raw else self.input_hist_parsed
@@ -277,6 +541,9 @@ class HistoryManager(Configurable):
             stop = n
         elif stop < 0:
             stop += n
+        start += offset
+        if limit is not None:
+            stop = min(stop, start + limit)
         
         for i in range(start, stop):
             if output:
@@ -285,7 +552,8 @@ class HistoryManager(Configurable):
                 line = input_hist[i]
             yield (0, i, line)
             
-    def get_range(self, session=0, start=1, stop=None, raw=True,output=False):
+    def get_range(self, session=0, start=1, stop=None, raw=True,output=False,
+                  limit=None, offset=0):
         """Retrieve input by session.
         
         Parameters
@@ -305,6 +573,11 @@ class HistoryManager(Configurable):
             objects for the current session, or text reprs from previous
             sessions if db_log_output was enabled at the time. Where no output
             is found, None is used.
+        limit : int
+            If given, return at most this number of lines.
+        offset : int
+            The number of lines to skip before the first one returned, e.g.
+            to get the next page of a previous call with the same limit.
             
         Returns
         -------
@@ -313,7 +586,8 @@ class HistoryManager(Configurable):
         (session, line, (input, output)) if output is True.
         """
         if session == 0 or session==self.session_number:   # Current session
-            return self._get_range_session(start, stop, raw, output)
+            return self._get_range_session(start, stop, raw, output,
+                                           limit, offset)
         if session < 0:
             session += self.session_number
             
@@ -325,7 +599,8 @@ class HistoryManager(Configurable):
             params = (session, start)
         
         return self._run_sql("WHERE session==? AND %s""" % lineclause,
-                                    params, raw=raw, output=output)
+                             params, raw=raw, output=output, limit=limit,
+                             offset=offset)
         
     def get_range_by_str(self, rangestr, raw=True, output=False):
         """Get lines of history from a string of ranges, as used by magic
@@ -377,7 +652,10 @@ class HistoryManager(Configurable):
         
         self.input_hist_parsed.append(source)
         self.input_hist_raw.append(source_raw)
-        
+
+        # With deferred initialization, the database and the saving thread
+        # are started by the first input
+        self.open()
         with self.db_input_cache_lock:
             self.db_input_cache.append((line_num, source, source_raw))
             # Trigger to flush cache and write to DB.
@@ -416,23 +694,67 @@ class HistoryManager(Configurable):
             self.db_output_cache.append((line_num, output))
         if self.db_cache_size <= 1:
             self.save_flag.set()
+
+    def store_memory(self, line_num, peak, net):
+        """If database memory logging is enabled, this saves the memory used
+        by the indicated prompt number, as measured by the MemoryTracker, to
+        the database.
+
+        Parameters
+        ----------
+        line_num : int
+          The line number of the measured input
+        peak, net : int
+          The peak and net increases of memory used, in bytes; peak may be
+          None if it wasn't measured.
+        """
+        if not self.db_log_memory:
+            return
+        with self.db_output_cache_lock:
+            self.db_memory_cache.append((line_num, peak, net))
+        if self.db_cache_size <= 1:
+            self.save_flag.set()
+
+    def get_memory(self, session=0):
+        """Return the memory logged for the inputs of a session (the current
+        one by default, or counting back from it if negative), as a list of
+        (line, peak, net) tuples."""
+        if session <= 0:
+            session += self.session_number
+        self.writeout_cache()
+        cur = self.get_db().execute("SELECT line, peak, net FROM "
+                        "memory_history WHERE session=? ORDER BY line",
+                        (session,))
+        return cur.fetchall()
     
     def _writeout_input_cache(self, conn):
         with conn:
-            for line in self.db_input_cache:
-                conn.execute("INSERT INTO history VALUES (?, ?, ?, ?)",
-                                (self.session_number,)+line)
+            session = (self.session_number,)
+            conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?)",
+                             [session + line for line in self.db_input_cache])
+            if self.fts_index and self.db_input_cache and \
+                    self.fts_ready.is_set():
+                self._update_fts(conn)
     
     def _writeout_output_cache(self, conn):
         with conn:
-            for line in self.db_output_cache:
-                conn.execute("INSERT INTO output_history VALUES (?, ?, ?)",
-                                (self.session_number,)+line)
+            session = (self.session_number,)
+            conn.executemany("INSERT INTO output_history VALUES (?, ?, ?)",
+                             [session + line for line in self.db_output_cache])
+            if self.fts_index and self.db_output_cache and \
+                    self.fts_ready.is_set():
+                self._update_fts(conn)
+
+    def _writeout_memory_cache(self, conn):
+        with conn:
+            session = (self.session_number,)
+            conn.executemany("INSERT INTO memory_history VALUES (?, ?, ?, ?)",
+                             [session + line for line in self.db_memory_cache])
     
     def writeout_cache(self, conn=None):
         """Write any entries in the cache to the database."""
         if conn is None:
-            conn = self.db
+            conn = self.get_db()
             
         with self.db_input_cache_lock:
             try:
@@ -457,6 +779,13 @@ class HistoryManager(Configurable):
                       "in database. Output will not be stored.")
             finally:
                 self.db_output_cache = []
+            try:
+                self._writeout_memory_cache(conn)
+            except sqlite3.IntegrityError:
+                print("!! Session/line number for memory was not unique",
+                      "in database. It will not be stored.")
+            finally:
+                self.db_memory_cache = []
 
 
 class HistorySavingThread(threading.Thread):
@@ -476,7 +805,9 @@ class HistorySavingThread(threading.Thread):
     def run(self):
         # We need a separate db connection per thread:
         try:
-            self.db = sqlite3.connect(self.history_manager.hist_file)
+            self.db = self.history_manager.connect()
+            if self.history_manager.fts_index:
+                self.history_manager.index_fts(self.db)
             while True:
                 self.history_manager.save_flag.wait()
                 if self.stop_now:
@@ -497,6 +828,57 @@ class HistorySavingThread(threading.Thread):
         self.history_manager.save_flag.set()
         self.join()
 
+
+
+def _is_token_char(c):
+    # The characters FTS4's simple tokenizer puts in tokens
+    return c.isalnum() if ord(c) < 128 else True
+
+def _fts_lower(word):
+    # The simple tokenizer only folds the case of ASCII characters
+    return ''.join(c.lower() if ord(c) < 128 else c for c in word)
+
+def glob_fts_query(pattern, find_terms=None):
+    """Return a full-text query matching (at least) the lines that match the
+    glob pattern, or None if the pattern has no word to look up.
+
+    The words whose start is given literally are looked up directly: e.g.
+    ``foo(ba*`` gives ``"foo" "ba*"``.  In ``*foo(ba*``, the word ``foo`` may
+    be the end of a longer one, which the index can't look up by itself: if
+    `find_terms` is given, it is called with a glob pattern on the indexed
+    words (here ``*foo``) and returns those that match, which the query
+    accepts any of, or None if there are too many to use.  Without it, such
+    words are left out of the query.
+    """
+    terms = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '[':
+            # Skip the character class, whose first char may be ']'
+            end = pattern.find(']', i + 2)
+            i = n if end == -1 else end + 1
+        elif _is_token_char(c):
+            j = i
+            while j < n and _is_token_char(pattern[j]):
+                j += 1
+            word = pattern[i:j]
+            more = j < n and pattern[j] in '*?['
+            if i == 0 or pattern[i-1] not in '*?]':
+                terms.append('"%s%s"' % (word, '*' if more else ''))
+            elif find_terms is not None:
+                # A word that may begin before the wildcard
+                found = find_terms('*%s%s' % (_fts_lower(word),
+                                              '*' if more else ''))
+                if found is not None:
+                    # No word at all matches as '"word"' doesn't
+                    found = found or [word]
+                    terms.append(' OR '.join('"%s"' % t for t in found))
+            i = j
+        else:
+            i += 1
+    return ' '.join(terms) or None
+
         
 # To match, e.g. ~5/8-~2/3
 range_re = re.compile(r"""
@@ -594,6 +976,10 @@ def magic_history(self, parameter_s = ''):
       -l: get the last n lines from all sessions. Specify n as a single arg, or
       the default is the last 10 lines.
 
+      -s: search the full-text index of the history for the words in arg,
+      most recent first.  Words match whole tokens, and 'word*' matches by
+      prefix.  Requires HistoryManager.fts_index to be enabled.
+
       -f FILENAME: instead of printing the output to the screen, redirect it to
        the given file.  The file is always overwritten, though IPython asks for
        confirmation first if it already exists.
@@ -611,7 +997,7 @@ def magic_history(self, parameter_s = ''):
     if not self.shell.displayhook.do_full_cache:
         print('This feature is only available if numbered prompts are in use.')
         return
-    opts,args = self.parse_options(parameter_s,'noprtglf:',mode='string')
+    opts,args = self.parse_options(parameter_s,'noprtglsf:',mode='string')
     
     # For brevity
     history_manager = self.shell.history_manager
@@ -650,6 +1036,13 @@ def magic_history(self, parameter_s = ''):
     if 'g' in opts:         # Glob search
         pattern = "*" + args + "*" if args else "*"
         hist = history_manager.search(pattern, raw=raw, output=get_output)
+    elif 's' in opts:       # Full-text search
+        if not history_manager.fts_index:
+            print('The full-text history index is not enabled; '
+                  'set HistoryManager.fts_index = True to enable it.')
+            return
+        hist = history_manager.fulltext_search(args, raw=raw,
+                                               output=get_output)
     elif 'l' in opts:       # Get 'tail'
         try:
             n = int(args)
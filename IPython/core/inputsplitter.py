@@ -118,6 +118,17 @@ ini_spaces_re = re.compile(r'^([ \t\r\f\v]+)')
 # before pure comments
 comment_line_re = re.compile('^\s*\#')
 
+# The tokens that matter to know whether input ends inside brackets or a
+# string: escapes, quotes, comments, brackets and newlines.
+scan_re = re.compile(r'\\.|"""|\'\'\'|["\'#()\[\]{}\n]', re.DOTALL)
+
+# Lines starting with these keywords continue the previous statement.
+continuation_re = re.compile(r'(else|elif|except|finally)\b')
+
+# Lines that need more input even when they are complete lines: block
+# openers, decorators and one-line try clauses.
+opens_block_re = re.compile(r'(.*:|@.*|try\b.*)$', re.DOTALL)
+
 
 def num_ini_spaces(s):
     """Return the number of initial spaces in a string.
@@ -220,14 +231,6 @@ class InputSplitter(object):
     # at initialization time via get_input_encoding(), but it can be reset by a
     # client with specific knowledge of the encoding.
     encoding = ''
-    # String where the current full source input is stored, properly encoded.
-    # Reading this attribute is the normal way of querying the currently pushed
-    # source code, that has been properly encoded.
-    source = ''
-    # Code object corresponding to the current source.  It is automatically
-    # synced to the source, so it can be queried at any time to obtain the code
-    # object; it will be None if the source doesn't compile to valid Python.
-    code = None
     # Input mode
     input_mode = 'line'
     
@@ -235,12 +238,32 @@ class InputSplitter(object):
     
     # List with lines of input accumulated so far
     _buffer = None
+    # The joined buffer, or None until it is needed (see the source property)
+    _source = ''
+    # Code object for the source, and whether it must be recompiled before use
+    _code = None
+    _code_stale = False
     # Command compiler
     _compile = None
     # Mark when input has changed indentation all the way back to flush-left
     _full_dedent = False
     # Boolean indicating whether the current block is complete
     _is_complete = None
+
+    # State used to check completeness incrementally.  The input is scanned
+    # as it comes, to know whether it ends inside brackets or a string, in
+    # which case it can't be complete.  When it has to be compiled, only the
+    # buffer from _checkpoint on is compiled: everything before it is known
+    # to be valid, complete statements.
+    
+    # Bracket nesting depth at the end of the input
+    _depth = 0
+    # Delimiter of the string the input ends in, if any
+    _string = None
+    # Buffer index of the last line starting a new top-level statement
+    _last_start = 0
+    # Buffer index from which completeness is checked
+    _checkpoint = 0
     
     def __init__(self, input_mode=None):
         """Create a new InputSplitter instance.
@@ -269,14 +292,47 @@ class InputSplitter(object):
         self.input_mode = InputSplitter.input_mode if input_mode is None \
                           else input_mode
 
+    @property
+    def source(self):
+        """String where the current full source input is stored, properly
+        encoded.
+
+        Reading this attribute is the normal way of querying the currently
+        pushed source code, that has been properly encoded."""
+        if self._source is None:
+            self._source = self._set_source(self._buffer)
+        return self._source
+
+    @property
+    def code(self):
+        """Code object corresponding to the current source.
+
+        It is automatically synced to the source, so it can be queried at any
+        time to obtain the code object; it will be None if the source doesn't
+        compile to valid Python."""
+        if self._code_stale:
+            # push() only compiled part of the source, or none of it.
+            self._code_stale = False
+            try:
+                self._code = self._compile(self.source, symbol="exec")
+            except (SyntaxError, OverflowError, ValueError, TypeError,
+                    MemoryError):
+                self._code = None
+        return self._code
+
     def reset(self):
         """Reset the input buffer and associated state."""
         self.indent_spaces = 0
         self._buffer[:] = []
-        self.source = ''
-        self.code = None
+        self._source = ''
+        self._code = None
+        self._code_stale = False
         self._is_complete = False
         self._full_dedent = False
+        self._depth = 0
+        self._string = None
+        self._last_start = 0
+        self._checkpoint = 0
 
     def source_reset(self):
         """Return the input source and perform a full reset.
@@ -309,22 +365,51 @@ class InputSplitter(object):
         """
         if self.input_mode == 'cell':
             self.reset()
-        
+
+        was_open = self._is_open()
+        was_complete = self._is_complete
+        if not was_open and self._starts_statement(lines):
+            self._last_start = len(self._buffer)
         self._store(lines)
-        source = self.source
+        comment = self._scan(lines)
 
         # Before calling _compile(), reset the code object to None so that if an
         # exception is raised in compilation, we don't mislead by having
         # inconsistent code/source attributes.
-        self.code, self._is_complete = None, None
+        self._code, self._code_stale, self._is_complete = None, False, None
 
         # Honor termination lines properly
-        if source.rstrip().endswith('\\'):
+        if self._ends_with_continuation():
             return False
 
         self._update_indent(lines)
+
+        # Avoid compiling when the answer is already known, so that pushing
+        # many lines doesn't recompile the whole buffer each time.
+        if was_open and self._is_open() and was_complete is not None:
+            # Still inside brackets or a string: as incomplete (or invalid)
+            # as before.
+            self._is_complete = was_complete
+            self._code_stale = True
+            return self._is_complete
+        if (was_complete and not was_open and not self._is_open() and
+            '\n' not in lines.rstrip('\n')):
+            code = lines if comment is None else lines[:comment]
+            if not opens_block_re.match(code.strip()):
+                # A simple line after a complete block either is another
+                # complete statement, or invalid syntax, which is also
+                # reported as complete.
+                self._is_complete = True
+                self._code_stale = True
+                return True
+
+        start = self._checkpoint
+        source = ''.join(self._buffer[start:]) if start else self.source
+        if start and ('__future__' in source or 'global' in source):
+            # These are only valid at (or relative to) the top of the source.
+            start, source = 0, self.source
         try:
-            self.code = self._compile(source, symbol="exec")
+            code = self._compile(source, symbol="exec")
         # Invalid syntax can produce any of a number of different errors from
         # inside the compiler, so we have to catch them all.  Syntax errors
         # immediately produce a 'ready' block, so the invalid Python can be
@@ -336,7 +421,14 @@ class InputSplitter(object):
         else:
             # Compilation didn't produce any exceptions (though it may not have
             # given a complete code object)
-            self._is_complete = self.code is not None
+            self._is_complete = code is not None
+            if start:
+                self._code_stale = code is not None
+            else:
+                self._code = code
+            # Everything before the last statement is valid, so it doesn't
+            # need to be compiled again.
+            self._checkpoint = self._last_start
 
         return self._is_complete
 
@@ -400,7 +492,7 @@ class InputSplitter(object):
 
         # When input is complete, then termination is marked by an extra blank
         # line at the end.
-        last_line = self.source.splitlines()[-1]
+        last_line = self._buffer[-1].splitlines()[-1]
         return bool(last_line and not last_line.isspace())
 
     #------------------------------------------------------------------------
@@ -457,7 +549,7 @@ class InputSplitter(object):
         """Store one or more lines of input.
 
         If input lines are not newline-terminated, a newline is automatically
-        appended."""
+        appended.  The `store` attribute is only recomputed when read."""
         
         if buffer is None:
             buffer = self._buffer
@@ -466,11 +558,64 @@ class InputSplitter(object):
             buffer.append(lines)
         else:
             buffer.append(lines+'\n')
-        setattr(self, store, self._set_source(buffer))
+        setattr(self, '_' + store, None)
 
     def _set_source(self, buffer):
         return ''.join(buffer)
 
+    def _scan(self, lines):
+        """Update the bracket depth and string state with new input.
+
+        Returns the position in `lines` of the comment on its last line, or
+        None if that line has no comment.
+        """
+        depth, string = self._depth, self._string
+        comment = None
+        in_comment = False
+        if not lines.endswith('\n'):
+            lines += '\n'
+        for match in scan_re.finditer(lines):
+            tok = match.group()
+            if in_comment:
+                if tok == '\n':
+                    in_comment = False
+            elif string is not None:
+                if tok == string or (len(string) == 1 and tok[0] == string):
+                    string = None
+                elif tok == '\n' and len(string) == 1:
+                    # Unterminated string, a syntax error: start afresh.
+                    string = None
+            elif tok == '#':
+                in_comment = True
+                comment = match.start()
+            elif tok[0] in '"\'':
+                string = tok
+            elif tok in '([{':
+                depth += 1
+            elif tok in ')]}':
+                depth = max(depth - 1, 0)
+            elif tok == '\n':
+                comment = None
+        self._depth, self._string = depth, string
+        return comment
+
+    def _is_open(self):
+        """Whether the input so far ends inside brackets or a string."""
+        return self._depth > 0 or self._string is not None
+
+    def _starts_statement(self, lines):
+        """Whether lines, pushed outside of brackets and strings, begin a new
+        top-level statement."""
+        return bool(lines) and not (lines[0].isspace() or lines[0] == '#' or
+                                    continuation_re.match(lines))
+
+    def _ends_with_continuation(self):
+        """Whether the last non-blank line ends with a backslash."""
+        for chunk in reversed(self._buffer):
+            if not chunk.isspace():
+                return chunk.rstrip().endswith('\\')
+        return False
+
 
 #-----------------------------------------------------------------------------
 # Functions and classes for IPython-specific syntactic support
@@ -792,23 +937,29 @@ transform_escaped = EscapedTransformer()
 class IPythonInputSplitter(InputSplitter):
     """An input splitter that recognizes all of IPython's special syntax."""
 
-    # String with raw, untransformed input.
-    source_raw = ''
-
     # Private attributes
     
     # List with lines of raw input accumulated so far.
     _buffer_raw = None
+    # The joined raw buffer, or None until it is needed
+    _source_raw = ''
 
     def __init__(self, input_mode=None):
         InputSplitter.__init__(self, input_mode)
         self._buffer_raw = []
+
+    @property
+    def source_raw(self):
+        """String with raw, untransformed input."""
+        if self._source_raw is None:
+            self._source_raw = self._set_source(self._buffer_raw)
+        return self._source_raw
         
     def reset(self):
         """Reset the input buffer and associated state."""
         InputSplitter.reset(self)
         self._buffer_raw[:] = []
-        self.source_raw = ''
+        self._source_raw = ''
 
     def source_raw_reset(self):
         """Return input and raw source and perform a full reset.
@@ -28,7 +28,7 @@ import tempfile
 import types
 
 from IPython.config.configurable import SingletonConfigurable
-from IPython.core import debugger, oinspect
+from IPython.core import oinspect
 from IPython.core import history as ipcorehist
 from IPython.core import page
 from IPython.core import prefilter
@@ -49,6 +49,7 @@ from IPython.core.history import HistoryManager
 from IPython.core.inputsplitter import IPythonInputSplitter
 from IPython.core.logger import Logger
 from IPython.core.macro import Macro
+from IPython.core.memory import MemoryTracker
 from IPython.core.magic import Magic
 from IPython.core.payload import PayloadManager
 from IPython.core.plugin import PluginManager
@@ -61,11 +62,12 @@ from IPython.utils.doctestreload import doctest_reload
 from IPython.utils.io import ask_yes_no, rprint
 from IPython.utils.ipstruct import Struct
 from IPython.utils.path import get_home_dir, get_ipython_dir, HomeDirError
-from IPython.utils.pickleshare import PickleShareDB
+from IPython.utils import pickleshare
 from IPython.utils.process import system, getoutput
 from IPython.utils.strdispatch import StrDispatch
 from IPython.utils.syspathcontext import prepended_to_syspath
 from IPython.utils.text import num_ini_spaces, format_screen, LSString, SList
+from IPython.utils.timing import StepTimer
 from IPython.utils.traitlets import (Int, CBool, CaselessStrEnum, Enum,
                                      List, Unicode, Instance, Type)
 from IPython.utils.warn import warn, error, fatal
@@ -228,6 +230,15 @@ class InteractiveShell(SingletonConfigurable, Magic):
         time re-flushing a too small cache than working
         """
     )
+    cache_max_bytes = Int(0, config=True, help=
+        """
+        Limit the estimated memory held by the output cache (Out, _oh, _N),
+        in bytes.  When a new output would exceed it, or the cache_size
+        limit, the oldest cached outputs are dropped one by one, in the order
+        they were produced: reading an output through _N, Out or _oh doesn't
+        keep it longer.  0 means no limit besides cache_size.
+        """
+    )
     color_info = CBool(True, config=True, help=
         """
         Use colors for displaying information about objects. Because this
@@ -239,7 +250,29 @@ class InteractiveShell(SingletonConfigurable, Magic):
                              default_value=get_default_colors(), config=True,
         help="Set the color scheme (NoColor, Linux, or LightBG)."
     )
+    db_backend = CaselessStrEnum(('sqlite', 'directory'),
+                                 default_value='sqlite', config=True, help=
+        """
+        The storage of the persistent data kept by IPython (ip.db: bookmarks,
+        directory history, %store'd variables...) in the profile: 'sqlite'
+        keeps it in a single SQLite file (db.sqlite), which is much faster on
+        network file systems, 'directory' in a file per key (in the db
+        directory), as older versions did.  The content of the directory is
+        copied into the SQLite file when it is first created, and the
+        directory is left alone for older versions; later changes made with
+        the other backend are not copied.
+        """
+    )
     debug = CBool(False, config=True)
+    deferred_init = CBool(False, config=True, help=
+        """
+        Defer the initialization of the subsystems rarely needed right away
+        until their first use, to start faster: the tab completer is created
+        on the first completion, and the history database is opened (and its
+        saving thread started) when the first input is stored or the history
+        is first queried.
+        """
+    )
     deep_reload = CBool(False, config=True, help=
         """
         Enable deep (recursive) reloading by default. IPython can use the
@@ -341,6 +374,7 @@ class InteractiveShell(SingletonConfigurable, Magic):
     plugin_manager = Instance('IPython.core.plugin.PluginManager')
     payload_manager = Instance('IPython.core.payload.PayloadManager')
     history_manager = Instance('IPython.core.history.HistoryManager')
+    memory_tracker = Instance('IPython.core.memory.MemoryTracker')
 
     profile_dir = Instance('IPython.core.application.ProfileDir')
     @property
@@ -357,78 +391,84 @@ class InteractiveShell(SingletonConfigurable, Magic):
                  user_ns=None, user_global_ns=None,
                  custom_exceptions=((), None)):
 
+        # The time taken by each step of the initialization, for
+        # --startup-profile.
+        self.startup_timer = StepTimer()
+        timed = self.startup_timer.call
+
         # This is where traits with a config_key argument are updated
         # from the values on config.
         super(InteractiveShell, self).__init__(config=config)
 
         # These are relatively independent and stateless
-        self.init_ipython_dir(ipython_dir)
-        self.init_profile_dir(profile_dir)
-        self.init_instance_attrs()
-        self.init_environment()
+        timed(self.init_ipython_dir, ipython_dir)
+        timed(self.init_profile_dir, profile_dir)
+        timed(self.init_instance_attrs)
+        timed(self.init_environment)
 
         # Create namespaces (user_ns, user_global_ns, etc.)
-        self.init_create_namespaces(user_ns, user_global_ns)
+        timed(self.init_create_namespaces, user_ns, user_global_ns)
         # This has to be done after init_create_namespaces because it uses
         # something in self.user_ns, but before init_sys_modules, which
         # is the first thing to modify sys.
         # TODO: When we override sys.stdout and sys.stderr before this class
         # is created, we are saving the overridden ones here. Not sure if this
         # is what we want to do.
-        self.save_sys_module_state()
-        self.init_sys_modules()
+        timed(self.save_sys_module_state)
+        timed(self.init_sys_modules)
         
         # While we're trying to have each part of the code directly access what
         # it needs without keeping redundant references to objects, we have too
         # much legacy code that expects ip.db to exist.
-        self.db = PickleShareDB(os.path.join(self.profile_dir.location, 'db'))
+        timed(self.init_db)
 
-        self.init_history()
-        self.init_encoding()
-        self.init_prefilter()
+        timed(self.init_history)
+        timed(self.init_encoding)
+        timed(self.init_prefilter)
 
         Magic.__init__(self, self)
 
-        self.init_syntax_highlighting()
-        self.init_hooks()
-        self.init_pushd_popd_magic()
+        timed(self.init_syntax_highlighting)
+        timed(self.init_hooks)
+        timed(self.init_pushd_popd_magic)
         # self.init_traceback_handlers use to be here, but we moved it below
         # because it and init_io have to come after init_readline.
-        self.init_user_ns()
-        self.init_logger()
-        self.init_alias()
-        self.init_builtins()
+        timed(self.init_user_ns)
+        timed(self.init_logger)
+        timed(self.init_alias)
+        timed(self.init_builtins)
 
         # pre_config_initialization
 
         # The next section should contain everything that was in ipmaker.
-        self.init_logstart()
+        timed(self.init_logstart)
 
         # The following was in post_config_initialization
-        self.init_inspector()
+        timed(self.init_inspector)
         # init_readline() must come before init_io(), because init_io uses
         # readline related things.
-        self.init_readline()
+        timed(self.init_readline)
         # init_completer must come after init_readline, because it needs to
         # know whether readline is present or not system-wide to configure the
         # completers, since the completion machinery can now operate
         # independently of readline (e.g. over the network)
-        self.init_completer()
+        timed(self.init_completer)
         # TODO: init_io() needs to happen before init_traceback handlers
         # because the traceback handlers hardcode the stdout/stderr streams.
         # This logic in in debugger.Pdb and should eventually be changed.
-        self.init_io()
-        self.init_traceback_handlers(custom_exceptions)
-        self.init_prompts()
-        self.init_display_formatter()
-        self.init_display_pub()
-        self.init_displayhook()
-        self.init_reload_doctest()
-        self.init_magics()
-        self.init_pdb()
-        self.init_extension_manager()
-        self.init_plugin_manager()
-        self.init_payload()
+        timed(self.init_io)
+        timed(self.init_traceback_handlers, custom_exceptions)
+        timed(self.init_prompts)
+        timed(self.init_display_formatter)
+        timed(self.init_display_pub)
+        timed(self.init_displayhook)
+        timed(self.init_reload_doctest)
+        timed(self.init_magics)
+        timed(self.init_pdb)
+        timed(self.init_extension_manager)
+        timed(self.init_plugin_manager)
+        timed(self.init_payload)
+        timed(self.init_memory_tracker)
         self.hooks.late_startup_hook()
         atexit.register(self.atexit_operations)
 
@@ -477,6 +517,11 @@ class InteractiveShell(SingletonConfigurable, Magic):
         self.profile_dir =\
             ProfileDir.create_profile_dir_by_name(self.ipython_dir, 'python3')
 
+    def init_db(self):
+        """Open the persistent storage of the profile, as ip.db."""
+        db_class = pickleshare.backends[self.db_backend]
+        self.db = db_class(os.path.join(self.profile_dir.location, 'db'))
+
     def init_instance_attrs(self):
         self.more = False
 
@@ -586,6 +631,7 @@ class InteractiveShell(SingletonConfigurable, Magic):
             config=self.config,
             shell=self,
             cache_size=self.cache_size,
+            cache_max_bytes=self.cache_max_bytes,
             input_sep = self.separate_in,
             output_sep = self.separate_out,
             output_sep2 = self.separate_out2,
@@ -601,6 +647,11 @@ class InteractiveShell(SingletonConfigurable, Magic):
     def init_reload_doctest(self):
         # Do a proper resetting of doctest, including the necessary displayhook
         # monkeypatching
+        if self.deferred_init and 'doctest' not in sys.modules:
+            # Importing doctest is one of the slowest steps of the startup,
+            # and its runner restores the default displayhook by itself in
+            # recent Pythons: leave it alone unless it is already loaded.
+            return
         try:
             doctest_reload()
         except ImportError:
@@ -821,7 +872,8 @@ class InteractiveShell(SingletonConfigurable, Magic):
             return
 
         # use pydb if available
-        if debugger.has_pydb:
+        from IPython.core.debugger import has_pydb
+        if has_pydb:
             from pydb import pm
         else:
             # fallback to our internal debugger
@@ -1388,6 +1440,10 @@ class InteractiveShell(SingletonConfigurable, Magic):
         """Sets up the command history, and starts regular autosaves."""
         self.history_manager = HistoryManager(shell=self, config=self.config)
 
+    def init_memory_tracker(self):
+        """Sets up the (opt-in) recording of the memory used by cells."""
+        self.memory_tracker = MemoryTracker(shell=self, config=self.config)
+
     #-------------------------------------------------------------------------
     # Things related to exception handling and tracebacks (not debugging)
     #-------------------------------------------------------------------------
@@ -1711,27 +1767,17 @@ class InteractiveShell(SingletonConfigurable, Magic):
         either interactively in-process (typically triggered by the readline
         library), programatically (such as in test suites) or out-of-prcess
         (typically over the network by remote frontends).
+
+        With deferred_init, the completer is only created on first use.
         """
-        from IPython.core.completer import IPCompleter
-        from IPython.core.completerlib import (module_completer,
-                                               magic_run_completer, cd_completer)
-        
-        self.Completer = IPCompleter(self,
-                                     self.user_ns,
-                                     self.user_global_ns,
-                                     self.readline_omit__names,
-                                     self.alias_manager.alias_table,
-                                     self.has_readline)
-        
-        # Add custom completers to the basic ones built into IPCompleter
+        # Custom completers can be added before the completer is created
         sdisp = self.strdispatchers.get('complete_command', StrDispatch())
         self.strdispatchers['complete_command'] = sdisp
-        self.Completer.custom_completers = sdisp
 
-        self.set_hook('complete_command', module_completer, str_key = 'import')
-        self.set_hook('complete_command', module_completer, str_key = 'from')
-        self.set_hook('complete_command', magic_run_completer, str_key = '%run')
-        self.set_hook('complete_command', cd_completer, str_key = '%cd')
+        self._completer = None
+        self._completer_hooks_set = False
+        if not self.deferred_init:
+            self.init_completer_object()
 
         # Only configure readline if we truly are using readline.  IPython can
         # do tab-completion over the network, in GUIs, etc, where readline
@@ -1739,6 +1785,46 @@ class InteractiveShell(SingletonConfigurable, Magic):
         if self.has_readline:
             self.set_readline_completer()
 
+    def init_completer_object(self):
+        """Create the completer, :attr:`Completer`."""
+        self._completer = self.new_completer(self.has_readline)
+
+    def new_completer(self, use_readline=False):
+        """Return a new completer on the user namespaces.
+
+        It shares the custom completers of :attr:`Completer`, but none of its
+        state, so that e.g. the kernel's control thread can complete while
+        the main thread uses :attr:`Completer`.
+        """
+        from IPython.core.completer import IPCompleter
+        from IPython.core.completerlib import (module_completer,
+                                               magic_run_completer, cd_completer)
+        
+        completer = IPCompleter(self,
+                                self.user_ns,
+                                self.user_global_ns,
+                                self.readline_omit__names,
+                                self.alias_manager.alias_table,
+                                use_readline)
+        
+        # Add custom completers to the basic ones built into IPCompleter
+        completer.custom_completers = self.strdispatchers['complete_command']
+
+        if not self._completer_hooks_set:
+            self._completer_hooks_set = True
+            self.set_hook('complete_command', module_completer, str_key = 'import')
+            self.set_hook('complete_command', module_completer, str_key = 'from')
+            self.set_hook('complete_command', magic_run_completer, str_key = '%run')
+            self.set_hook('complete_command', cd_completer, str_key = '%cd')
+        return completer
+
+    @property
+    def Completer(self):
+        """The completer, created on first use with deferred_init."""
+        if self._completer is None:
+            self.init_completer_object()
+        return self._completer
+
     def complete(self, text, line=None, cursor_pos=None):
         """Return the completed text and a list of completions.
 
@@ -1795,7 +1881,12 @@ class InteractiveShell(SingletonConfigurable, Magic):
 
     def set_readline_completer(self):
         """Reset readline's completer to be our own."""
-        self.readline.set_completer(self.Completer.rlcomplete)
+        if self._completer is None:
+            # Not created yet (deferred_init): create it on the first <tab>
+            self.readline.set_completer(
+                lambda text, state: self.Completer.rlcomplete(text, state))
+        else:
+            self.readline.set_completer(self.Completer.rlcomplete)
 
     def set_completer_frame(self, frame=None):
         """Set the frame of the completer."""
@@ -1818,6 +1909,8 @@ class InteractiveShell(SingletonConfigurable, Magic):
         # History was moved to a separate module
         from . import history
         history.init_ipython(self)
+        from . import memory
+        memory.init_ipython(self)
 
     def magic(self, arg_s, next_input=None):
         """Call a magic function by name.
@@ -2248,16 +2341,29 @@ class InteractiveShell(SingletonConfigurable, Magic):
                 cell_name = self.compile.cache(cell, self.execution_count)
             
                 with self.display_trap:
-                    try:
-                        code_ast = ast.parse(cell, filename=cell_name)
-                    except (OverflowError, SyntaxError, ValueError, TypeError,
-                            MemoryError):
-                        self.showsyntaxerror()
-                        self.execution_count += 1
-                        return None
-            
-                    self.run_ast_nodes(code_ast.body, cell_name,
-                                                        interactivity="last_expr")
+                    codes = self.compile.get_cell_code(cell, cell_name)
+                    if codes is not None:
+                        # This cell was already compiled, just run it again.
+                        for code in codes:
+                            if self.run_code(code):
+                                break
+                    else:
+                        try:
+                            code_ast = ast.parse(cell, filename=cell_name)
+                        except (OverflowError, SyntaxError, ValueError,
+                                TypeError, MemoryError):
+                            self.showsyntaxerror()
+                            self.execution_count += 1
+                            return None
+
+                        flags = self.compile.flags
+                        codes = []
+                        failed = self.run_ast_nodes(code_ast.body, cell_name,
+                                        interactivity="last_expr", codes=codes)
+                        # If execution stopped early, not all nodes were
+                        # compiled.
+                        if failed is False:
+                            self.compile.store_cell_code(cell, flags, codes)
             
                     # Execute any registered post-execution functions.
                     for func, status in self._post_execute.items():
@@ -2277,7 +2383,8 @@ class InteractiveShell(SingletonConfigurable, Magic):
             # Each cell is a *single* input, regardless of how many lines it has
             self.execution_count += 1
             
-    def run_ast_nodes(self, nodelist, cell_name, interactivity='last_expr'):
+    def run_ast_nodes(self, nodelist, cell_name, interactivity='last_expr',
+                      codes=None):
         """Run a sequence of AST nodes. The execution mode depends on the
         interactivity parameter.
         
@@ -2294,6 +2401,12 @@ class InteractiveShell(SingletonConfigurable, Magic):
           will run the last node interactively only if it is an expression (i.e.
           expressions in loops or other blocks are not displayed. Other values
           for this parameter will raise a ValueError.
+        codes : list, optional
+          If given, the code objects compiled from the nodes are appended to
+          it, in execution order.
+
+        Returns True if execution stopped because of an exception, False
+        otherwise.
         """
         if not nodelist:
             return
@@ -2318,12 +2431,16 @@ class InteractiveShell(SingletonConfigurable, Magic):
         for i, node in enumerate(to_run_exec):
             mod = ast.Module([node])
             code = self.compile(mod, cell_name, "exec")
+            if codes is not None:
+                codes.append(code)
             if self.run_code(code):
                 return True
 
         for i, node in enumerate(to_run_interactive):
             mod = ast.Interactive([node])
             code = self.compile(mod, cell_name, "single")
+            if codes is not None:
+                codes.append(code)
             if self.run_code(code):
                 return True
 
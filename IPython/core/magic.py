@@ -27,7 +27,6 @@ import textwrap
 from io import StringIO
 from getopt import getopt,GetoptError
 from pprint import pformat
-from xmlrpc.client import ServerProxy
 import collections
 
 # cProfile was added in Python2.5
@@ -42,7 +41,7 @@ except ImportError:
         profile = pstats = None
 
 import IPython
-from IPython.core import debugger, oinspect
+from IPython.core import oinspect
 from IPython.core.error import TryNext
 from IPython.core.error import UsageError
 from IPython.core.fakemodule import FakeModule
@@ -50,7 +49,6 @@ from IPython.core.profiledir import ProfileDir
 from IPython.core.macro import Macro
 from IPython.core import page
 from IPython.core.prefilter import ESC_MAGIC
-from IPython.lib.pylabtools import mpl_runner
 from IPython.external.Itpl import itpl, printpl
 from IPython.testing.skipdoctest import skip_doctest
 from IPython.utils.io import file_read, nlprint
@@ -58,7 +56,7 @@ from IPython.utils.path import get_py_filename
 from IPython.utils.process import arg_split, abbrev_cwd
 from IPython.utils.terminal import set_term_title
 from IPython.utils.text import LSString, SList, format_screen
-from IPython.utils.timing import clock, clock2
+from IPython.utils.timing import clock, clock2, TimeitResult
 from IPython.utils.warn import warn, error
 from IPython.utils.ipstruct import Struct
 import IPython.utils.generics
@@ -959,7 +957,49 @@ Currently the magic system has the following functions:\n"""
                     print(vstr)
                 else:
                     printpl(vfmt_short)
-                
+
+    @skip_doctest
+    def magic_outcache(self, parameter_s=''):
+        """Show the contents and estimated memory use of the output cache.
+
+        Lists the cached outputs (Out[N] and _N) oldest first, with their type
+        and estimated size, followed by the totals and the configured limits
+        (InteractiveShell.cache_size and InteractiveShell.cache_max_bytes).
+        When a limit is reached, the oldest entries are evicted one by one.
+
+        Examples
+        --------
+        ::
+
+          In [1]: list(range(1000))
+          ...
+
+          In [2]: %outcache
+          Out   Type   Size (bytes)
+          -------------------------
+          1     list   36056
+          1 entries, 36056 bytes (limits: 1000 entries, no byte limit)
+        """
+        dh = self.shell.displayhook
+        info = dh.cache_info()
+        if info:
+            numwidth = max(len(str(info[-1][0])), len('Out')) + 3
+            typewidth = max(max(len(i[1]) for i in info), len('Type')) + 3
+            print('Out'.ljust(numwidth) + 'Type'.ljust(typewidth) +
+                  'Size (bytes)')
+            print('-' * (numwidth + typewidth + len('Size (bytes)')))
+            for n, tname, size in info:
+                print(str(n).ljust(numwidth) + tname.ljust(typewidth) +
+                      str(size))
+        else:
+            print('Output cache is empty.')
+        if dh.cache_max_bytes:
+            byte_limit = '%i bytes' % dh.cache_max_bytes
+        else:
+            byte_limit = 'no byte limit'
+        print('%i entries, %i bytes (limits: %i entries, %s)' %
+              (len(info), dh.cache_bytes, dh.cache_size, byte_limit))
+
     def magic_reset(self, parameter_s=''):
         """Resets the namespace by removing all names defined by the user.
 
@@ -1453,13 +1493,98 @@ Currently the magic system has the following functions:\n"""
         else:
             return None
 
+    @skip_doctest
+    def magic_sprun(self, parameter_s=''):
+        """Run a statement through the sampling profiler.
+
+        Usage:\\
+          %sprun [options] statement
+
+        Unlike %prun, which hooks every function call and so slows down (and
+        distorts the timings of) code making many small calls, %sprun only
+        looks at the stack of the running code at regular intervals.  It
+        reports the fraction of the samples in which each function was running
+        (self%) and on the stack (total%), and the call tree.
+
+        On Unix, the samples are taken from a SIGPROF signal handler, counting
+        CPU time; this works both in the terminal and in the kernel, which run
+        user code in the main thread.  Elsewhere, a background thread samples
+        the stack at regular intervals of wall clock time.
+
+        Options:
+
+        -i <interval>: the sampling interval, in milliseconds (default 1).
+        Note that the system clock may not be able to tick faster than every
+        few milliseconds.
+
+        -l <limit>: only print the <limit> most expensive functions in the
+        flat list (default 20, 0 for all).
+
+        -f <filename>: save the samples as collapsed stacks, one
+        'f1;f2;f3 count' line per distinct stack, the input format of flame
+        graph tools.
+
+        -T <filename>: save the report as shown on screen to a text file.
+
+        -r: return the Sampler object holding the samples, for further
+        analysis.
+
+        Examples
+        --------
+        ::
+
+          In [1]: %sprun -i 5 -f stacks.txt sum(i*i for i in range(10**7))
+        """
+        opts_def = Struct(i=['1'], l=['20'], f=[''], T=[''])
+        # protect user quote marks
+        parameter_s = parameter_s.replace('"',r'\"').replace("'",r"\'")
+        opts, arg_str = self.parse_options(parameter_s, 'i:l:f:rT:',
+                                           list_all=1)
+        opts.merge(opts_def)
+        try:
+            interval = float(opts.i[0]) / 1000
+            limit = int(opts.l[0])
+        except ValueError:
+            raise UsageError('%sprun: -i and -l take numbers')
+        if interval <= 0:
+            raise UsageError('%sprun: the interval must be positive')
+
+        from IPython.lib.sampler import Sampler
+        namespace = self.shell.user_ns
+        sampler = Sampler(interval)
+        try:
+            sampler.runctx(arg_str, namespace, namespace)
+            sys_exit = ''
+        except SystemExit:
+            sys_exit = """*** SystemExit exception caught in code being profiled."""
+
+        output = sampler.report(limit).rstrip()
+        page.page(output)
+        print(sys_exit, end=' ')
+
+        stacks_file = opts.f[0]
+        text_file = opts.T[0]
+        if stacks_file:
+            with open(stacks_file, 'w') as f:
+                f.write(sampler.collapsed_stacks())
+            print('\n*** Collapsed stacks saved to file',
+                  repr(stacks_file)+'.', sys_exit)
+        if text_file:
+            with open(text_file, 'w') as f:
+                f.write(output)
+            print('\n*** Profile printout saved to text file',
+                  repr(text_file)+'.', sys_exit)
+
+        if 'r' in opts:
+            return sampler
+
     @skip_doctest
     def magic_run(self, parameter_s ='',runner=None,
                   file_finder=get_py_filename):
         """Run the named file inside IPython as a program.
 
         Usage:\\
-          %run [-n -i -t [-N<N>] -d [-b<N>] -p [profile options]] file [args]
+          %run [-n -i -t [-N<N>] -L -d [-b<N>] -p [profile options]] file [args]
         
         Parameters after the filename are passed as command-line arguments to
         the program (put in sys.argv). Then, control returns to IPython's
@@ -1523,6 +1648,12 @@ Currently the magic system has the following functions:\n"""
               User  :   0.910862 s,  0.1821724 s.\\
               System:        0.0 s,        0.0 s.
 
+        -L: time the script line by line, and show its source annotated with
+        the number of times each line ran, and the time spent on it.  The time
+        of a line includes that of the functions it calls.  Only the code of
+        the script itself is traced, so the code it calls runs at close to
+        full speed, but the lines of the script run several times slower.
+
         -d: run your program under the control of pdb, the Python debugger.
         This allows you to execute your program step by step, watch variables,
         etc.  Internally, what IPython does is similar to calling:
@@ -1566,7 +1697,7 @@ Currently the magic system has the following functions:\n"""
         """
 
         # get arguments and set sys.argv for program to be run.
-        opts,arg_lst = self.parse_options(parameter_s,'nidtN:b:pD:l:rs:T:e',
+        opts,arg_lst = self.parse_options(parameter_s,'nidtN:b:pD:l:rs:T:eL',
                                           mode='list',list_all=1)
 
         try:
@@ -1632,6 +1763,7 @@ Currently the magic system has the following functions:\n"""
                     stats = self.magic_prun('',0,opts,arg_lst,prog_ns)
                 else:
                     if 'd' in opts:
+                        from IPython.core import debugger
                         deb = debugger.Pdb(self.shell.colors)
                         # reset Breakpoint state, which is moronically kept
                         # in a class
@@ -1671,7 +1803,14 @@ Currently the magic system has the following functions:\n"""
                     else:
                         if runner is None:
                             runner = self.shell.safe_execfile
-                        if 't' in opts:
+                        if 'L' in opts:
+                            # line by line timing
+                            from IPython.lib.linetimer import LineTimer
+                            line_timer = LineTimer(filename)
+                            line_timer.runcall(runner,filename,prog_ns,prog_ns,
+                                               exit_ignore=exit_ignore)
+                            page.page(line_timer.report(self.shell.colors))
+                        elif 't' in opts:
                             # timed execution
                             try:
                                 nruns = int(opts['N'][0])
@@ -1752,7 +1891,7 @@ Currently the magic system has the following functions:\n"""
         """Time execution of a Python statement or expression
 
         Usage:\\
-          %timeit [-n<N> -r<R> [-t|-c]] statement
+          %timeit [-n<N> -r<R> [-t|-c] -e<E> -g -o -b<B> -j<F>] statement
 
         Time execution of a Python statement or expression using the timeit
         module.
@@ -1774,24 +1913,43 @@ Currently the magic system has the following functions:\n"""
         -p<P>: use a precision of <P> digits to display the timing result.
         Default: 3
 
+        -e<E>: keep repeating the loop (<R> times at least) until the
+        standard error of the mean time is below <E> times the mean, e.g.
+        0.01 for 1%, or the loop was repeated 1000 times or for 10 seconds.
+
+        -g: leave garbage collection enabled while timing, as it would be in a
+        real program; by default, it is disabled like in the timeit module.
+
+        -o: return a TimeitResult object with all the timings and their
+        statistics, which can be stored and compared with other results.
+
+        -b<B>: compare the mean time with a baseline: a TimeitResult object
+        named <B> in the namespace, or a result file saved with -j.
+
+        -j<F>: save the result as JSON in the file <F>.
+
         
         Examples:
 
           In [1]: %timeit pass
           10000000 loops, best of 3: 53.3 ns per loop
+          mean 54 ns, std 0.648 ns (rel. error 0.69%), worst 54.6 ns
+          percentiles: 5% 53.4 ns, 25% 53.6 ns, 50% 54 ns, 75% 54.3 ns, 95% 54.5 ns
 
           In [2]: u = None
 
-          In [3]: %timeit u is None
-          10000000 loops, best of 3: 184 ns per loop
+          In [3]: %timeit -e 0.01 u is None
+          10000000 loops, best of 8: 184 ns per loop
+          ...
 
-          In [4]: %timeit -r 4 u == None
-          1000000 loops, best of 4: 242 ns per loop
+          In [4]: r = %timeit -o -r 4 u == None
 
           In [5]: import time
 
-          In [6]: %timeit -n1 time.sleep(2)
+          In [6]: %timeit -n1 -b r time.sleep(2)
           1 loops, best of 3: 2 s per loop
+          ...
+          vs. baseline: 8.26e+06 times slower (mean 2 s vs. 242 ns), significant
           
 
         The times reported by %timeit will be slightly higher than those
@@ -1803,52 +1961,48 @@ Currently the magic system has the following functions:\n"""
         those from %timeit."""
 
         import timeit
-        import math
-
-        # XXX: Unfortunately the unicode 'micro' symbol can cause problems in
-        # certain terminals.  Until we figure out a robust way of
-        # auto-detecting if the terminal can deal with it, use plain 'us' for
-        # microseconds.  I am really NOT happy about disabling the proper
-        # 'micro' prefix, but crashing is worse... If anyone knows what the
-        # right solution for this is, I'm all ears...
-        #
-        # Note: using
-        #
-        # s = u'\xb5'
-        # s.encode(sys.getdefaultencoding())
-        #
-        # is not sufficient, as I've seen terminals where that fails but
-        # print s
-        #
-        # succeeds
-        #
-        # See bug: https://bugs.launchpad.net/ipython/+bug/348466
-        
-        #units = [u"s", u"ms",u'\xb5',"ns"]
-        units = ["s", "ms",'us',"ns"]
-        
-        scaling = [1, 1e3, 1e6, 1e9]
-
-        opts, stmt = self.parse_options(parameter_s,'n:r:tcp:',
+
+        opts, stmt = self.parse_options(parameter_s,'n:r:tcp:e:gob:j:',
                                         posix=False)
         if stmt == "":
             return
         timefunc = timeit.default_timer
         number = int(getattr(opts, "n", 0))
-        repeat = int(getattr(opts, "r", timeit.default_repeat))
+        repeat = int(getattr(opts, "r", 3))
         precision = int(getattr(opts, "p", 3))
+        target = float(getattr(opts, "e", 0))
         if hasattr(opts, "t"):
             timefunc = time.time
         if hasattr(opts, "c"):
             timefunc = clock
 
+        baseline = None
+        if hasattr(opts, "b"):
+            baseline = self.shell.user_ns.get(opts.b)
+            if baseline is None:
+                try:
+                    baseline = TimeitResult.load(opts.b)
+                except (IOError, ValueError, KeyError) as e:
+                    raise UsageError('%%timeit: no baseline %r (%s)' %
+                                     (opts.b, e))
+            if not isinstance(baseline, TimeitResult):
+                raise UsageError('%%timeit: %r is not a TimeitResult' % opts.b)
+
         timer = timeit.Timer(timer=timefunc)
         # this code has tight coupling to the inner workings of timeit.Timer,
         # but is there a better way to achieve that the code stmt has access
-        # to the shell namespace?
-
-        src = timeit.template % {'stmt': timeit.reindent(stmt, 8),
-                                 'setup': "pass"}
+        # to the shell namespace?  The template of the timeit module changes
+        # between Python versions, so we use our own.
+        template = ("def inner(_it, _timer):\n"
+                    "    %(setup)s\n"
+                    "    _t0 = _timer()\n"
+                    "    for _i in _it:\n"
+                    "        %(stmt)s\n"
+                    "    _t1 = _timer()\n"
+                    "    return _t1 - _t0\n")
+        # timeit disables garbage collection while timing
+        setup = "__import__('gc').enable()" if hasattr(opts, "g") else "pass"
+        src = template % {'stmt': timeit.reindent(stmt, 8), 'setup': setup}
         # Track compilation time so it can be reported if too long
         # Minimum time above which compilation time will be reported
         tc_min = 0.1
@@ -1862,27 +2016,41 @@ Currently the magic system has the following functions:\n"""
         timer.inner = ns["inner"]
         
         if number == 0:
-            # determine number so that 0.2 <= total time < 2.0
+            # determine number so that 0.2 <= total time, trying 1, 2, 5, 10,
+            # 20, 50... loops
             number = 1
             for i in range(1, 10):
-                if timer.timeit(number) >= 0.2:
-                    break
-                number *= 10
-        
-        best = min(timer.repeat(repeat, number)) / number
-
-        if best > 0.0 and best < 1000.0:
-            order = min(-int(math.floor(math.log10(best)) // 3), 3)
-        elif best >= 1000.0:
-            order = 0
-        else:
-            order = 3
-        print("%d loops, best of %d: %.*g %s per loop" % (number, repeat,
-                                                          precision,
-                                                          best * scaling[order],
-                                                          units[order]))
+                for n in (number, 2 * number, 5 * number):
+                    if timer.timeit(n) >= 0.2:
+                        break
+                else:
+                    number *= 10
+                    continue
+                number = n
+                break
+        
+        timings = timer.repeat(repeat, number)
+        result = TimeitResult(number, [t / number for t in timings], tc, stmt,
+                              hasattr(opts, "g"), precision)
+        if target > 0:
+            # repeat until the mean is known well enough, within limits
+            max_repeat, max_time = 1000, 10.0
+            elapsed = sum(timings)
+            while (result.rel_error > target and result.repeat < max_repeat
+                   and elapsed < max_time):
+                t = timer.timeit(number)
+                elapsed += t
+                result.timings.append(t / number)
+
+        print(result.summary())
         if tc > tc_min:
             print("Compiler time: %.2f s" % tc)
+        if baseline is not None:
+            print(result.format_comparison(baseline))
+        if hasattr(opts, "j"):
+            result.save(opts.j)
+        if hasattr(opts, "o"):
+            return result
 
     @skip_doctest
     @needs_local_scope
@@ -1978,6 +2146,32 @@ Currently the magic system has the following functions:\n"""
             print("Compiler : %.2f s" % tc)
         return out
 
+    def magic_code_cache(self, parameter_s=''):
+        """Show statistics of the compiled cell cache.
+
+        Cells that are run again with the same source (e.g. with %rerun or
+        macros) reuse the code objects compiled the first time, instead of
+        being parsed and compiled again.
+
+        Usage:\\
+          %code_cache [-c]
+
+        Options:
+
+          -c: clear the cache and reset its statistics.
+        """
+        opts, args = self.parse_options(parameter_s, 'c')
+        compiler = self.shell.compile
+        if 'c' in opts:
+            compiler.clear_code_cache()
+            return
+        hits, misses = compiler.code_cache_hits, compiler.code_cache_misses
+        total = hits + misses
+        rate = 100.0 * hits / total if total else 0.0
+        print("Compiled cells: %i (max %i)" % (len(compiler.code_cache),
+                                               compiler.code_cache_size))
+        print("Hits: %i, misses: %i (hit rate %.1f%%)" % (hits, misses, rate))
+
     @skip_doctest
     def magic_macro(self,parameter_s = ''):
         """Define a macro for future re-execution. It accepts ranges of history,
@@ -2103,6 +2297,7 @@ Currently the magic system has the following functions:\n"""
         except (ValueError, TypeError) as e:
             print(e.args[0])
             return
+        from xmlrpc.client import ServerProxy
         pbserver = ServerProxy('http://paste.pocoo.org/xmlrpc/')
         id = pbserver.pastes.newPaste("python", code)
         return "http://paste.pocoo.org/show/" + id
@@ -3403,6 +3598,7 @@ Defaulting color scheme to 'NoColor'"""
 
     @skip_doctest
     def _pylab_magic_run(self, parameter_s=''):
+        from IPython.lib.pylabtools import mpl_runner
         Magic.magic_run(self, parameter_s,
                         runner=mpl_runner(self.shell.safe_execfile))
 
@@ -0,0 +1,377 @@
+# encoding: utf-8
+"""Memory usage of cell executions.
+
+The :class:`MemoryTracker` is opt-in: once enabled, it records how much
+memory each cell allocated at its peak, and how much it retained, as measured
+by tracemalloc or, failing that, by sampling the resident set size (RSS) of
+the process.  The %memit magic measures a single statement, and %memhist shows
+the records.
+
+Authors:
+
+* The IPython Development Team
+"""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+import os
+import threading
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Our own packages
+from IPython.config.configurable import Configurable
+from IPython.core.error import UsageError
+from IPython.testing.skipdoctest import skip_doctest
+from IPython.utils.traitlets import (Bool, CaselessStrEnum, Dict, Float,
+                                     Instance)
+
+#-----------------------------------------------------------------------------
+# Utilities
+#-----------------------------------------------------------------------------
+
+def current_rss():
+    """Return the resident set size of the process in bytes, or None if it
+    can't be measured (it is read from /proc, so only on Linux)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def format_size(nbytes, sign=False):
+    """Format a number of bytes with a binary unit, e.g. 1536 -> '1.5 KiB'.
+
+    With sign=True, positive numbers get a '+' sign.
+    """
+    if nbytes is None:
+        return '-'
+    size = float(abs(nbytes))
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            break
+        size /= 1024
+    if unit == 'B':
+        text = '%i B' % size
+    else:
+        text = '%.3g %s' % (size, unit)
+    if nbytes < 0:
+        return '-' + text
+    return ('+' + text) if sign else text
+
+#-----------------------------------------------------------------------------
+# Main class
+#-----------------------------------------------------------------------------
+
+class MemoryTracker(Configurable):
+    """Record the memory allocated by each cell execution.
+
+    The measures are taken from a post-execute function, so each one covers
+    the execution of a cell and the display of its output, up to the
+    measures of the next one.  `records` maps the execution counts to
+    (peak, net) tuples of bytes: the peak increase of the memory used during
+    the execution, and the memory it retained.
+    """
+    # An instance of the IPython shell we are attached to
+    shell = Instance('IPython.core.interactiveshell.InteractiveShellABC')
+
+    # Track the memory used by each cell.  Tracing the allocations slows down
+    # the code which makes many of them, so this is off by default.
+    enabled = Bool(False, config=True)
+    # 'tracemalloc' traces the allocations of Python objects, where available;
+    # 'rss' samples the resident set size of the process in a thread, which
+    # also sees the memory allocated by extension modules, but isn't precise.
+    backend = CaselessStrEnum(('tracemalloc', 'rss'), config=True,
+                        default_value='tracemalloc' if tracemalloc else 'rss')
+    # Seconds between the samples of the 'rss' backend.
+    rss_interval = Float(0.01, config=True)
+
+    records = Dict()
+
+    def __init__(self, shell, config=None, **traits):
+        super(MemoryTracker, self).__init__(shell=shell, config=config,
+                                            **traits)
+        self._running = False
+        self._started_tracemalloc = False
+        self._sampler = None
+        # The traced peak before the last reset made by measure(), which the
+        # next measure of the tracker has to take into account
+        self._outer_peak = 0
+        shell.register_post_execute(self.post_execute)
+        if self.enabled:
+            self.start()
+            self._start_count = None
+
+    def _enabled_changed(self, name, old, new):
+        # Only once __init__ is done: the first start is made from there.
+        if not hasattr(self, '_running'):
+            return
+        if new:
+            self.start()
+        else:
+            self.stop()
+
+    #-------------------------------------------------------------------------
+    # Measures
+    #-------------------------------------------------------------------------
+
+    def _measure(self):
+        """Return the memory in use now, and the peak since the last call."""
+        if self.backend == 'tracemalloc':
+            current, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+                peak = max(peak, self._outer_peak)
+                self._outer_peak = 0
+            else:
+                # Only the peak since the tracing started is known
+                peak = None
+            return current, peak
+        current = current_rss()
+        if current is None:
+            # The reading failed, use the last known value
+            current = self._rss_peak
+        peak, self._rss_peak = self._rss_peak, current
+        return current, max(peak, current)
+
+    def _sample_rss(self, stop):
+        while not stop.wait(self.rss_interval):
+            rss = current_rss()
+            if rss is not None and rss > self._rss_peak:
+                self._rss_peak = rss
+
+    def start(self):
+        """Start recording the memory used by cells."""
+        if self._running:
+            return
+        if self.backend == 'tracemalloc':
+            if tracemalloc is None:
+                raise UsageError('tracemalloc is not available, use the rss '
+                                 'backend')
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        else:
+            self._rss_peak = current_rss()
+            if self._rss_peak is None:
+                raise UsageError("The memory used by the process can't be "
+                                 "measured on this platform")
+            stop = threading.Event()
+            thread = threading.Thread(target=self._sample_rss, args=(stop,))
+            thread.daemon = True
+            thread.start()
+            self._sampler = stop
+        self._baseline = self._measure()[0]
+        # The cell turning the tracking on is not measured
+        self._start_count = self.shell.execution_count
+        self._running = True
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording the memory used by cells; the records are kept."""
+        if not self._running:
+            return
+        self._running = False
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self._sampler is not None:
+            self._sampler.set()
+            self._sampler = None
+
+    def post_execute(self):
+        """Record the memory used by the cell which just ran."""
+        if not self._running:
+            return
+        current, peak = self._measure()
+        baseline, self._baseline = self._baseline, current
+        count = self.shell.execution_count
+        if count == self._start_count:
+            return
+        if peak is not None:
+            peak -= baseline
+        net = current - baseline
+        self.records[count] = (peak, net)
+        self.shell.history_manager.store_memory(count, peak, net)
+
+    def measure(self, func, *args, **kw):
+        """Call func(*args, **kw), and return (peak, net, result): the peak
+        increase of memory used during the call, the memory retained, and the
+        result of the call.
+
+        With the tracemalloc backend, the peak is None on the Pythons whose
+        tracemalloc can't reset it (before 3.9)."""
+        if self.backend == 'tracemalloc' and tracemalloc is not None:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            outer_peak = self._outer_peak
+            try:
+                before, traced_peak = tracemalloc.get_traced_memory()
+                can_reset = hasattr(tracemalloc, 'reset_peak')
+                if can_reset:
+                    tracemalloc.reset_peak()
+                    self._outer_peak = 0
+                result = func(*args, **kw)
+                current, peak = tracemalloc.get_traced_memory()
+                # Include the peaks hidden by nested calls
+                peak = max(peak, self._outer_peak)
+            finally:
+                if started:
+                    tracemalloc.stop()
+                    self._outer_peak = outer_peak
+                elif can_reset:
+                    # Keep the peak before the reset for the measures around
+                    # this one, e.g. the tracker's measure of the current cell
+                    self._outer_peak = max(outer_peak, traced_peak,
+                                           self._outer_peak)
+            if can_reset:
+                peak -= before
+            else:
+                # Only the peak since the tracing started is known
+                peak = None
+            return peak, current - before, result
+        # rss: sample in a thread during the call
+        before = current_rss()
+        if before is None:
+            raise UsageError("The memory used by the process can't be "
+                             "measured on this platform")
+        peak = [before]
+        stop = threading.Event()
+        def sample():
+            while not stop.wait(self.rss_interval):
+                rss = current_rss()
+                if rss is not None:
+                    peak[0] = max(peak[0], rss)
+        thread = threading.Thread(target=sample)
+        thread.daemon = True
+        thread.start()
+        try:
+            result = func(*args, **kw)
+        finally:
+            stop.set()
+            thread.join()
+        after = current_rss()
+        if after is None:
+            after = peak[0]
+        return max(peak[0], after) - before, after - before, result
+
+#-----------------------------------------------------------------------------
+# Magics
+#-----------------------------------------------------------------------------
+
+@skip_doctest
+def magic_memit(self, parameter_s=''):
+    """Measure the memory used by a Python statement or expression.
+
+    Usage:\\
+      %memit statement
+
+    Prints the peak increase of memory used while running the statement, and
+    the memory it retained, e.g. by creating new variables.  The memory is
+    measured with the backend of the memory tracker (see %memhist), but
+    %memit works whether the tracker is enabled or not.
+
+    Examples
+    --------
+    ::
+
+      In [1]: %memit x = list(range(10**6))
+      peak: +38.6 MiB, net: +38.6 MiB
+
+      In [2]: %memit sum(list(range(10**6)))
+      peak: +38.6 MiB, net: +0 B
+    """
+    stmt = parameter_s.strip()
+    if not stmt:
+        raise UsageError('%memit: a statement is required')
+    ns = self.shell.user_ns
+    code = compile(stmt, '<magic-memit>', 'exec')
+    tracker = self.shell.memory_tracker
+    peak, net, _ = tracker.measure(exec, code, ns)
+    print('peak: %s, net: %s' % (format_size(peak, True),
+                                 format_size(net, True)))
+
+
+@skip_doctest
+def magic_memhist(self, parameter_s=''):
+    """Show the memory used by each cell, or turn its tracking on or off.
+
+    Usage:\\
+      %memhist [-s] [-n N] [on|off]
+
+    When the memory tracker is on, the peak increase of memory used by each
+    cell and the memory it retained (net) are recorded.  This slows down the
+    code which allocates many objects, so it is off by default; set
+    MemoryTracker.enabled in your configuration to turn it on at startup.
+
+    If HistoryManager.db_log_memory is set, the records are also saved in the
+    memory_history table of the history database, with the session and line
+    numbers of the cells, like the output history.
+
+    Options:
+
+      -s: sort by net memory, largest first, instead of by input number.
+
+      -n N: only show N cells (the last, or with -s the largest, ones).
+
+    Examples
+    --------
+    ::
+
+      In [1]: %memhist on
+
+      In [2]: x = list(range(10**6))
+
+      In [3]: %memhist
+      In         Peak          Net
+       2     38.6 MiB    +38.6 MiB
+    """
+    opts, args = self.parse_options(parameter_s, 'sn:')
+    tracker = self.shell.memory_tracker
+    args = args.strip().lower()
+    if args == 'on':
+        tracker.start()
+        print('Memory tracking on (%s).' % tracker.backend)
+        return
+    elif args == 'off':
+        tracker.stop()
+        print('Memory tracking off.')
+        return
+    elif args:
+        raise UsageError('%%memhist: unknown argument %r' % args)
+
+    records = sorted(tracker.records.items())
+    if not records:
+        if tracker.enabled:
+            print('No cell was run with memory tracking on yet.')
+        else:
+            print('Memory tracking is off; turn it on with %memhist on.')
+        return
+    if 's' in opts:
+        records.sort(key=lambda r: -r[1][1])
+    if 'n' in opts:
+        n = int(opts.n)
+        records = records[:n] if 's' in opts else records[-n:]
+    print('%4s %12s %12s' % ('In', 'Peak', 'Net'))
+    for count, (peak, net) in records:
+        print('%4i %12s %12s' % (count, format_size(peak),
+                                 format_size(net, True)))
+
+
+def init_ipython(ip):
+    ip.define_magic('memit', magic_memit)
+    ip.define_magic('memhist', magic_memhist)
@@ -82,6 +82,12 @@ re_exclude_auto = re.compile(r'^[,&^\|\*/\+-]'
 # nasty enough that I shouldn't change it until I can test it _well_.
 #self.re_fun_name = re.compile (r'[a-zA-Z_]([a-zA-Z0-9_.\[\]]*) ?$')
 
+# RegExp for the lines the default transformers may change, and those starting
+# with an escape character: blank lines, prompts and the 'x = !ls' and
+# 'x = %who' syntax.  Any other line is plain Python to them.
+re_special_line = re.compile(r'\s*([!%,;/?]|>>> |\.\.\.|In \[\d+\]: |$)'
+                             r'|[\w\.,\s]*=\s*[!%]')
+
 
 # Handler Check Utilities
 def is_shadowed(identifier, ip):
@@ -217,6 +223,9 @@ class PrefilterManager(Configurable):
     def __init__(self, shell=None, config=None):
         super(PrefilterManager, self).__init__(shell=shell, config=config)
         self.shell = shell
+        # Handlers found by the checkers for the plain Python lines of the
+        # block being prefiltered (see prefilter_lines), or None.
+        self._handler_cache = None
         self.init_transformers()
         self.init_handlers()
         self.init_checkers()
@@ -386,8 +395,15 @@ class PrefilterManager(Configurable):
             # This is how the default python prompt works.
             return ''
 
+        # Plain Python lines are left alone by the default transformers, and
+        # reuse the handler already found for lines that look the same to the
+        # default checkers.
+        handler_cache = self._handler_cache
+        plain = handler_cache is not None and not re_special_line.match(line)
+
         # At this point, we invoke our transformers.
-        if not continue_prompt or (continue_prompt and self.multi_line_specials):
+        if not plain and (not continue_prompt or
+                          (continue_prompt and self.multi_line_specials)):
             line = self.transform_line(line, continue_prompt)
 
         # Now we compute line_info for the checkers and handlers
@@ -407,10 +423,32 @@ class PrefilterManager(Configurable):
         if continue_prompt and not self.multi_line_specials:
             return normal_handler.handle(line_info)
 
+        # With autocall, dotted names are looked up with getattr, which may
+        # have side effects: those lines go through the checkers every time.
+        if plain and not (self.shell.autocall and '.' in line_info.ifun):
+            key = (line_info.ifun, line_info.the_rest[:1],
+                   line[-1] == ESC_HELP, line.endswith('# PYTHON-MODE'),
+                   continue_prompt,
+                   re_exclude_auto.match(line_info.the_rest) is None)
+            handler = handler_cache.get(key)
+            if handler is None:
+                handler = handler_cache[key] = self.find_handler(line_info)
+            return handler.handle(line_info)
+
         prefiltered = self.prefilter_line_info(line_info)
         # print "prefiltered line: %r" % prefiltered
         return prefiltered
 
+    def _cacheable(self):
+        """Whether the handlers found by the checkers only depend on the
+        features of a line used as key in prefilter_line.
+
+        This holds for the default transformers and checkers.
+        """
+        return (all(type(t) in _default_transformers
+                    for t in self._transformers) and
+                all(type(c) in _default_checkers for c in self._checkers))
+
     def prefilter_lines(self, lines, continue_prompt=False):
         """Prefilter multiple input lines of text.
 
@@ -423,17 +461,25 @@ class PrefilterManager(Configurable):
         entry and presses enter.
         """
         llines = lines.rstrip('\n').split('\n')
-        # We can get multiple lines in one shot, where multiline input 'blends'
-        # into one line, in cases like recalling from the readline history
-        # buffer.  We need to make sure that in such cases, we correctly
-        # communicate downstream which line is first and which are continuation
-        # ones.
-        if len(llines) > 1:
-            out = '\n'.join([self.prefilter_line(line, lnum>0)
-                             for lnum, line in enumerate(llines) ])
-        else:
-            out = self.prefilter_line(llines[0], continue_prompt)
-            
+        # The namespaces can't change while a block is prefiltered, so the
+        # handlers found for its lines can be reused for the following ones.
+        # Nested calls (e.g. from a handler) don't share the cache.
+        outer_cache = self._handler_cache
+        self._handler_cache = {} if self._cacheable() else None
+        try:
+            # We can get multiple lines in one shot, where multiline input
+            # 'blends' into one line, in cases like recalling from the readline
+            # history buffer.  We need to make sure that in such cases, we
+            # correctly communicate downstream which line is first and which
+            # are continuation ones.
+            if len(llines) > 1:
+                out = '\n'.join([self.prefilter_line(line, lnum>0)
+                                 for lnum, line in enumerate(llines) ])
+            else:
+                out = self.prefilter_line(llines[0], continue_prompt)
+        finally:
+            self._handler_cache = outer_cache
+
         return out
 
 #-----------------------------------------------------------------------------
@@ -30,7 +30,8 @@ from IPython.config.application import boolean_flag
 from IPython.config.configurable import Configurable
 from IPython.config.loader import Config
 from IPython.utils.path import filefind
-from IPython.utils.traitlets import Unicode, Instance, List
+from IPython.utils.timing import StepTimer
+from IPython.utils.traitlets import Bool, Unicode, Instance, List
 
 #-----------------------------------------------------------------------------
 # Aliases and Flags
@@ -79,6 +80,16 @@ addflag('deep-reload', 'InteractiveShell.deep_reload',
     dreload()].""",
     "Disable deep (recursive) reloading by default."
 )
+addflag('deferred-init', 'InteractiveShell.deferred_init',
+    """Start faster by deferring the initialization of rarely needed
+    subsystems (the completer, the history database) until their first
+    use.""",
+    "Initialize all the subsystems of the shell at startup."
+)
+shell_flags['startup-profile'] = (
+    {'InteractiveShellApp' : {'startup_profile' : True}},
+    "Print how long each step of the startup took."
+)
 nosep_config = Config()
 nosep_config.InteractiveShell.separate_in = ''
 nosep_config.InteractiveShell.separate_out = ''
@@ -134,10 +145,29 @@ class InteractiveShellApp(Configurable):
     code_to_run = Unicode('', config=True,
         help="Execute the given command string."
     )
+    startup_profile = Bool(False, config=True,
+        help="Print how long each step of the startup took."
+    )
+    # The time taken by the startup steps of the application; those of the
+    # shell are in its own startup_timer.
+    startup_timer = Instance(StepTimer, ())
     shell = Instance('IPython.core.interactiveshell.InteractiveShellABC')
 
     def init_shell(self):
         raise NotImplementedError("Override in subclasses")
+
+    def startup_report(self):
+        """Return a table of the time taken by each step of the startup of
+        the application, and of the initialization of its shell."""
+        report = self.startup_timer.report('Application startup')
+        if self.shell is not None:
+            report += self.shell.startup_timer.report('Shell initialization')
+        return report
+
+    def print_startup_profile(self):
+        """Print the startup report to stderr, if startup_profile is set."""
+        if self.startup_profile:
+            sys.__stderr__.write(self.startup_report())
     
     def init_extensions(self):
         """Load all IPython extensions in IPythonApp.extensions.
@@ -2,8 +2,11 @@
 """Tests for IPython.core.application"""
 
 import os
+import shutil
 import tempfile
 
+import nose.tools as nt
+
 from IPython.core.application import BaseIPythonApplication
 from IPython.testing import decorators as testdec
 
@@ -47,3 +50,52 @@ def test_unicode_ipdir():
             os.environ["IPYTHONDIR"] = old_ipdir1
         if old_ipdir2:
             os.environ["IPYTHONDIR"] = old_ipdir2
+
+def test_cache_config():
+    """The config of the files is loaded from the cache when it's up to date"""
+    ipdir = tempfile.mkdtemp()
+    def write(text, mtime=1e9):
+        config_file = os.path.join(app.profile_dir.location,
+                                   'ipython_config.py')
+        with open(config_file, 'w') as f:
+            f.write(text)
+        # old enough to be cached
+        os.utime(config_file, (mtime, mtime))
+    def load():
+        app = BaseIPythonApplication(cache_config=True)
+        app.ipython_dir = ipdir
+        app.init_profile_dir()
+        app.init_config_files()
+        app.load_config_file(suppress_errors=False)
+        return app
+    try:
+        app = load()
+        write('c = get_config()\nc.Foo.bar = 1\n')
+        nt.assert_equal(load().config.Foo.bar, 1)
+        # Same size and mtime: the file isn't read again
+        write('raise ValueError("not read!")\n\n')
+        nt.assert_equal(load().config.Foo.bar, 1)
+        write('c = get_config()\nc.Foo.bar = 2\n', 1e9 + 1)
+        nt.assert_equal(load().config.Foo.bar, 2)
+    finally:
+        shutil.rmtree(ipdir)
+
+def test_cache_config_from_file():
+    """cache_config can be set in a config file"""
+    ipdir = tempfile.mkdtemp()
+    try:
+        app = BaseIPythonApplication()
+        app.ipython_dir = ipdir
+        app.init_profile_dir()
+        app.init_config_files()
+        config_file = os.path.join(app.profile_dir.location,
+                                   'ipython_config.py')
+        with open(config_file, 'w') as f:
+            f.write('c = get_config()\n'
+                    'c.BaseIPythonApplication.cache_config = True\n'
+                    'c.Foo.bar = 1\n')
+        app.load_config_file(suppress_errors=False)
+        nt.assert_true(app.cache_config)
+        nt.assert_equal(app.config.Foo.bar, 1)
+    finally:
+        shutil.rmtree(ipdir)
@@ -15,6 +15,7 @@
 
 
 # Stdlib imports
+import gc
 import linecache
 import sys
 
@@ -70,3 +71,61 @@ def test_compiler_check_cache():
             break
     else:
         raise AssertionError('Entry for input-99 missing from linecache')
+
+def test_code_cache():
+    """Compiled cells are reused only with the same source and flags"""
+    cp = compilerop.CachingCompiler()
+    name = cp.cache('def f(): 1/0', 1)
+    code = cp('def f(): 1/0', name, 'exec')
+    cp.store_cell_code('def f(): 1/0', cp.flags, [code])
+    nt.assert_equal(cp.get_cell_code('x=1', name), None)
+    name2 = cp.cache('def f(): 1/0', 2)
+    codes = cp.get_cell_code('def f(): 1/0', name2)
+    nt.assert_equal(len(codes), 1)
+    # the code objects are renamed, including nested ones
+    nt.assert_equal(codes[0].co_filename, name2)
+    nt.assert_equal(codes[0].co_consts[0].co_filename, name2)
+    nt.assert_equal((cp.code_cache_hits, cp.code_cache_misses), (1, 1))
+    # different flags, different entry
+    cp.flags |= __import__('__future__').division.compiler_flag
+    nt.assert_equal(cp.get_cell_code('def f(): 1/0', name2), None)
+
+def test_code_cache_size():
+    cp = compilerop.CachingCompiler()
+    cp.code_cache_size = 2
+    for i in range(3):
+        src = 'x=%i' % i
+        cp.store_cell_code(src, cp.flags, [cp(src, '<test>', 'exec')])
+    nt.assert_equal([k[0] for k in cp.code_cache], ['x=1', 'x=2'])
+
+def test_linecache_eviction():
+    """Old cell sources are dropped from linecache unless their code lives"""
+    cp = compilerop.CachingCompiler()
+    size = compilerop.CachingCompiler.linecache_size
+    cp.linecache_size = 3
+    try:
+        kept = cp.cache('def kept(): 1/0', 1000)
+        ns = {}
+        exec(cp('def kept(): 1/0', kept, 'exec'), ns)
+        names = [cp.cache('x=%i' % i, 1001 + i) for i in range(5)]
+        nt.assert_true(kept in linecache.cache)
+        nt.assert_false(names[0] in linecache.cache)
+        nt.assert_true(names[-1] in linecache.cache)
+        # Once the function is gone, its source may go too
+        del ns
+        gc.collect()
+        cp.cache('x=5', 1006)
+        nt.assert_false(kept in linecache.cache)
+    finally:
+        cp.linecache_size = size
+        cp.evict_linecache()
+
+def test_check_cache_restores():
+    cp = compilerop.CachingCompiler()
+    name = cp.cache('x=1', 98)
+    linecache.clearcache()
+    cp.check_cache()
+    nt.assert_true(name in linecache.cache)
+    del linecache.cache[name]
+    cp.check_cache(name)
+    nt.assert_true(name in linecache.cache)
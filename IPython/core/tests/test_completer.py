@@ -181,3 +181,44 @@ def test_local_file_completions():
     finally:
         # prevent failures from making chdir stick
         os.chdir(cwd)
+
+
+def test_name_index():
+    ns = dict(alpha=1, beta=2, alphabet=3)
+    index = completer.NameIndex(ns)
+    index.update()
+    nt.assert_equal(index.matches('alp'), ['alpha', 'alphabet'])
+    nt.assert_equal(index.matches(''), ['alpha', 'alphabet', 'beta'])
+    # Changes are picked up: many at once, and a few from the sorted list
+    ns.update(alps=4, **dict(('x%i' % i, i) for i in range(20)))
+    del ns['alpha']
+    index.update()
+    nt.assert_equal(index.matches('alp'), ['alphabet', 'alps'])
+    names = index.names
+    ns['alpine'] = 5
+    del ns['beta']
+    index.update()
+    nt.assert_true(index.names is names)
+    nt.assert_equal(index.matches('alp'), ['alphabet', 'alpine', 'alps'])
+    nt.assert_equal(index.matches('b'), [])
+
+
+def test_global_matches():
+    ip = get_ipython()
+    ip.user_ns['zzz_complete_me'] = 1
+    try:
+        nt.assert_equal(ip.complete('zzz_comp')[1], ['zzz_complete_me'])
+        del ip.user_ns['zzz_complete_me']
+        ip.user_ns['zzz_complete_you'] = 1
+        ip.run_cell('pass')
+        nt.assert_equal(ip.complete('zzz_comp')[1], ['zzz_complete_you'])
+        # Names swapped without running code, at the same namespace size
+        del ip.user_ns['zzz_complete_you']
+        ip.user_ns['zzz_complete_me'] = 1
+        nt.assert_equal(ip.complete('zzz_comp')[1], ['zzz_complete_me'])
+    finally:
+        ip.user_ns.pop('zzz_complete_me', None)
+        ip.user_ns.pop('zzz_complete_you', None)
+    c = completer.Completer({'__builtins__': 1, 'printer': 2})
+    nt.assert_equal(c.global_matches('pri'), ['print', 'printer'])
+    nt.assert_false('__builtins__' in c.global_matches('_'))
@@ -9,7 +9,8 @@ except:
     numpy = None
 import nose.tools as nt
 
-from IPython.core.formatters import FormatterABC, PlainTextFormatter
+from IPython.core.formatters import (FormatterABC, PlainTextFormatter,
+                                     DisplayFormatter)
 
 class A(object):
     def __repr__(self):
@@ -34,6 +35,46 @@ def test_pretty():
 def test_deferred():
     f = PlainTextFormatter()
 
+def test_type_cache():
+    """Cached class lookups follow changes to the printer registries"""
+    f = PlainTextFormatter()
+    nt.assert_equals(f(B()), 'B()')
+    f.for_type(A, foo_printer)
+    nt.assert_equals(f(B()), 'foo')
+    f.for_type(B, lambda obj, p, cycle: p.text('bar'))
+    nt.assert_equals(f(B()), 'bar')
+    nt.assert_equals(f(A()), 'foo')
+    # Swapping printers without changing the size of the registry
+    del f.type_printers[B]
+    f.type_printers[int] = lambda obj, p, cycle: p.text('int')
+    f.clear_type_cache()
+    nt.assert_equals(f(B()), 'foo')
+    printers = dict(f.type_printers)
+    printers[B] = lambda obj, p, cycle: p.text('qux')
+    f.type_printers = printers
+    nt.assert_equals(f(B()), 'qux')
+    del f.type_printers[B]
+    f.for_type_by_name(__name__, 'B', lambda obj, p, cycle: p.text('baz'))
+    nt.assert_equals(f(B()), 'baz')
+    nt.assert_equals(f([B(), A()]), '[baz, foo]')
+
+class C(object):
+    svg_calls = 0
+    def _repr_html_(self):
+        return '<b>C</b>'
+    def _repr_svg_(self):
+        C.svg_calls += 1
+        return '<svg/>'
+
+def test_active_types():
+    df = DisplayFormatter(active_types=['text/html'])
+    fd = df.format(C())
+    nt.assert_equals(sorted(fd), ['text/html', 'text/plain'])
+    nt.assert_equals(C.svg_calls, 0)
+    nt.assert_equals(fd['text/html'], '<b>C</b>')
+    nt.assert_equals(list(df.format(C(), include=['text/html'])),
+                     ['text/html'])
+
 def test_precision():
     """test various values for float_precision."""
     f = PlainTextFormatter()
@@ -72,3 +113,21 @@ def test_bad_precision():
     nt.assert_raises(ValueError, set_fp, -1)
 
 
+
+def test_max_seq_length():
+    f = PlainTextFormatter(max_seq_length=3)
+    nt.assert_equals(f(list(range(10))), '[0, 1, 2, ...]')
+    nt.assert_equals(f(list(range(3))), '[0, 1, 2]')
+    nt.assert_equals(f(dict.fromkeys(range(10), 0)), '{0: 0, 1: 0, 2: 0, ...}')
+    f.max_seq_length = 0
+    nt.assert_equals(f(list(range(5))), '[0, 1, 2, 3, 4]')
+
+def test_max_depth():
+    f = PlainTextFormatter(max_depth=2)
+    nt.assert_equals(f([1, [2, [3, [4]]]]), '[1, [2, [...]]]')
+
+def test_max_chars():
+    f = PlainTextFormatter(max_chars=20)
+    out = f(list(range(10**6)))
+    nt.assert_equals(out, '[0, 1, 2, 3, 4, 5, 6...')
+    nt.assert_equals(f('x' * 10**6), "'" + 'x' * 19 + '...')
@@ -12,10 +12,12 @@ import unittest
 
 # third party
 import nose.tools as nt
+from nose import SkipTest
 
 # our own packages
 from IPython.utils.tempdir import TemporaryDirectory
-from IPython.core.history import HistoryManager, extract_hist_ranges
+from IPython.core.history import (HistoryManager, extract_hist_ranges,
+                                  glob_fts_query)
 
 def setUp():
     nt.assert_equal(sys.getdefaultencoding(), "utf-8")
@@ -69,6 +71,31 @@ def test_history():
             nt.assert_equal(list(gothist), [(1,2,hist[1])] )
             gothist = ip.history_manager.search("b*", output=True)
             nt.assert_equal(list(gothist), [(1,3,(hist[2],"spam"))] )
+            gothist = ip.history_manager.search("*=*", n=2)
+            nt.assert_equal(list(gothist), [(2, 1, newcmds[0]),
+                                            (2, 3, newcmds[2])])
+            
+            # Check paging with limit and offset
+            gothist = ip.history_manager.get_tail(4, include_latest=True,
+                                                  limit=2, offset=1)
+            nt.assert_equal(list(gothist), [(2, 1, newcmds[0]),
+                                            (2, 2, newcmds[1])])
+            gothist = ip.history_manager.get_range(-1, 1, 4, limit=2,
+                                                   offset=2)
+            nt.assert_equal(list(gothist), [(1, 3, hist[2])])
+            gothist = ip.history_manager.get_range(start=1, stop=4, limit=1,
+                                                   offset=1)
+            nt.assert_equal(list(gothist), [(0, 2, newcmds[1])])
+            gothist = ip.history_manager.search("*=*", limit=2, offset=1)
+            nt.assert_equal(list(gothist), [(1, 2, hist[1]),
+                                            (1, 3, hist[2])])
+            gothist = ip.history_manager.search("*=*", n=2, offset=1)
+            nt.assert_equal(list(gothist), [(2, 3, newcmds[2])])
+            
+            # Check unique search, keeping the latest occurrence
+            ip.history_manager.store_inputs(4, newcmds[0])
+            gothist = ip.history_manager.search("z*", unique=True)
+            nt.assert_equal(list(gothist), [(2, 4, newcmds[0])])
             
             # Cross testing: check that magic %save can get previous session.
             testfilename = os.path.realpath(os.path.join(tmpdir, "test.py"))
@@ -87,6 +114,260 @@ def test_history():
             ip.history_manager = hist_manager_ori
 
 
+def test_fulltext_search():
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = HistoryManager(shell=ip, hist_file=hist_file,
+                                                config=None, fts_index=True)
+            hm = ip.history_manager
+            if not hm.fts_index:
+                raise SkipTest("sqlite without FTS4")
+            hist = ['import numpy', 'x = numpy.arange(10)', 'y = x**2',
+                    'print(numpyversion)']
+            for i, h in enumerate(hist, start=1):
+                hm.store_inputs(i, h)
+            gothist = hm.fulltext_search('numpy')
+            nt.assert_equal([l for s, l, src in gothist], [2, 1])
+            # prefix query, most recent first
+            gothist = hm.fulltext_search('numpy*')
+            nt.assert_equal([l for s, l, src in gothist], [4, 2, 1])
+            gothist = hm.fulltext_search('numpy*', n=1)
+            nt.assert_equal(list(gothist), [(hm.session_number, 4, hist[3])])
+            
+            # The index is kept up to date across sessions
+            hm.reset()
+            hm.store_inputs(1, 'z = numpy.zeros(3)')
+            gothist = hm.fulltext_search('zeros')
+            nt.assert_equal(list(gothist), [(hm.session_number, 1,
+                                             'z = numpy.zeros(3)')])
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
+def test_glob_fts_query():
+    nt.assert_equal(glob_fts_query('numpy.ara*'), '"numpy" "ara*"')
+    nt.assert_equal(glob_fts_query('*x = np?[ab]*'), '"np*"')
+    nt.assert_equal(glob_fts_query('*import numpy as np'),
+                    '"numpy" "as" "np"')
+    # Words which may start before a wildcard can't be looked up
+    nt.assert_equal(glob_fts_query('*umpy*'), None)
+    nt.assert_equal(glob_fts_query('a[bc]d*'), '"a*"')
+    # unless the index words they may be part of can be looked up
+    globs = []
+    def find_terms(glob):
+        globs.append(glob)
+        return {'*umpy*': ['numpy', 'numpyversion'], '*x': None}.get(glob, [])
+    nt.assert_equal(glob_fts_query('*umpy*', find_terms),
+                    '"numpy" OR "numpyversion"')
+    nt.assert_equal(glob_fts_query('*Foo', find_terms), '"Foo"')
+    nt.assert_equal(glob_fts_query('*x = np?[ab]*', find_terms), '"np*"')
+    nt.assert_equal(globs, ['*umpy*', '*foo', '*x'])
+
+
+def test_search_fts():
+    """search narrows down the lines to match with the full-text index"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = HistoryManager(shell=ip, hist_file=hist_file,
+                                                config=None, fts_index=True)
+            hm = ip.history_manager
+            if not hm.fts_index:
+                raise SkipTest("sqlite without FTS4")
+            hist = ['import numpy', 'x = numpy.arange(10)', 'y = x**2',
+                    'print(numpyversion)', 'x = Numpy.arange(3)']
+            for i, h in enumerate(hist, start=1):
+                hm.store_inputs(i, h)
+            hm.index_fts()
+            nt.assert_true(hm.fts_ready.is_set())
+            # The same results as a plain GLOB scan
+            for pattern, lines in [('*numpy*', [1, 2, 4]),
+                                   ('*numpy.ara*', [2]),
+                                   ('x = ?umpy*', [2, 5]),
+                                   ('*umpy*', [1, 2, 4, 5])]:
+                gothist = hm.search(pattern)
+                nt.assert_equal([l for s, l, src in gothist], lines)
+            gothist = hm.search('*numpy*', n=1)
+            nt.assert_equal([l for s, l, src in gothist], [4])
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
+def test_hist_glob_fts():
+    """%hist -g looks up the words of its pattern in the full-text index"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = HistoryManager(shell=ip, hist_file=hist_file,
+                                                config=None, fts_index=True)
+            hm = ip.history_manager
+            if not hm.fts_index:
+                raise SkipTest("sqlite without FTS4")
+            hist = ['import numpy', 'x = numpy.arange(10)', 'y = x**2']
+            for i, h in enumerate(hist, start=1):
+                hm.store_inputs(i, h)
+            hm.index_fts()
+            queries = []
+            run_sql = hm._run_sql
+            def _run_sql(sql, params, *args, **kwargs):
+                queries.append(sql)
+                return run_sql(sql, params, *args, **kwargs)
+            hm._run_sql = _run_sql
+            ip.magic('hist -g umpy')
+            nt.assert_equal(len(queries), 1)
+            nt.assert_true('history_fts' in queries[0])
+            gothist = hm.search('*umpy*')
+            nt.assert_equal([l for s, l, src in gothist], [1, 2])
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
+def test_fts_backfill():
+    """The saving thread indexes the history recorded without the index"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = hm = HistoryManager(shell=ip,
+                                                     hist_file=hist_file)
+            hm.store_inputs(1, 'import numpy')
+            hm.store_inputs(2, 'x = numpy.arange(10)')
+            hm.writeout_cache()
+            ip.history_manager = hm = HistoryManager(shell=ip,
+                                hist_file=hist_file, fts_index=True)
+            if not hm.fts_index:
+                raise SkipTest("sqlite without FTS4")
+            hm.fts_ready.wait(10)
+            nt.assert_true(hm.fts_ready.is_set())
+            hm.store_inputs(1, 'y = numpy.zeros(3)')
+            gothist = hm.fulltext_search('numpy')
+            nt.assert_equal([l for s, l, src in gothist], [1, 2, 1])
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
+def test_deferred_open():
+    """With deferred_init, the database is opened by the first input"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        ip.deferred_init = True
+        try:
+            ip.history_manager = hm = HistoryManager(shell=ip,
+                                                     hist_file=hist_file)
+            nt.assert_equal(hm.db, None)
+            nt.assert_equal(hm.save_thread, None)
+            nt.assert_false(os.path.exists(hist_file))
+            # Nothing to do without a session
+            hm.reset()
+            hm.end_session()
+            nt.assert_equal(hm.db, None)
+
+            hm.store_inputs(1, 'a=1')
+            nt.assert_not_equal(hm.db, None)
+            nt.assert_true(hm.save_thread.is_alive())
+            nt.assert_not_equal(hm.session_number, 0)
+            hm.store_inputs(2, 'b=2')
+            hm.writeout_cache()
+            nt.assert_equal(list(hm.get_tail(2, include_latest=True)),
+                            [(hm.session_number, 1, 'a=1'),
+                             (hm.session_number, 2, 'b=2')])
+            hm.save_thread.stop()
+        finally:
+            ip.deferred_init = False
+            ip.history_manager = hist_manager_ori
+
+
+def test_db_pragmas():
+    """The history file is opened with the configured journal/sync modes"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = hm = HistoryManager(shell=ip,
+                                                     hist_file=hist_file)
+            nt.assert_equal(hm.db_journal_mode, 'wal')
+            for conn in (hm.db, hm.connect()):
+                mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                nt.assert_equal(mode, 'wal')
+                # 1 is NORMAL
+                sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+                nt.assert_equal(sync, 1)
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
+class _NoWALConnection(object):
+    """Stand-in for a connection to a file on which WAL isn't available."""
+    def __init__(self):
+        self.sql = []
+
+    def execute(self, sql):
+        self.sql.append(sql)
+        return self
+
+    def fetchone(self):
+        return ('delete',)
+
+
+def test_journal_mode_fallback():
+    """Without WAL support, the history file falls back to 'delete'"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        hm = HistoryManager(shell=ip, hist_file=hist_file)
+        hm.save_thread.stop()
+        conn = _NoWALConnection()
+        hm.init_journal_mode(conn)
+        nt.assert_equal(conn.sql, ["PRAGMA journal_mode=wal",
+                                   "PRAGMA journal_mode=delete"])
+        nt.assert_equal(hm.db_journal_mode, 'delete')
+
+
+def test_batched_writeout():
+    """A cached batch of inputs and outputs is written out completely"""
+    ip = get_ipython()
+    with TemporaryDirectory() as tmpdir:
+        hist_manager_ori = ip.history_manager
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        try:
+            ip.history_manager = hm = HistoryManager(shell=ip,
+                        hist_file=hist_file, db_cache_size=100,
+                        db_log_output=True)
+            n = 50
+            for i in range(1, n+1):
+                hm.store_inputs(i, 'a = %d' % i)
+                hm.output_hist_reprs[i] = repr(i)
+                hm.store_output(i)
+            nt.assert_equal(len(hm.db_input_cache), n)
+            nt.assert_equal(len(hm.db_output_cache), n)
+            hm.writeout_cache()
+            nt.assert_equal(hm.db_input_cache, [])
+            nt.assert_equal(hm.db_output_cache, [])
+            # Read back through a separate connection
+            conn = hm.connect()
+            session = (hm.session_number,)
+            rows = conn.execute("SELECT line, source FROM history WHERE "
+                                "session=? ORDER BY line", session).fetchall()
+            nt.assert_equal(rows, [(i, 'a = %d' % i) for i in range(1, n+1)])
+            rows = conn.execute("SELECT line, output FROM output_history WHERE "
+                                "session=? ORDER BY line", session).fetchall()
+            nt.assert_equal(rows, [(i, repr(i)) for i in range(1, n+1)])
+            conn.close()
+        finally:
+            ip.history_manager = hist_manager_ori
+
+
 def test_extract_hist_ranges():
     instr = "1 2/3 ~4/5-6 ~4/7-~4/9 ~9/2-~7/5"
     expected = [(0, 1, 2),  # 0 == current session
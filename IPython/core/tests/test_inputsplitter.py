@@ -253,6 +253,26 @@ class InputSplitterTestCase(unittest.TestCase):
         isp.push('  a = 1')
         self.assertFalse(isp.push('b = [1,'))
             
+    def test_push_incremental(self):
+        # In cell mode, inputs must be fed in whole blocks, so skip this test
+        if self.isp.input_mode == 'cell': return
+
+        isp = self.isp
+        for line in ['x = 1', "y = '''", 'if 1:', "'''", 'z = [1,']:
+            isp.push(line)
+        self.assertFalse(isp.push('  # ]'))
+        self.assertTrue(isp.push(']'))
+        self.assertFalse(isp.push('try: x = 1'))
+        self.assertTrue(isp.push('except: pass'))
+        self.assertFalse(isp.push('@dec'))
+        self.assertTrue(isp.push('def f(): pass'))
+        self.assertTrue(isp.push('if x == "#": pass'))
+        self.assertFalse(isp.push('if x == "#":'))
+        self.assertTrue(isp.push('    pass'))
+        self.assertTrue(isp.code is not None)
+        self.assertTrue(isp.push('from __future__ import division'))
+        self.assertEqual(isp.code, None)
+
     def test_replace_mode(self):
         isp = self.isp
         isp.input_mode = 'cell'
@@ -114,3 +114,82 @@ class InteractiveShellTestCase(unittest.TestCase):
         ip.run_cell('!(true)\n\n\n', False)
 
 
+
+    def test_output_cache_eviction(self):
+        """The output cache evicts its oldest entries one at a time"""
+        ip = get_ipython()
+        dh = ip.displayhook
+        hm = ip.history_manager
+        save = dh.cache_size, dh.cache_max_bytes, hm.db_log_output
+        try:
+            dh.flush()
+            dh.cache_size = 3
+            hm.db_log_output = True
+            first = ip.execution_count
+            for i in range(5):
+                ip.run_cell('%i' % (100+i), store_history=True)
+            last = ip.execution_count - 1
+            self.assertEquals(sorted(ip.user_ns['Out']),
+                              [last-2, last-1, last])
+            self.assertFalse('_%i' % (last-3) in ip.user_ns)
+            self.assertEquals(ip.user_ns['_%i' % last], 104)
+            self.assertEquals(ip.user_ns['___'], 102)
+            # the text reprs are evicted too, once queued for the database
+            reprs = hm.output_hist_reprs
+            self.assertEquals(sorted(n for n in reprs if n >= first),
+                              [last-2, last-1, last])
+            hm.writeout_cache()
+            cur = hm.get_db().execute("SELECT output FROM output_history "
+                                      "WHERE session=? AND line=?",
+                                      (hm.session_number, last-3))
+            self.assertEquals(cur.fetchone(), ('101',))
+            # a second output for the same prompt replaces the first's size
+            nbytes = dh.cache_bytes
+            dh.update_user_ns(104)
+            self.assertEquals(dh.cache_bytes, nbytes)
+            # byte budget: a big output pushes out everything older
+            dh.cache_size = 1000
+            dh.cache_max_bytes = 10000
+            ip.run_cell('list(range(1000))', store_history=True)
+            self.assertEquals(list(ip.user_ns['Out']), [ip.execution_count-1])
+            self.assertEquals(ip.user_ns['__'], 104)
+        finally:
+            dh.cache_size, dh.cache_max_bytes, hm.db_log_output = save
+            dh.flush()
+
+    def test_compiled_cell_cache(self):
+        """Re-running a cell reuses its code, and its __future__ flags"""
+        ip = get_ipython()
+        ip.compile.clear_code_cache()
+        cell = 'from __future__ import annotations\ndef f(x: undefined): pass'
+        flags = ip.compile.flags
+        ip.run_cell(cell)
+        new_flags = ip.compile.flags
+        ip.compile.flags = flags
+        ip.run_cell(cell)
+        self.assertEquals(ip.compile.code_cache_hits, 1)
+        self.assertEquals(ip.compile.flags, new_flags)
+        ip.compile.flags = flags
+        # cells that raised are not cached
+        ip.run_cell('1/0\nzz = 1')
+        ip.run_cell('1/0\nzz = 1')
+        self.assertEquals(ip.compile.code_cache_hits, 1)
+
+    def test_deferred_completer(self):
+        """The completer can be created on first use"""
+        ip = get_ipython()
+        completer = ip.Completer
+        try:
+            ip._completer = None
+            self.assertEquals(ip.complete('_ip.comple')[1], ['_ip.complete'])
+            self.assertTrue(ip._completer is not None)
+            self.assertTrue(ip._completer is not completer)
+        finally:
+            ip._completer = completer
+
+    def test_startup_timer(self):
+        ip = get_ipython()
+        names = [name for name, t in ip.startup_timer.steps]
+        self.assertTrue('init_history' in names)
+        self.assertTrue('init_completer' in names)
+        self.assertTrue('init_completer' in ip.startup_timer.report())
@@ -16,7 +16,10 @@ from io import StringIO
 
 import nose.tools as nt
 
+from IPython.core.error import UsageError
 from IPython.utils.path import get_long_path_name
+from IPython.utils.tempdir import TemporaryDirectory
+from IPython.utils.timing import TimeitResult
 from IPython.testing import decorators as dec
 from IPython.testing import tools as tt
 
@@ -460,3 +463,38 @@ def doctest_precision():
     Out[5]: '3.141593e+00'
     """
 
+
+def test_sprun():
+    _ip.user_ns['busy'] = lambda: sum(i*i for i in range(10**5))
+    # keep the pager from looking for a real terminal
+    term = os.environ.get('TERM')
+    os.environ['TERM'] = 'dumb'
+    try:
+        sampler = _ip.magic('sprun -r -l 5 busy()')
+    finally:
+        if term is None:
+            del os.environ['TERM']
+        else:
+            os.environ['TERM'] = term
+    nt.assert_equal(sampler.nsamples, sum(sampler.samples.values()))
+    for stack in sampler.samples:
+        nt.assert_equal(stack[0].co_filename, '<string>')
+
+def test_timeit_result():
+    res = _ip.magic('timeit -o -n10 -r4 x = 1')
+    nt.assert_equal((res.loops, res.repeat), (10, 4))
+    nt.assert_true(res.best <= res.percentile(50) <= res.worst)
+    # adaptive repeat: at least -r runs
+    res = _ip.magic('timeit -o -n10 -r3 -e 0.5 x = 1')
+    nt.assert_true(res.repeat >= 3)
+
+def test_timeit_baseline():
+    with TemporaryDirectory() as td:
+        fname = os.path.join(td, 'base.json')
+        _ip.magic('timeit -n10 -r3 -j %s x = 1' % fname)
+        base = TimeitResult.load(fname)
+        nt.assert_equal(base.stmt, 'x = 1')
+        _ip.user_ns['base'] = base
+        _ip.magic('timeit -n10 -r3 -b base x = 1')
+        _ip.magic('timeit -n10 -r3 -b %s x = 1' % fname)
+    nt.assert_raises(UsageError, _ip.magic, 'timeit -b nobase x = 1')
@@ -0,0 +1,109 @@
+# coding: utf-8
+"""Tests for the memory usage tracking of cells.
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+# stdlib
+import os
+
+# third party
+import nose.tools as nt
+
+# our own packages
+from IPython.core import memory
+from IPython.core.history import HistoryManager
+from IPython.core.interactiveshell import InteractiveShellABC
+from IPython.utils.tempdir import TemporaryDirectory
+
+#-----------------------------------------------------------------------------
+# Test functions
+#-----------------------------------------------------------------------------
+
+def test_format_size():
+    nt.assert_equal(memory.format_size(100), '100 B')
+    nt.assert_equal(memory.format_size(1536), '1.5 KiB')
+    nt.assert_equal(memory.format_size(3 * 2**20, True), '+3 MiB')
+    nt.assert_equal(memory.format_size(-2**30, True), '-1 GiB')
+    nt.assert_equal(memory.format_size(None), '-')
+
+def test_measure():
+    ip = get_ipython()
+    peak, net, result = ip.memory_tracker.measure(lambda: len([0] * 10**6))
+    nt.assert_equal(result, 10**6)
+    # the list (8 MB) is gone, but it was allocated
+    nt.assert_true(net < 10**6)
+    if peak is not None:
+        nt.assert_true(peak >= 7 * 10**6)
+
+class ShellStub(object):
+    """What a MemoryTracker uses of the shell, so that cells can be run
+    without touching the state of the global one."""
+    def __init__(self, history_manager):
+        self.history_manager = history_manager
+        self.execution_count = 1
+        self.post_execute = []
+
+    def register_post_execute(self, func):
+        self.post_execute.append(func)
+
+    def run_cell(self, func):
+        """Run func() as the code of a cell."""
+        func()
+        for f in self.post_execute:
+            f()
+        self.execution_count += 1
+
+InteractiveShellABC.register(ShellStub)
+
+
+def test_tracker():
+    with TemporaryDirectory() as tmpdir:
+        hist_file = os.path.join(tmpdir, 'history.sqlite')
+        hm = HistoryManager(shell=get_ipython(), hist_file=hist_file,
+                            db_log_memory=True)
+        shell = ShellStub(hm)
+        tracker = memory.MemoryTracker(shell=shell)
+        try:
+            shell.run_cell(tracker.start)
+            nt.assert_true(tracker.enabled)
+            # The cell turning the tracking on is not measured
+            nt.assert_equal(tracker.records, {})
+            # 8 MB, give or take the other allocations of the cells
+            memtest = []
+            count = shell.execution_count
+            shell.run_cell(lambda: memtest.append([0] * 10**6))
+            peak, net = tracker.records[count]
+            nt.assert_true(net >= 7 * 10**6)
+            nt.assert_true(peak is None or peak >= net)
+            shell.run_cell(memtest.pop)
+            nt.assert_true(tracker.records[count + 1][1] <= -7 * 10**6)
+            # Measuring a call doesn't hide the peak of the cell making it
+            def cell():
+                x = [0] * 10**6
+                del x
+                tracker.measure(int)
+            shell.run_cell(cell)
+            nt.assert_true(tracker.records[count + 2][0] is None or
+                           tracker.records[count + 2][0] >= 7 * 10**6)
+            shell.run_cell(tracker.stop)
+            nt.assert_false(tracker.enabled)
+            shell.run_cell(lambda: None)
+            nt.assert_equal(sorted(tracker.records),
+                            [count, count + 1, count + 2])
+            # The records are logged in the database
+            logged = hm.get_memory()
+            nt.assert_equal([l[0] for l in logged], [count, count + 1,
+                                                    count + 2])
+            nt.assert_equal(logged[0][1:], (peak, net))
+        finally:
+            tracker.stop()
+            hm.save_thread.stop()
@@ -66,3 +66,32 @@ def test_issue114():
             yield nt.assert_equals(ip.prefilter(raw), raw)
     finally:
         ip.prefilter_manager.multi_line_specials = msp
+
+
+def test_handler_cache():
+    """Plain Python lines of a block reuse the handlers found for similar
+    lines, without changing the result."""
+    pm = ip.prefilter_manager
+    calls = []
+    find_handler = pm.find_handler
+    def counting_find_handler(line_info):
+        calls.append(line_info.ifun)
+        return find_handler(line_info)
+    pm.find_handler = counting_find_handler
+    msp = pm.multi_line_specials
+    pm.multi_line_specials = True
+    ip.user_ns['pwd'] = 1
+    try:
+        block = 'x = 1\nx = 2\npwd\nx = 3\nif x:\n    y = 1\nif x:\n    y = 1'
+        out = ip.prefilter(block)
+        nt.assert_equals(out.splitlines()[:3], ['x = 1', 'x = 2', 'pwd'])
+        nt.assert_equals(ip.prefilter('x = !ls'),
+                         'x = get_ipython().magic("sc =ls")')
+        nt.assert_equals(calls, ['x', 'x', 'pwd', 'if', 'y', 'x'])
+        # The namespace may change between blocks
+        del ip.user_ns['pwd']
+        nt.assert_equals(ip.prefilter('pwd'), 'get_ipython().magic("pwd ")')
+    finally:
+        del pm.find_handler
+        pm.multi_line_specials = msp
+        ip.user_ns.pop('pwd', None)
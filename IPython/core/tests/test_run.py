@@ -170,6 +170,24 @@ class TestMagicRunSimple(tt.TempFileMixin):
         self.mktmp(src)
         tt.ipexec_validate(self.fname, 'object A deleted')
     
+    def test_line_timing(self):
+        """Test that %run -L runs the script and times its lines."""
+        src = ("def f(n):\n"
+               "    return sum(range(n))\n"
+               "x = [f(i) for i in range(3)]\n")
+        self.mktmp(src)
+        # keep the pager from looking for a real terminal
+        term = os.environ.get('TERM')
+        os.environ['TERM'] = 'dumb'
+        try:
+            _ip.magic('run -L %s' % self.fname)
+        finally:
+            if term is None:
+                del os.environ['TERM']
+            else:
+                os.environ['TERM'] = term
+        nt.assert_equal(_ip.user_ns['x'], [0, 0, 1])
+
     @dec.skip_known_failure 
     def test_aggressive_namespace_cleanup(self):
         """Test that namespace cleanup is not too aggressive GH-238
@@ -0,0 +1,69 @@
+"""Tests for IPython.core.ultratb
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+import sys
+
+import nose.tools as nt
+
+from IPython.core import ultratb
+
+#-----------------------------------------------------------------------------
+# Tests
+#-----------------------------------------------------------------------------
+
+def recurse(n):
+    if n:
+        return recurse(n - 1)
+    1/0
+
+def deep_error(n):
+    try:
+        recurse(n)
+    except ZeroDivisionError:
+        return sys.exc_info()
+
+
+def test_identical_frames():
+    """Runs of identical frames are collapsed"""
+    tb = ultratb.VerboseTB(color_scheme='NoColor')
+    text = tb.text(*deep_error(50))
+    nt.assert_true('[... 48 identical frames ...]' in text)
+    nt.assert_equal(text.count('in recurse('), 3)
+
+
+def test_max_frames():
+    tb = ultratb.VerboseTB(color_scheme='NoColor')
+    tb.max_frames = 4
+    stb = tb.structured_traceback(*deep_error(3))
+    # header, deep_error and recurse, then 2 recurse and the exception
+    nt.assert_true('[... 1 frames omitted ...]' in stb[3])
+    nt.assert_equal(len(stb), 7)
+
+
+def test_max_repr_length():
+    tb = ultratb.VerboseTB(color_scheme='NoColor')
+    tb.max_repr_length = 10
+    try:
+        x = 'x' * 100
+        x + 1
+    except TypeError:
+        text = tb.text(*sys.exc_info())
+    nt.assert_true("x = 'xx...xxx'" in text)
+    nt.assert_false('x' * 20 in text)
+    # Only the first items of large containers are formatted
+    tb.max_repr_length = 30
+    try:
+        y = list(range(10**6))
+        y + 1
+    except TypeError:
+        text = tb.text(*sys.exc_info())
+    nt.assert_true('y = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9,...' in text)
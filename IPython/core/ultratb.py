@@ -75,7 +75,6 @@ import inspect
 import keyword
 import linecache
 import os
-import pydoc
 import re
 import sys
 import time
@@ -89,7 +88,7 @@ from inspect import getsourcefile, getfile, getmodule,\
 
 # IPython's own modules
 # Modified pdb which doesn't damage IPython's readline handling
-from IPython.core import debugger, ipapi
+from IPython.core import ipapi
 from IPython.core.display_trap import DisplayTrap
 from IPython.core.excolors import exception_colors
 from IPython.utils import PyColorize
@@ -219,36 +218,194 @@ def fix_frame_records_filenames(records):
     return fixed_records
 
 
-def _fixed_getinnerframes(etb, context=1,tb_offset=0):
-    import linecache
+def _tb_entries(etb):
+    """Return the list of the entries of a traceback, outermost first."""
+    tbs = []
+    while etb is not None:
+        tbs.append(etb)
+        etb = etb.tb_next
+    return tbs
+
+
+def _collapse_frames(tbs, max_frames=0):
+    """Shorten a list of traceback entries for display.
+
+    Runs of more than three identical frames (same code and line, as in deep
+    recursion) are reduced to their first and last frames, and if more than
+    `max_frames` frames are left (0 means no limit), only the outermost and
+    innermost ones are kept.  The omitted frames are replaced by a message.
+    """
+    out = []
+    i, n = 0, len(tbs)
+    while i < n:
+        key = (tbs[i].tb_frame.f_code, tbs[i].tb_lineno)
+        j = i + 1
+        while j < n and (tbs[j].tb_frame.f_code, tbs[j].tb_lineno) == key:
+            j += 1
+        if j - i > 3:
+            # the number of omitted frames stands for them for now
+            out.extend([tbs[i], j - i - 2, tbs[j-1]])
+        else:
+            out.extend(tbs[i:j])
+        i = j
+    positions = [k for k, entry in enumerate(out) if not isinstance(entry, int)]
+    if max_frames and len(positions) > max_frames:
+        head = max(max_frames // 2, 1)
+        tail = max(max_frames - head, 1)
+        start, end = positions[head], positions[-tail]
+        omitted = sum(entry if isinstance(entry, int) else 1
+                      for entry in out[start:end])
+        out[start:end] = ['[... %i frames omitted ...]' % omitted]
+    return [('[... %i identical frames ...]' % entry
+             if isinstance(entry, int) else entry) for entry in out]
+
+
+def _fixed_getinnerframes(etb, context=1, tb_offset=0, tbs=None):
+    """Return the frame records of a traceback, like inspect.getinnerframes().
+
+    If given, `tbs` is the list of the traceback entries to use, as returned
+    by _tb_entries() and _collapse_frames() (tb_offset is then ignored).
+    Strings in it are passed through as is.
+    """
     LNUM_POS, LINES_POS, INDEX_POS =  2, 4, 5
 
-    records  = fix_frame_records_filenames(inspect.getinnerframes(etb, context))
+    if tbs is None:
+        tbs = _tb_entries(etb)[tb_offset:]
+    # The source lines are taken from linecache below: don't let inspect look
+    # for them (and scan the file for the start of each function).
+    records = []
+    for tb in tbs:
+        if not isinstance(tb, str):
+            info = inspect.getframeinfo(tb, 0)
+            records.append((tb.tb_frame, info[0], tb.tb_lineno, info[2],
+                            None, None))
+    records = iter(fix_frame_records_filenames(records))
+    records = [tb if isinstance(tb, str) else next(records) for tb in tbs]
 
     # If the error is at the console, don't build any context, since it would
     # otherwise produce 5 blank lines printed out (there is no file at the
     # console)
-    rec_check = records[tb_offset:]
     try:
-        rname = rec_check[0][1]
+        rname = records[0][1]
         if rname == '<ipython console>' or rname.endswith('<string>'):
-            return rec_check
+            return records
     except IndexError:
         pass
 
-    aux = traceback.extract_tb(etb)
-    assert len(records) == len(aux)
-    for i, (file, lnum, _, _) in zip(list(range(len(records))), aux):
+    for i, record in enumerate(records):
+        if isinstance(record, str):
+            continue
+        file, lnum = record[1], record[2]
         maybeStart = lnum-1 - context//2
         start =  max(maybeStart, 0)
         end   = start + context
         lines = linecache.getlines(file)[start:end]
-        buf = list(records[i])
-        buf[LNUM_POS] = lnum
+        buf = list(record)
         buf[INDEX_POS] = lnum - 1 - start
         buf[LINES_POS] = lines
         records[i] = tuple(buf)
-    return records[tb_offset:]
+    return records
+
+
+# Map of filename -> (mtime, {(lnum, line): names}), see _line_names()
+_line_names_cache = {}
+
+def _tokenize_names(file, lnum):
+    """Return the names, dotted or not, in the logical line of code starting
+    at line lnum of file, in order and without duplicates."""
+    # Initialize a list of names on the current line, which the
+    # tokenizer below will populate.
+    names = []
+
+    def tokeneater(token_type, token, start, end, line):
+        """Stateful tokeneater which builds dotted names.
+
+        The list of names it appends to (from the enclosing scope) can
+        contain repeated composite names.  This is unavoidable, since
+        there is no way to disambguate partial dotted structures until
+        the full list is known.  The caller is responsible for pruning
+        the final list of duplicates before using it."""
+
+        # build composite names
+        if token == '.':
+            try:
+                names[-1] += '.'
+                # store state so the next token is added for x.y.z names
+                tokeneater.name_cont = True
+                return
+            except IndexError:
+                pass
+        if token_type == tokenize.NAME and token not in keyword.kwlist:
+            if tokeneater.name_cont:
+                # Dotted names
+                names[-1] += token
+                tokeneater.name_cont = False
+            else:
+                # Regular new names.  We append everything, the caller
+                # will be responsible for pruning the list later.  It's
+                # very tricky to try to prune as we go, b/c composite
+                # names can fool us.  The pruning at the end is easy
+                # to do (or the caller can print a list with repeated
+                # names if so desired.
+                names.append(token)
+        elif token_type == tokenize.NEWLINE:
+            raise IndexError
+    # we need to store a bit of state in the tokenizer to build
+    # dotted names
+    tokeneater.name_cont = False
+
+    def linereader(file=file, lnum=[lnum], getline=linecache.getline):
+        line = getline(file, lnum[0])
+        lnum[0] += 1
+        return line
+
+    # Build the list of names on this line of code where the exception
+    # occurred.
+    try:
+        # This builds the names list in-place by capturing it from the
+        # enclosing scope.
+        # We're using _tokenize because tokenize expects bytes, and
+        # attempts to find an encoding cookie, which can go wrong
+        # e.g. if the traceback line includes "encoding=encoding".
+        # N.B. _tokenize is undocumented. An official API for
+        # tokenising strings is proposed in Python Issue 9969.
+        for atoken in tokenize._tokenize(linereader, None):
+            tokeneater(*atoken)
+    except IndexError:
+        # signals exit of tokenizer
+        pass
+    except tokenize.TokenError as msg:
+        _m = ("An unexpected error occurred while tokenizing input\n"
+              "The following traceback may be corrupted or invalid\n"
+              "The error message is: %s\n" % msg)
+        error(_m)
+
+    # prune names list of duplicates, but keep the right order
+    return uniq_stable(names)
+
+
+def _line_names(file, lnum):
+    """Cached version of _tokenize_names().
+
+    The names found in a file are kept as long as its modification time
+    doesn't change, so that repeated errors in the same code are cheap.
+    """
+    try:
+        mtime = os.stat(file).st_mtime
+    except (OSError, TypeError, ValueError):
+        # Not a file: interactive input is cached by linecache under unique
+        # names, and the line itself is part of the key below anyway.
+        mtime = None
+    entry = _line_names_cache.get(file)
+    if entry is None or entry[0] != mtime:
+        if len(_line_names_cache) >= 100:
+            _line_names_cache.clear()
+        entry = _line_names_cache[file] = (mtime, {})
+    key = (lnum, linecache.getline(file, lnum))
+    names = entry[1].get(key)
+    if names is None:
+        names = entry[1][key] = _tokenize_names(file, lnum)
+    return names
 
 # Helper function -- largely belongs to VerboseTB, but we need the same
 # functionality to produce a pseudo verbose TB for SyntaxErrors, so that they
@@ -331,6 +488,9 @@ class TBTools(object):
         self.old_scheme = color_scheme  # save initial value for toggles
 
         if call_pdb:
+            # The debugger is imported when first needed: pdb and its
+            # dependencies add to the startup time.
+            from IPython.core import debugger
             self.pdb = debugger.Pdb(self.color_scheme_table.active_scheme_name)
         else:
             self.pdb = None
@@ -628,7 +788,18 @@ class VerboseTB(TBTools):
 
     Modified version which optionally strips the topmost entries from the
     traceback, to be used with alternate interpreters (because their own code
-    would appear in the traceback)."""
+    would appear in the traceback).
+
+    To keep deep tracebacks (e.g. from infinite recursion) readable and quick
+    to format, runs of identical frames are collapsed, and only the outermost
+    and innermost `max_frames` frames are shown.  At most `max_vars`
+    variables are shown per frame, with their repr limited to about
+    `max_repr_length` characters (see :class:`pydoc.TextRepr`).  Set any of
+    these to 0 for no limit."""
+
+    max_frames = 100
+    max_vars = 30
+    max_repr_length = 1000
 
     def __init__(self,color_scheme = 'Linux', call_pdb=False, ostream=None,
                  tb_offset=0, long_header=False, include_vars=True,
@@ -676,6 +847,7 @@ class VerboseTB(TBTools):
         def text_repr(value):
             """Hopefully pretty robust repr equivalent."""
             # this is pretty horrible but should always return *something*
+            import pydoc
             try:
                 return pydoc.text.repr(value)
             except KeyboardInterrupt:
@@ -735,7 +907,9 @@ class VerboseTB(TBTools):
             # (5 blanks lines) where none should be returned.
             #records = inspect.getinnerframes(etb, context)[tb_offset:]
             #print 'python records:', records # dbg
-            records = _fixed_getinnerframes(etb, context, tb_offset)
+            tbs = _collapse_frames(_tb_entries(etb)[tb_offset:],
+                                   self.max_frames)
+            records = _fixed_getinnerframes(etb, context, tbs=tbs)
             #print 'alex   records:', records # dbg
         except:
 
@@ -766,7 +940,28 @@ class VerboseTB(TBTools):
 
         # now, loop over all records printing context and info
         abspath = os.path.abspath
-        for frame, file, lnum, func, lines, index in records:
+        max_repr = self.max_repr_length
+        if max_repr:
+            # Bound the work of computing the reprs, not just their length:
+            # strings and other objects are cut at max_repr characters, and
+            # only the first items of large containers are formatted.
+            import pydoc
+            value_repr = pydoc.TextRepr()
+            value_repr.maxother = value_repr.maxlong = max_repr
+            # Leave room for the quotes
+            value_repr.maxstring = max_repr - 2
+            value_repr.maxtuple = value_repr.maxlist = value_repr.maxarray = \
+                value_repr.maxdict = value_repr.maxset = \
+                value_repr.maxfrozenset = value_repr.maxdeque = max_repr // 3
+            value_repr = value_repr.repr
+        else:
+            value_repr = repr
+        for record in records:
+            if isinstance(record, str):
+                # omitted frames
+                frames.append('%s%s%s\n' % (Colors.em, record, ColorsNormal))
+                continue
+            frame, file, lnum, func, lines, index = record
             #print '*** record:',file,lnum,func,lines,index  # dbg
             try:
                 file = file and abspath(file) or '?'
@@ -814,75 +1009,9 @@ class VerboseTB(TBTools):
                     # disabled.
                     call = tpl_call_fail % func
 
-            # Initialize a list of names on the current line, which the
-            # tokenizer below will populate.
-            names = []
-
-            def tokeneater(token_type, token, start, end, line):
-                """Stateful tokeneater which builds dotted names.
-
-                The list of names it appends to (from the enclosing scope) can
-                contain repeated composite names.  This is unavoidable, since
-                there is no way to disambguate partial dotted structures until
-                the full list is known.  The caller is responsible for pruning
-                the final list of duplicates before using it."""
-                
-                # build composite names
-                if token == '.':
-                    try:
-                        names[-1] += '.'
-                        # store state so the next token is added for x.y.z names
-                        tokeneater.name_cont = True
-                        return
-                    except IndexError:
-                        pass
-                if token_type == tokenize.NAME and token not in keyword.kwlist:
-                    if tokeneater.name_cont:
-                        # Dotted names
-                        names[-1] += token
-                        tokeneater.name_cont = False
-                    else:
-                        # Regular new names.  We append everything, the caller
-                        # will be responsible for pruning the list later.  It's
-                        # very tricky to try to prune as we go, b/c composite
-                        # names can fool us.  The pruning at the end is easy
-                        # to do (or the caller can print a list with repeated
-                        # names if so desired.
-                        names.append(token)
-                elif token_type == tokenize.NEWLINE:
-                    raise IndexError
-            # we need to store a bit of state in the tokenizer to build
-            # dotted names
-            tokeneater.name_cont = False
-
-            def linereader(file=file, lnum=[lnum], getline=linecache.getline):
-                line = getline(file, lnum[0])
-                lnum[0] += 1
-                return line
-
-            # Build the list of names on this line of code where the exception
-            # occurred.
-            try:
-                # This builds the names list in-place by capturing it from the
-                # enclosing scope.
-                # We're using _tokenize because tokenize expects bytes, and
-                # attempts to find an encoding cookie, which can go wrong
-                # e.g. if the traceback line includes "encoding=encoding".
-                # N.B. _tokenize is undocumented. An official API for
-                # tokenising strings is proposed in Python Issue 9969.
-                for atoken in tokenize._tokenize(linereader, None):
-                    tokeneater(*atoken)
-            except IndexError:
-                # signals exit of tokenizer
-                pass
-            except tokenize.TokenError as msg:
-                _m = ("An unexpected error occurred while tokenizing input\n"
-                      "The following traceback may be corrupted or invalid\n"
-                      "The error message is: %s\n" % msg)
-                error(_m)
-            
-            # prune names list of duplicates, but keep the right order
-            unique_names = uniq_stable(names)
+            unique_names = _line_names(file, lnum)
+            if self.max_vars:
+                unique_names = unique_names[:self.max_vars]
 
             # Start loop over vars
             lvals = []
@@ -892,7 +1021,7 @@ class VerboseTB(TBTools):
                     if name_base in frame.f_code.co_varnames:
                         if name_base in locals:
                             try:
-                                value = repr(eval(name_full,locals))
+                                value = value_repr(eval(name_full,locals))
                             except:
                                 value = undefined
                         else:
@@ -901,12 +1030,16 @@ class VerboseTB(TBTools):
                     else:
                         if name_base in frame.f_globals:
                             try:
-                                value = repr(eval(name_full,frame.f_globals))
+                                value = value_repr(eval(name_full,
+                                                        frame.f_globals))
                             except:
                                 value = undefined
                         else:
                             value = undefined
                         name = tpl_global_var % name_full
+                    # Nested containers may still exceed the limit
+                    if max_repr and len(value) > max_repr:
+                        value = value[:max_repr] + '...'
                     lvals.append(tpl_name_val % (name,value))
             if lvals:
                 lvals = '%s%s' % (indent,em_normal.join(lvals))
@@ -934,6 +1067,7 @@ class VerboseTB(TBTools):
                                      ColorsNormal, evalue_str)]
 
         # vds: >>
+        records = [r for r in records[-1:] if not isinstance(r, str)]
         if records:
              filepath, lnum = records[-1][1:3]
              #print "file:", str(file), "linenb", str(lnum) # dbg
@@ -969,6 +1103,7 @@ class VerboseTB(TBTools):
 
         if force or self.call_pdb:
             if self.pdb is None:
+                from IPython.core import debugger
                 self.pdb = debugger.Pdb(
                     self.color_scheme_table.active_scheme_name)
             # the system displayhook may have changed, restore the original
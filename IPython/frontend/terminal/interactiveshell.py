@@ -141,6 +141,13 @@ class TerminalInteractiveShell(InteractiveShell):
         else:
             toggle_set_term_title(False)
 
+    def init_display_formatter(self):
+        super(TerminalInteractiveShell, self).init_display_formatter()
+        # The terminal only ever shows text/plain, so don't compute the other
+        # representations unless the user configured them.
+        if 'active_types' not in self.config.DisplayFormatter:
+            self.display_formatter.active_types = ['text/plain']
+
     #-------------------------------------------------------------------------
     # Things related to aliases
     #-------------------------------------------------------------------------
@@ -283,23 +283,25 @@ class TerminalIPythonApp(BaseIPythonApplication, InteractiveShellApp):
 
     def initialize(self, argv=None):
         """Do actions after construct, but before starting the app."""
-        super(TerminalIPythonApp, self).initialize(argv)
+        timed = self.startup_timer.call
+        timed(super(TerminalIPythonApp, self).initialize, argv)
         if self.subapp is not None:
             # don't bother initializing further, starting subapp
             return
         if not self.ignore_old_config:
-            check_for_old_config(self.ipython_dir)
+            timed(check_for_old_config, self.ipython_dir)
         # print self.extra_args
         if self.extra_args:
             self.file_to_run = self.extra_args[0]
         # create the shell
-        self.init_shell()
+        timed(self.init_shell)
         # and draw the banner
-        self.init_banner()
+        timed(self.init_banner)
         # Now a variety of things that happen after the banner is printed.
-        self.init_gui_pylab()
-        self.init_extensions()
-        self.init_code()
+        timed(self.init_gui_pylab)
+        timed(self.init_extensions)
+        timed(self.init_code)
+        self.print_startup_profile()
 
     def init_shell(self):
         """initialize the InteractiveShell instance"""
@@ -0,0 +1,138 @@
+# encoding: utf-8
+"""Line-by-line timing of the code in a single file.
+
+The :class:`LineTimer` installs a trace function which only follows the
+frames running code from one file, and records how many times each of its
+lines was executed, and how much time was spent on it.  The time of a line
+includes that of the functions it calls.  Frames from other files are not
+traced at all, so the rest of the program runs at close to full speed.
+
+Authors:
+
+* The IPython Development Team
+"""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+import linecache
+import os
+import sys
+from timeit import default_timer
+
+from IPython.utils import PyColorize
+from IPython.utils.timing import format_time
+
+#-----------------------------------------------------------------------------
+# Code
+#-----------------------------------------------------------------------------
+
+class LineTimer(object):
+    """Time the lines of the code from one file.
+
+    Parameters
+    ----------
+    filename : str
+      The file whose code is timed.
+    timer : callable, optional
+      The clock used, by default the one of the timeit module.
+
+    After a run, `hits` maps the line numbers of the file to the number of
+    times they were executed, `times` to the time spent on them, and
+    `elapsed` is the total time of the runs.
+    """
+
+    def __init__(self, filename, timer=default_timer):
+        self.filename = os.path.abspath(filename)
+        self.timer = timer
+        self.hits = {}
+        self.times = {}
+        self.elapsed = 0.0
+        # code object -> whether it comes from our file
+        self._codes = {}
+        # frame -> (line number, start time) of the line it is running
+        self._current = {}
+
+    def _trace_call(self, frame, event, arg):
+        """The global trace function: only trace the frames of our file."""
+        code = frame.f_code
+        try:
+            ours = self._codes[code]
+        except KeyError:
+            ours = self._codes[code] = (
+                os.path.abspath(code.co_filename) == self.filename)
+        if ours:
+            return self._trace_line
+
+    def _trace_line(self, frame, event, arg):
+        now = self.timer()
+        current = self._current.get(frame)
+        if current is not None:
+            lineno, start = current
+            self.times[lineno] = self.times.get(lineno, 0.0) + now - start
+        if event == 'line':
+            lineno = frame.f_lineno
+            self.hits[lineno] = self.hits.get(lineno, 0) + 1
+            # don't count the time spent in here
+            self._current[frame] = (lineno, self.timer())
+        elif event == 'return':
+            # also for generators: they are traced again when resumed
+            self._current.pop(frame, None)
+        return self._trace_line
+
+    def runcall(self, func, *args, **kw):
+        """Call func(*args, **kw) with the timer on, and return its result."""
+        old_trace = sys.gettrace()
+        t0 = self.timer()
+        sys.settrace(self._trace_call)
+        try:
+            return func(*args, **kw)
+        finally:
+            sys.settrace(old_trace)
+            self.elapsed += self.timer() - t0
+            self._current.clear()
+
+    def report(self, scheme='NoColor', precision=3):
+        """Return the source of the file, annotated with the hits and time of
+        each line, syntax highlighted with the given color scheme.
+
+        The time of a line includes that of the calls it makes, so the
+        percentages of nested lines add up to more than 100.
+        """
+        linecache.checkcache(self.filename)
+        lines = linecache.getlines(self.filename)
+        source = ''.join(lines)
+        if scheme != 'NoColor':
+            parser = PyColorize.Parser()
+            source = parser.format(source, 'str', scheme)
+        # the highlighter drops the trailing blank lines, and ends with a
+        # color reset on a line of its own
+        source = source.splitlines()[:len(lines)]
+        source += [''] * (len(lines) - len(source))
+
+        total = self.elapsed or 1.0
+        fmt = lambda t: format_time(t, precision)
+        out = ['Total time: %s, %i lines run %i times\n\n' %
+               (fmt(self.elapsed), len(self.hits), sum(self.hits.values())),
+               '%6s %9s %10s %10s %6s  %s\n' % ('Line', 'Hits', 'Time',
+                                               'Per hit', '% Time',
+                                               'Line Contents'),
+               '=' * 72 + '\n']
+        for lineno, line in enumerate(source, 1):
+            hits = self.hits.get(lineno)
+            if hits:
+                t = self.times.get(lineno, 0.0)
+                out.append('%6i %9i %10s %10s %6.1f  %s\n' % (lineno, hits,
+                           fmt(t), fmt(t / hits), 100 * t / total, line))
+            else:
+                out.append('%6i %9s %10s %10s %6s  %s\n' % (lineno, '', '',
+                                                           '', '', line))
+        return ''.join(out)
@@ -109,6 +109,7 @@ import re
 import datetime
 from io import StringIO
 from collections import deque
+from itertools import islice
 
 
 __all__ = ['pretty', 'pprint', 'PrettyPrinter', 'RepresentationPrinter',
@@ -118,22 +119,27 @@ __all__ = ['pretty', 'pprint', 'PrettyPrinter', 'RepresentationPrinter',
 _re_pattern_type = type(re.compile(''))
 
 
-def pretty(obj, verbose=False, max_width=79, newline='\n'):
+def pretty(obj, verbose=False, max_width=79, newline='\n', **limits):
     """
     Pretty print the object's representation.
+
+    `limits` may contain `max_seq_length`, `max_depth` and `max_chars`, see
+    `RepresentationPrinter`.
     """
     stream = StringIO()
-    printer = RepresentationPrinter(stream, verbose, max_width, newline)
+    printer = RepresentationPrinter(stream, verbose, max_width, newline,
+                                    **limits)
     printer.pretty(obj)
     printer.flush()
     return stream.getvalue()
 
 
-def pprint(obj, verbose=False, max_width=79, newline='\n'):
+def pprint(obj, verbose=False, max_width=79, newline='\n', **limits):
     """
     Like `pretty` but print to stdout.
     """
-    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline)
+    printer = RepresentationPrinter(sys.stdout, verbose, max_width, newline,
+                                    **limits)
     printer.pretty(obj)
     printer.flush()
     sys.stdout.write(newline)
@@ -304,13 +310,32 @@ class RepresentationPrinter(PrettyPrinter):
     output.  For example the default instance repr prints all attributes and
     methods that are not prefixed by an underscore if the printer is in
     verbose mode.
+
+    The output can be limited, to keep huge or deeply nested objects from
+    producing huge strings (a limit of 0 means no limit):
+
+    * `max_seq_length`: at most this many items of a sequence, set or dict
+      are printed, followed by ``...``.
+    * `max_depth`: containers nested deeper than this are printed as
+      ``[...]``, ``{...}``, etc.
+    * `max_chars`: the output stops with ``...`` after this many characters.
+      Once this is hit, :attr:`truncated` is set and the printer stops
+      visiting objects, so printers for containers should stop iterating
+      when they see it.
     """
 
     def __init__(self, output, verbose=False, max_width=79, newline='\n',
-        singleton_pprinters=None, type_pprinters=None, deferred_pprinters=None):
+        singleton_pprinters=None, type_pprinters=None, deferred_pprinters=None,
+        type_cache=None, max_seq_length=0, max_depth=0, max_chars=0):
 
         PrettyPrinter.__init__(self, output, max_width, newline)
         self.verbose = verbose
+        self.max_seq_length = max_seq_length
+        self.max_depth = max_depth
+        self.max_chars = max_chars
+        self.truncated = False
+        # Number of characters of text printed so far, when max_chars is set.
+        self.chars = 0
         self.stack = []
         if singleton_pprinters is None:
             singleton_pprinters = _singleton_pprinters.copy()
@@ -321,9 +346,39 @@ class RepresentationPrinter(PrettyPrinter):
         if deferred_pprinters is None:
             deferred_pprinters = _deferred_type_pprinters.copy()
         self.deferred_pprinters = deferred_pprinters
+        # Maps classes to the class whose printer they use (or None), so that
+        # the MRO is only walked once per class.  It may be shared between
+        # printers using the same registries.
+        if type_cache is None:
+            type_cache = {}
+        self.type_cache = type_cache
+
+    def text(self, obj):
+        if self.max_chars:
+            if self.truncated:
+                return
+            remaining = self.max_chars - self.chars
+            if len(obj) > remaining:
+                obj = obj[:remaining] + '...'
+                self.truncated = True
+            self.chars += len(obj)
+        PrettyPrinter.text(self, obj)
+
+    def breakable(self, sep=' '):
+        if self.truncated:
+            return
+        self.chars += len(sep)
+        PrettyPrinter.breakable(self, sep)
+
+    def too_deep(self):
+        """Return True if the object being printed is nested deeper than
+        `max_depth`, in which case containers should only print ``...``."""
+        return bool(self.max_depth) and len(self.stack) > self.max_depth
 
     def pretty(self, obj):
         """Pretty print the given object."""
+        if self.truncated:
+            return
         obj_id = id(obj)
         cycle = obj_id in self.stack
         self.stack.append(obj_id)
@@ -338,13 +393,9 @@ class RepresentationPrinter(PrettyPrinter):
             else:
                 return printer(obj, self, cycle)
             # Next look for type_printers.
-            for cls in _get_mro(obj_class):
-                if cls in self.type_pprinters:
-                    return self.type_pprinters[cls](obj, self, cycle)
-                else:
-                    printer = self._in_deferred_types(cls)
-                    if printer is not None:
-                        return printer(obj, self, cycle)
+            printer = self._type_printer(obj_class)
+            if printer is not None:
+                return printer(obj, self, cycle)
             # Finally look for special method names.
             if hasattr(obj_class, '_repr_pretty_'):
                 return obj_class._repr_pretty_(obj, self, cycle)
@@ -353,6 +404,25 @@ class RepresentationPrinter(PrettyPrinter):
             self.end_group()
             self.stack.pop()
 
+    def _type_printer(self, obj_class):
+        """Return the registered printer for obj_class, or None."""
+        try:
+            cls = self.type_cache[obj_class]
+        except (KeyError, TypeError):
+            cls = None
+            for base in _get_mro(obj_class):
+                if (base in self.type_pprinters or
+                    self._in_deferred_types(base) is not None):
+                    cls = base
+                    break
+            try:
+                self.type_cache[obj_class] = cls
+            except TypeError:
+                pass
+        if cls is None:
+            return None
+        return self.type_pprinters.get(cls)
+
     def _in_deferred_types(self, cls):
         """
         Check if the given class is specified in the deferred type registry.
@@ -504,14 +574,20 @@ def _seq_pprinter_factory(start, end, basetype):
             # If the subclass provides its own repr, use it instead.
             return p.text(typ.__repr__(obj))
 
-        if cycle:
+        if cycle or p.too_deep():
             return p.text(start + '...' + end)
         step = len(start)
         p.begin_group(step, start)
+        max_seq_length = p.max_seq_length
         for idx, x in enumerate(obj):
+            if p.truncated:
+                break
             if idx:
                 p.text(',')
                 p.breakable()
+            if idx == max_seq_length and max_seq_length:
+                p.text('...')
+                break
             p.pretty(x)
         if len(obj) == 1 and type(obj) is tuple:
             # Special case for 1-item tuples.
@@ -531,22 +607,35 @@ def _dict_pprinter_factory(start, end, basetype=None):
             # If the subclass provides its own repr, use it instead.
             return p.text(typ.__repr__(obj))
 
-        if cycle:
-            return p.text('{...}')
+        if cycle or p.too_deep():
+            return p.text(start + '...' + end)
         p.begin_group(1, start)
-        keys = list(obj.keys())
-        try:
-            keys.sort()
-        except Exception as e:
-            # Sometimes the keys don't sort.
-            pass
+        max_seq_length = p.max_seq_length
+        if max_seq_length and len(obj) > max_seq_length:
+            # Don't copy and sort all the keys just to show a few of them.
+            keys = list(islice(obj.keys(), max_seq_length))
+            more = True
+        else:
+            keys = list(obj.keys())
+            more = False
+            try:
+                keys.sort()
+            except Exception as e:
+                # Sometimes the keys don't sort.
+                pass
         for idx, key in enumerate(keys):
+            if p.truncated:
+                break
             if idx:
                 p.text(',')
                 p.breakable()
             p.pretty(key)
             p.text(': ')
             p.pretty(obj[key])
+        if more:
+            p.text(',')
+            p.breakable()
+            p.text('...')
         p.end_group(1, end)
     return inner
 
@@ -600,6 +689,15 @@ def _repr_pprint(obj, p, cycle):
     p.text(repr(obj))
 
 
+def _str_pprint(obj, p, cycle):
+    """The pprint for strings, which only reprs what max_chars lets through."""
+    max_chars = p.max_chars
+    if max_chars and len(obj) > max_chars:
+        # The repr is at least as long as the slice, so this is truncated.
+        obj = obj[:max_chars]
+    p.text(repr(obj))
+
+
 def _function_pprint(obj, p, cycle):
     """Base pprint for all functions and builtin functions."""
     if obj.__module__ in ('builtins', 'exceptions') or not obj.__module__:
@@ -640,8 +738,7 @@ _type_pprinters = {
     int:                        _repr_pprint,
     int:                       _repr_pprint,
     float:                      _repr_pprint,
-    str:                        _repr_pprint,
-    str:                    _repr_pprint,
+    str:                        _str_pprint,
     tuple:                      _seq_pprinter_factory('(', ')', tuple),
     list:                       _seq_pprinter_factory('[', ']', list),
     dict:                       _dict_pprinter_factory('{', '}', dict),
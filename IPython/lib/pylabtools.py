@@ -164,9 +164,11 @@ def select_figure_format(shell, fmt):
 
     if fmt=='png':
         svg_formatter.type_printers.pop(Figure, None)
+        svg_formatter.clear_type_cache()
         png_formatter.for_type(Figure, lambda fig: print_figure(fig, 'png'))
     elif fmt=='svg':
         png_formatter.type_printers.pop(Figure, None)
+        png_formatter.clear_type_cache()
         svg_formatter.for_type(Figure, lambda fig: print_figure(fig, 'svg'))
     else:
         raise ValueError("supported formats are: 'png', 'svg', not %r"%fmt)
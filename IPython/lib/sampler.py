@@ -0,0 +1,214 @@
+# encoding: utf-8
+"""A statistical (sampling) profiler.
+
+Unlike the deterministic profilers of the standard library, which hook every
+function call, the :class:`Sampler` only looks at the stack of the profiled
+code at regular intervals, so it barely slows it down and doesn't distort the
+timings of tight loops.  The samples are aggregated into a flat list of the
+functions the time is spent in, a call tree, or collapsed stacks, the text
+format read by flame graph tools.
+
+On Unix, the stack is sampled from a ``SIGPROF`` signal handler, driven by a
+``setitimer`` timer counting the CPU time of the process, so the profiled
+code must run in the main thread.  Elsewhere, or in other threads, a
+background thread samples the stack at regular (wall clock) intervals
+instead.
+
+Authors:
+
+* The IPython Development Team
+"""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+import os
+import signal
+import sys
+import threading
+import time
+
+#-----------------------------------------------------------------------------
+# Code
+#-----------------------------------------------------------------------------
+
+def code_label(code):
+    """Return a short description of a code object, as in profiler reports."""
+    return '%s (%s:%i)' % (code.co_name, os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+
+class Sampler(object):
+    """Sample the stack of the code it runs at regular intervals.
+
+    Parameters
+    ----------
+    interval : float
+      The sampling interval, in seconds.
+    use_signal : bool, optional
+      Whether to sample from a SIGPROF handler.  By default, signals are used
+      when possible: on Unix, in the main thread.
+
+    The samples are kept in the `samples` dict, which maps stacks (tuples of
+    code objects, outermost first) to the number of times they were seen.
+    """
+
+    def __init__(self, interval=0.001, use_signal=None):
+        self.interval = interval
+        if use_signal is None:
+            use_signal = (hasattr(signal, 'setitimer') and
+                          threading.current_thread().name == 'MainThread')
+        self.use_signal = use_signal
+        self.samples = {}
+        self.elapsed = 0.0
+        self._base_frame = None
+        self._running = False
+
+    @property
+    def nsamples(self):
+        """The total number of samples."""
+        return sum(self.samples.values())
+
+    def _record(self, frame):
+        """Record the stack of frame, up to the frame which started the
+        sampling."""
+        base = self._base_frame
+        if not self._running:
+            return
+        stack = []
+        while frame is not None and frame is not base:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if frame is None or not stack:
+            # Not in the profiled code (yet, or anymore)
+            return
+        stack.reverse()
+        stack = tuple(stack)
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def _signal_handler(self, signum, frame):
+        self._record(frame)
+
+    def _sampling_thread(self, thread_id):
+        interval = self.interval
+        while self._running:
+            time.sleep(interval)
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._record(frame)
+            del frame
+
+    def runctx(self, code, globals, locals):
+        """Run code (a string or code object) in the given namespaces, while
+        sampling its stack."""
+        self._base_frame = sys._getframe()
+        self._running = True
+        t0 = time.time()
+        if self.use_signal:
+            old_handler = signal.signal(signal.SIGPROF, self._signal_handler)
+            if old_handler is None:
+                # not installed from Python
+                old_handler = signal.SIG_DFL
+            # Restart the system calls the samples land in, rather than
+            # failing them with EINTR in the profiled code.
+            signal.siginterrupt(signal.SIGPROF, False)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            thread = threading.Thread(target=self._sampling_thread,
+                                      args=(threading.current_thread().ident,))
+            thread.daemon = True
+            thread.start()
+        try:
+            exec(code, globals, locals)
+        finally:
+            self._running = False
+            if self.use_signal:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, old_handler)
+            else:
+                thread.join()
+            self.elapsed += time.time() - t0
+            self._base_frame = None
+        return self
+
+    def flat_stats(self):
+        """Return a list of (self samples, total samples, code) tuples, most
+        expensive first.
+
+        The self samples of a function are those in which it was running, and
+        the total ones those in which it was on the stack.
+        """
+        own = {}
+        total = {}
+        for stack, count in self.samples.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + count
+            # recursive functions count once per sample
+            for code in set(stack):
+                total[code] = total.get(code, 0) + count
+        stats = [(own.get(code, 0), count, code)
+                 for code, count in total.items()]
+        stats.sort(key=lambda s: (-s[0], -s[1], code_label(s[2])))
+        return stats
+
+    def call_tree(self):
+        """Return the call tree, as a dict mapping code objects to
+        [number of samples, subtree] lists."""
+        tree = {}
+        for stack, count in self.samples.items():
+            node = tree
+            for code in stack:
+                entry = node.setdefault(code, [0, {}])
+                entry[0] += count
+                node = entry[1]
+        return tree
+
+    def collapsed_stacks(self):
+        """Return the samples as collapsed stacks, one 'f1;f2;f3 count' line
+        per distinct stack, the format read by flame graph tools."""
+        lines = {}
+        for stack, count in self.samples.items():
+            line = ';'.join(code_label(code) for code in stack)
+            lines[line] = lines.get(line, 0) + count
+        return ''.join('%s %i\n' % item for item in sorted(lines.items()))
+
+    def report(self, limit=20, min_fraction=0.01):
+        """Return a text report of the samples: a flat list of the `limit`
+        most expensive functions (all if 0), and the call tree, without the
+        branches seen in less than `min_fraction` of the samples."""
+        nsamples = self.nsamples
+        out = ['%i samples every %g ms, over %.3f s\n' %
+               (nsamples, self.interval * 1000, self.elapsed)]
+        if not nsamples:
+            return out[0]
+        percent = lambda count: 100.0 * count / nsamples
+
+        stats = self.flat_stats()
+        if limit:
+            stats = stats[:limit]
+        out.append('\n   self%  total%  function\n')
+        for own, total, code in stats:
+            out.append('%7.1f%% %6.1f%%  %s\n' %
+                       (percent(own), percent(total), code_label(code)))
+
+        out.append('\nCall tree (total%):\n')
+        min_count = min_fraction * nsamples
+        by_count = lambda node: sorted(node.items(), key=lambda i: -i[1][0])
+        # depth first, without recursion: the stacks may be deep
+        pending = [(0, item) for item in reversed(by_count(self.call_tree()))]
+        while pending:
+            depth, (code, (count, children)) = pending.pop()
+            if count < min_count:
+                continue
+            out.append('%6.1f%%  %s%s\n' % (percent(count), '  ' * depth,
+                                           code_label(code)))
+            pending.extend((depth + 1, item)
+                           for item in reversed(by_count(children)))
+        return ''.join(out)
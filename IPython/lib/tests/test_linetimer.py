@@ -0,0 +1,59 @@
+"""Tests for the line timer.
+"""
+#-----------------------------------------------------------------------------
+# Copyright (c) 2011, the IPython Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+# Stdlib imports
+import os
+
+# Third-party imports
+import nose.tools as nt
+
+# Our own imports
+from IPython.lib.linetimer import LineTimer
+from IPython.utils.tempdir import TemporaryDirectory
+
+#-----------------------------------------------------------------------------
+# Test functions
+#-----------------------------------------------------------------------------
+
+src = """\
+def f(n):
+    s = 0
+    for i in range(n):
+        s += i
+    return s
+
+total = f(10) + f(5)
+"""
+
+def test_line_timer():
+    with TemporaryDirectory() as td:
+        fname = os.path.join(td, 'script.py')
+        with open(fname, 'w') as f:
+            f.write(src)
+        ns = {}
+        code = compile(src, fname, 'exec')
+        timer = LineTimer(fname)
+        # stdlib code called by the script is not traced
+        timer.runcall(exec, code, ns)
+        nt.assert_equal(ns['total'], 55)
+        nt.assert_equal(timer.hits, {1: 1, 2: 2, 3: 17, 4: 15, 5: 2, 7: 1})
+        nt.assert_equal(set(timer.times), set(timer.hits))
+        # the call line includes the time of the calls
+        nt.assert_true(timer.times[7] >= timer.times[4])
+        report = timer.report().splitlines()
+        nt.assert_equal(len(report), 4 + src.count('\n'))
+        nt.assert_true(report[-1].endswith('total = f(10) + f(5)'))
+        nt.assert_equal(report[-2].strip(), '6')
+        colored = timer.report('Linux').splitlines()
+        nt.assert_equal(len(colored), len(report))
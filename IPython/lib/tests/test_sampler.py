@@ -0,0 +1,66 @@
+"""Tests for the sampling profiler.
+"""
+#-----------------------------------------------------------------------------
+# Copyright (c) 2011, the IPython Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+# Third-party imports
+import nose.tools as nt
+
+# Our own imports
+from IPython.lib.sampler import Sampler, code_label
+
+#-----------------------------------------------------------------------------
+# Test functions
+#-----------------------------------------------------------------------------
+
+def inner():
+    return sum(i*i for i in range(1000))
+
+def outer():
+    return [inner() for i in range(300)]
+
+def check_sampler(sampler):
+    ns = dict(outer=outer)
+    sampler.runctx('outer()', ns, ns)
+    nt.assert_true(sampler.nsamples > 0)
+    labels = set(code_label(code) for code, in
+                 [stack[-1:] for stack in sampler.samples])
+    # Only the profiled code is seen, not the sampling machinery
+    for stack in sampler.samples:
+        nt.assert_equal(stack[0].co_name, '<module>')
+        nt.assert_true(stack[1] is outer.__code__)
+    nt.assert_true(any(l.startswith('inner') or l.startswith('<genexpr>')
+                       for l in labels))
+
+def test_signal():
+    check_sampler(Sampler(0.001))
+
+def test_thread():
+    check_sampler(Sampler(0.001, use_signal=False))
+
+def test_reports():
+    s = Sampler()
+    a, b, c = outer.__code__, inner.__code__, check_sampler.__code__
+    s.samples = {(a, b): 3, (a,): 1, (c, b): 4}
+    stats = s.flat_stats()
+    nt.assert_equal(stats[0], (7, 7, b))
+    nt.assert_equal(dict((code, (own, total)) for own, total, code in stats),
+                    {a: (1, 4), b: (7, 7), c: (0, 4)})
+    tree = s.call_tree()
+    nt.assert_equal(tree[a][0], 4)
+    nt.assert_equal(tree[a][1][b][0], 3)
+    lines = s.collapsed_stacks().splitlines()
+    nt.assert_equal(len(lines), 3)
+    nt.assert_true('%s;%s 3' % (code_label(a), code_label(b)) in lines)
+    report = s.report()
+    nt.assert_true(report.startswith('8 samples'))
+    nt.assert_true('  ' + code_label(b) in report)
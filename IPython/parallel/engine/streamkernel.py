@@ -37,6 +37,7 @@ from zmq.eventloop import ioloop, zmqstream
 # Local imports.
 from IPython.utils.traitlets import Instance, List, Int, Dict, Set, Unicode
 from IPython.zmq.completer import KernelCompleter
+from IPython.zmq.iostream import send_on_pub
 
 from IPython.parallel.error import wrap_exception
 from IPython.parallel.factory import SessionFactory
@@ -246,8 +247,8 @@ class Kernel(SessionFactory):
         except:
             self.log.error("Got bad msg: %s"%parent, exc_info=True)
             return
-        self.session.send(self.iopub_stream, 'pyin', {'code':code},parent=parent,
-                            ident='%s.pyin'%self.prefix)
+        send_on_pub(self.session, self.iopub_stream, 'pyin', {'code':code},
+                    parent=parent, ident='%s.pyin'%self.prefix)
         started = datetime.now()
         try:
             comp_code = self.compiler(code, '<zmq-kernel>')
@@ -260,11 +261,12 @@ class Kernel(SessionFactory):
         except:
             exc_content = self._wrap_exception('execute')
             # exc_msg = self.session.msg(u'pyerr', exc_content, parent)
-            self.session.send(self.iopub_stream, 'pyerr', exc_content, parent=parent,
-                            ident='%s.pyerr'%self.prefix)
+            send_on_pub(self.session, self.iopub_stream, 'pyerr', exc_content,
+                        parent=parent, ident='%s.pyerr'%self.prefix)
             reply_content = exc_content
         else:
             reply_content = {'status' : 'ok'}
+        self._end_output()
         
         reply_msg = self.session.send(stream, 'execute_reply', reply_content, parent=parent, 
                     ident=ident, subheader = dict(started=started))
@@ -340,8 +342,8 @@ class Kernel(SessionFactory):
         except:
             exc_content = self._wrap_exception('apply')
             # exc_msg = self.session.msg(u'pyerr', exc_content, parent)
-            self.session.send(self.iopub_stream, 'pyerr', exc_content, parent=parent,
-                                ident='%s.pyerr'%self.prefix)
+            send_on_pub(self.session, self.iopub_stream, 'pyerr', exc_content,
+                        parent=parent, ident='%s.pyerr'%self.prefix)
             reply_content = exc_content
             result_buf = []
             
@@ -359,8 +361,15 @@ class Kernel(SessionFactory):
         # flush i/o
         # should this be before reply_msg is sent, like in the single-kernel code, 
         # or should nothing get in the way of real results?
+        self._end_output()
+
+    def _end_output(self):
+        """Flush stdout/stderr, and close the output budget of the request."""
         sys.stdout.flush()
         sys.stderr.flush()
+        publisher = getattr(sys.stdout, 'publisher', None)
+        if publisher is not None:
+            publisher.end_request()
     
     def dispatch_queue(self, stream, msg):
         self.control_stream.flush()
@@ -13,10 +13,15 @@
 # Imports
 #-----------------------------------------------------------------------------
 
+import weakref
+
 #-----------------------------------------------------------------------------
 # Code
 #-----------------------------------------------------------------------------
 
+# Map of class -> (stamp, members), see cached_class_members()
+_class_members_cache = weakref.WeakKeyDictionary()
+
 def get_class_members(cls):
     ret = dir(cls)
     if hasattr(cls,'__bases__'):
@@ -31,6 +36,58 @@ def get_class_members(cls):
     return ret
 
 
+def _class_stamp(cls):
+    """Return a value which changes when the bases of cls change, or when
+    attributes are added to or removed from cls or one of its bases.
+
+    The attribute names of each class are compared as sets, so that replacing
+    an attribute by another one is seen as well.
+    """
+    mro = cls.__mro__
+    return mro, tuple([frozenset(c.__dict__) for c in mro])
+
+
+def cached_class_members(cls):
+    """Return the sorted list of the attribute names of cls and its bases.
+
+    Like get_class_members(), without duplicates.  The result is cached, and
+    computed again only when cls changes (see _class_stamp()).
+    """
+    try:
+        stamp = _class_stamp(cls)
+        cached = _class_members_cache.get(cls)
+    except (AttributeError, TypeError):
+        # Not a regular class (e.g. a proxy lying to hasattr), or can't be
+        # weakly referenced
+        return sorted(set(get_class_members(cls)))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    members = sorted(set(get_class_members(cls)))
+    _class_members_cache[cls] = (stamp, members)
+    return members
+
+
+def _instance_dir(obj):
+    """Return dir(obj) without the class members, or None if dir(obj) may
+    not be made of the class members and the instance __dict__ only."""
+    cls = type(obj)
+    if isinstance(obj, type):
+        return None
+    # object only has a __dir__ from Python 3.3
+    for c in cls.__mro__[:-1]:
+        if '__dir__' in vars(c):
+            return None
+    try:
+        d = obj.__dict__
+    except AttributeError:
+        return []
+    except Exception:
+        return None
+    if not isinstance(d, dict):
+        return None
+    return list(d)
+
+
 def dir2(obj):
     """dir2(obj) -> list of strings
 
@@ -45,12 +102,16 @@ def dir2(obj):
     """
 
     # Start building the attribute list via dir(), and then complete it
-    # with a few extra special-purpose calls.
-    words = dir(obj)
+    # with a few extra special-purpose calls.  For the common objects whose
+    # dir() is their __dict__ and their class members, the latter are taken
+    # from the cache instead of walking the class hierarchy again.
+    words = _instance_dir(obj)
+    if words is None:
+        words = dir(obj)
 
     if hasattr(obj,'__class__'):
         words.append('__class__')
-        words.extend(get_class_members(obj.__class__))
+        words.extend(cached_class_members(obj.__class__))
     #if '__base__' in words: 1/0
 
     # Some libraries (such as traits) may introduce duplicates, we want to
@@ -125,20 +125,12 @@ def filefind(filename, path_dirs=None):
     Raises :exc:`IOError` or returns absolute path to file.
     """
     
-    # If paths are quoted, abspath gets confused, strip them...
-    filename = filename.strip('"').strip("'")
+    filename, path_dirs = _filefind_args(filename, path_dirs)
     # If the input is an absolute path, just check it exists
     if os.path.isabs(filename) and os.path.isfile(filename):
         return filename
         
-    if path_dirs is None:
-        path_dirs = ("",)
-    elif isinstance(path_dirs, str):
-        path_dirs = (path_dirs,)
-        
-    for path in path_dirs:
-        if path == '.': path = os.getcwd()
-        testname = expand_path(os.path.join(path, filename))
+    for testname in filefind_paths(filename, path_dirs):
         if os.path.isfile(testname):
             return os.path.abspath(testname)
         
@@ -146,6 +138,31 @@ def filefind(filename, path_dirs=None):
                   (filename, path_dirs) )
 
 
+def filefind_paths(filename, path_dirs=None):
+    """Return the list of the paths where :func:`filefind` looks for a file,
+    in order, e.g. to watch them for changes.
+
+    The arguments are those of :func:`filefind`.
+    """
+    filename, path_dirs = _filefind_args(filename, path_dirs)
+    paths = []
+    for path in path_dirs:
+        if path == '.': path = os.getcwd()
+        paths.append(expand_path(os.path.join(path, filename)))
+    return paths
+
+
+def _filefind_args(filename, path_dirs):
+    """Normalize the arguments of :func:`filefind`."""
+    # If paths are quoted, abspath gets confused, strip them...
+    filename = filename.strip('"').strip("'")
+    if path_dirs is None:
+        path_dirs = ("",)
+    elif isinstance(path_dirs, str):
+        path_dirs = (path_dirs,)
+    return filename, path_dirs
+
+
 class HomeDirError(Exception):
     pass
 
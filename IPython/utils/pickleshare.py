@@ -27,6 +27,10 @@ This module is certainly not ZODB, but can be used for low-load
 (non-mission-critical) situations where tiny code size trumps the 
 advanced features of a "real" object database.
 
+SQLiteShareDB has the same interface, but keeps the whole database in a single
+SQLite file, which is much faster when there are many keys, or when the files
+are on a network file system.
+
 Installation guide: easy_install pickleshare
 
 Author: Ville Vainio <vivainio@gmail.com>
@@ -38,6 +42,11 @@ from IPython.external.path import path as Path
 import os,stat,time
 import pickle as pickle
 import glob
+import collections
+import fnmatch
+import re
+import sqlite3
+import threading
 
 def gethashfile(key):
     return ("%02x" % abs(hash(key) % 256))[-2:]
@@ -271,6 +280,223 @@ class PickleShareLink:
             self.__dict__['keydir'],
             ";".join([Path(k).basename() for k in keys]))
             
+
+
+class SQLiteShareDB(collections.MutableMapping):
+    """ A PickleShareDB stored in a single SQLite file
+
+    The API is that of PickleShareDB, but all the keys live in one file, named
+    after the directory PickleShareDB would use, plus a '.sqlite' extension.
+    This avoids a stat() and a file read per key, and the directory walks of
+    keys(), which are slow on network file systems.  The values of hset() are
+    stored one by one, so hget() doesn't read a whole bucket.
+
+    Unpickled values are cached, and the cache is dropped whenever another
+    process changes the file (watched with SQLite's data_version).
+
+    When the file is created next to an existing PickleShareDB directory, the
+    content of the directory is copied into it.  The directory itself is left
+    alone, for older versions.
+    """
+
+    # Stable protocol for the keys of hset(), which are stored pickled
+    _key_protocol = 2
+
+    def __init__(self, root, migrate=True):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.filename = self.root + '.sqlite'
+        parent = os.path.dirname(self.filename)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        # Connections can be shared by threads, as long as they take turns
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.filename, timeout=10,
+                                    check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS store
+                              (key text PRIMARY KEY, value blob)""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS hashes
+                              (hashroot text, key blob, value blob,
+                              PRIMARY KEY (hashroot, key))""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS meta
+                              (name text PRIMARY KEY, value text)""")
+        # cache has { 'key' : obj }
+        self.cache = {}
+        self._data_version = None
+        if migrate and os.path.isdir(self.root):
+            self._migrate()
+
+    def _migrate(self):
+        """ Copy the content of the PickleShareDB directory, once """
+        # A connection of its own, without the implicit transactions of the
+        # sqlite3 module, for the explicit transaction below
+        conn = sqlite3.connect(self.filename, timeout=10,
+                               isolation_level=None)
+        try:
+            # Take the write lock first, so only one process copies
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = conn.execute("SELECT value FROM meta WHERE "
+                                    "name='migrated'").fetchone()
+                if done is None:
+                    self._copy_directory(conn, PickleShareDB(self.root))
+                    conn.execute("INSERT INTO meta VALUES ('migrated', ?)",
+                                 (self.root,))
+            except:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _copy_directory(self, conn, old):
+        bucket_re = re.compile('^([0-9a-f]{2}|xx)$')
+        for key in old.keys():
+            try:
+                value = old[key]
+            except KeyError:
+                # unreadable, as PickleShareDB would say
+                continue
+            conn.execute("INSERT OR REPLACE INTO store VALUES (?, ?)",
+                         (key, self._dumps(value)))
+            hashroot, _, name = key.rpartition('/')
+            if hashroot and bucket_re.match(name) and isinstance(value, dict):
+                # An hset() bucket
+                for k, v in value.items():
+                    conn.execute("INSERT OR REPLACE INTO hashes VALUES "
+                                 "(?, ?, ?)", (hashroot,
+                                 self._dumps(k, self._key_protocol),
+                                 self._dumps(v)))
+        old.uncache()
+
+    def _dumps(self, obj, protocol=pickle.HIGHEST_PROTOCOL):
+        return sqlite3.Binary(pickle.dumps(obj, protocol))
+
+    def _check_cache(self):
+        """ Drop the cache if another connection changed the file """
+        row = self.conn.execute("PRAGMA data_version").fetchone()
+        version = row[0] if row else None
+        if version is None or version != self._data_version:
+            self.cache = {}
+            self._data_version = version
+
+    def __getitem__(self, key):
+        """ db['key'] reading """
+        with self._lock:
+            self._check_cache()
+            if key in self.cache:
+                return self.cache[key]
+            row = self.conn.execute("SELECT value FROM store WHERE key=?",
+                                    (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            try:
+                obj = pickle.loads(row[0])
+            except:
+                raise KeyError(key)
+            self.cache[key] = obj
+            return obj
+
+    def __setitem__(self, key, value):
+        """ db['key'] = 5 """
+        blob = self._dumps(value)
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO store VALUES (?, ?)",
+                                  (key, blob))
+            self.cache[key] = value
+
+    def __delitem__(self, key):
+        """ del db["key"] """
+        # Like PickleShareDB, deleting a missing key is not an error
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM store WHERE key=?", (key,))
+            self.cache.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM store").fetchone()[0]
+
+    def keys(self, globpat = None):
+        """ All keys in DB, or all keys matching a glob
+
+        As with files, wildcards don't match the '/' separating the parts of
+        keys.
+        """
+        with self._lock:
+            if globpat is None:
+                cur = self.conn.execute("SELECT key FROM store ORDER BY key")
+                return [row[0] for row in cur]
+            # SQLite's GLOB lets '*' match '/', so check the parts afterwards
+            cur = self.conn.execute("SELECT key FROM store WHERE key GLOB ? "
+                                    "ORDER BY key", (globpat,))
+            keys = [row[0] for row in cur]
+        parts = globpat.split('/')
+        return [k for k in keys if len(k.split('/')) == len(parts) and
+                all(fnmatch.fnmatchcase(kp, p)
+                    for kp, p in zip(k.split('/'), parts))]
+
+    def hset(self, hashroot, key, value):
+        """ hashed set """
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO hashes VALUES "
+                                  "(?, ?, ?)", (hashroot.strip('/'),
+                                  self._dumps(key, self._key_protocol),
+                                  self._dumps(value)))
+
+    def hget(self, hashroot, key, default = _sentinel, fast_only = True):
+        """ hashed get """
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM hashes WHERE "
+                                    "hashroot=? AND key=?",
+                                    (hashroot.strip('/'),
+                                     self._dumps(key, self._key_protocol))
+                                    ).fetchone()
+        if row is None:
+            if default is _sentinel:
+                raise KeyError(key)
+            return default
+        return pickle.loads(row[0])
+
+    def hdict(self, hashroot):
+        """ Get all data contained in hashed category 'hashroot' as dict """
+        with self._lock:
+            cur = self.conn.execute("SELECT key, value FROM hashes WHERE "
+                                    "hashroot=?", (hashroot.strip('/'),))
+            rows = cur.fetchall()
+        return dict((pickle.loads(k), pickle.loads(v)) for k, v in rows)
+
+    def hcompress(self, hashroot):
+        """ Nothing to do: hashed values are always stored one by one """
+        pass
+
+    def uncache(self,*items):
+        """ Removes all, or specified items from cache """
+        if not items:
+            self.cache = {}
+        for it in items:
+            self.cache.pop(it,None)
+
+    waitget = PickleShareDB.waitget
+    getlink = PickleShareDB.getlink
+
+    def close(self):
+        self.conn.close()
+
+    def __repr__(self):
+        return "SQLiteShareDB('%s')" % self.root
+
+
+# The storage backends of ip.db, see InteractiveShell.db_backend
+backends = {'directory' : PickleShareDB,
+            'sqlite' : SQLiteShareDB}
+
         
 def test():
     db = PickleShareDB('~/testpickleshare')
@@ -0,0 +1,70 @@
+"""Tests for IPython.utils.dir2."""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+import nose.tools as nt
+
+from IPython.utils.dir2 import dir2, cached_class_members
+
+#-----------------------------------------------------------------------------
+# Tests
+#-----------------------------------------------------------------------------
+
+class Base(object):
+    x = 1
+
+class Derived(Base):
+    def __init__(self):
+        self.y = 2
+
+class Custom(object):
+    def __dir__(self):
+        return ['z']
+
+class SubCustom(Custom):
+    pass
+
+
+def test_dir2():
+    obj = Derived()
+    words = dir2(obj)
+    for name in ['x', 'y', '__class__', '__init__']:
+        nt.assert_true(name in words)
+    nt.assert_equal(set(words), set(dir(obj)) | set(['__class__']))
+    nt.assert_true('z' in dir2(Custom()))
+    nt.assert_true('z' in dir2(SubCustom()))
+
+
+def test_cached_class_members():
+    members = cached_class_members(Derived)
+    nt.assert_true(cached_class_members(Derived) is members)
+    nt.assert_equal(members, sorted(set(dir(Derived))))
+    # Changes to the class or its bases invalidate the cache
+    Base.w = 3
+    try:
+        nt.assert_true('w' in cached_class_members(Derived))
+        nt.assert_true('w' in dir2(Derived()))
+    finally:
+        del Base.w
+    nt.assert_false('w' in cached_class_members(Derived))
+
+
+def test_cached_class_members_renamed():
+    """Replacing an attribute by another one invalidates the cache"""
+    class A(Base):
+        a = 1
+    nt.assert_true('a' in cached_class_members(A))
+    del A.a
+    A.b = 2
+    members = cached_class_members(A)
+    nt.assert_false('a' in members)
+    nt.assert_true('b' in members)
@@ -0,0 +1,112 @@
+# encoding: utf-8
+"""Tests for IPython.utils.pickleshare"""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+import os
+
+import nose.tools as nt
+
+from IPython.utils.pickleshare import PickleShareDB, SQLiteShareDB
+from IPython.utils.tempdir import TemporaryDirectory
+
+#-----------------------------------------------------------------------------
+# Tests
+#-----------------------------------------------------------------------------
+
+def check_dict_api(db):
+    db['hello'] = 15
+    db['aku ankka'] = [1, 2, 313]
+    db['paths/are/ok/key'] = [1, (5, 46)]
+    nt.assert_equal(db['hello'], 15)
+    nt.assert_equal(db.get('nothere', 'default'), 'default')
+    nt.assert_raises(KeyError, db.__getitem__, 'nothere')
+    nt.assert_equal(sorted(db.keys()),
+                    ['aku ankka', 'hello', 'paths/are/ok/key'])
+    nt.assert_equal(db.keys('paths/are/ok/k*'), ['paths/are/ok/key'])
+    # wildcards don't cross the path separators
+    nt.assert_equal(db.keys('paths/*'), [])
+    del db['aku ankka']
+    nt.assert_equal(db.get('aku ankka'), None)
+    # deleting a missing key is fine
+    del db['aku ankka']
+    db.hset('hash', 'aku', 12)
+    db.hset('hash', 'ankka', 313)
+    nt.assert_equal(db.hget('hash', 'aku'), 12)
+    nt.assert_equal(db.hget('hash', 'nope', 7), 7)
+    nt.assert_equal(db.hdict('hash'), {'aku': 12, 'ankka': 313})
+
+def test_directory():
+    with TemporaryDirectory() as td:
+        check_dict_api(PickleShareDB(os.path.join(td, 'db')))
+
+def test_sqlite():
+    with TemporaryDirectory() as td:
+        db = SQLiteShareDB(os.path.join(td, 'db'))
+        check_dict_api(db)
+        nt.assert_true('hello' in db)
+        nt.assert_equal(len(db), 2)
+        nt.assert_equal(os.listdir(td), ['db.sqlite'])
+        db.close()
+
+def test_sqlite_shared():
+    """Changes made by another connection are seen, despite the cache"""
+    with TemporaryDirectory() as td:
+        db1 = SQLiteShareDB(os.path.join(td, 'db'))
+        db2 = SQLiteShareDB(os.path.join(td, 'db'))
+        db1['x'] = 1
+        nt.assert_equal(db2['x'], 1)
+        db1['x'] = 2
+        nt.assert_equal(db2['x'], 2)
+        del db1['x']
+        nt.assert_false('x' in db2)
+        db1.close()
+        db2.close()
+
+def test_migration():
+    with TemporaryDirectory() as td:
+        root = os.path.join(td, 'db')
+        old = PickleShareDB(root)
+        old['bookmarks'] = {'home': '/home'}
+        old['stored/x'] = 42
+        old.hset('hash', 'aku', 12)
+        db = SQLiteShareDB(root)
+        nt.assert_equal(db['bookmarks'], {'home': '/home'})
+        nt.assert_equal(db['stored/x'], 42)
+        nt.assert_equal(db.hget('hash', 'aku'), 12)
+        # Only once: later changes to the directory are not copied
+        old['stored/y'] = 1
+        db.close()
+        db = SQLiteShareDB(root)
+        nt.assert_false('stored/y' in db)
+        db.close()
+
+def test_migration_rollback():
+    """A failed copy leaves nothing behind, and is done again next time"""
+    with TemporaryDirectory() as td:
+        root = os.path.join(td, 'db')
+        old = PickleShareDB(root)
+        old['bookmarks'] = {'home': '/home'}
+        old['stored/x'] = 42
+        class Failing(SQLiteShareDB):
+            def _copy_directory(self, conn, old):
+                conn.execute("INSERT INTO store VALUES ('partial', NULL)")
+                raise IOError
+        nt.assert_raises(IOError, Failing, root)
+        db = SQLiteShareDB(root)
+        nt.assert_false('partial' in db)
+        nt.assert_equal(db['stored/x'], 42)
+        db['y'] = 1
+        db.close()
+        db = SQLiteShareDB(root)
+        nt.assert_equal(db['y'], 1)
+        db.close()
@@ -0,0 +1,72 @@
+# encoding: utf-8
+"""Tests for IPython.utils.timing"""
+
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+import json
+
+import nose.tools as nt
+
+from IPython.utils.timing import StepTimer, TimeitResult, format_time
+
+#-----------------------------------------------------------------------------
+# Tests
+#-----------------------------------------------------------------------------
+
+def test_format_time():
+    nt.assert_equal(format_time(2.5), '2.5 s')
+    nt.assert_equal(format_time(0.0025), '2.5 ms')
+    nt.assert_equal(format_time(53.25e-9), '53.2 ns')
+    nt.assert_equal(format_time(0.0), '0 ns')
+
+def test_stats():
+    r = TimeitResult(10, [4.0, 1.0, 3.0, 2.0, 5.0])
+    nt.assert_equal((r.best, r.worst, r.mean, r.repeat), (1.0, 5.0, 3.0, 5))
+    nt.assert_almost_equal(r.stdev, 2.5**0.5)
+    nt.assert_almost_equal(r.rel_error, 0.5**0.5 / 3)
+    nt.assert_equal(r.percentile(50), 3.0)
+    nt.assert_equal(r.percentile(25), 2.0)
+    nt.assert_almost_equal(r.percentile(95), 4.8)
+    nt.assert_equal(TimeitResult(1, [1.0]).stdev, 0.0)
+
+def test_compare():
+    base = TimeitResult(10, [1.0, 1.1, 0.9, 1.0])
+    ratio, significant = TimeitResult(10, [2.0, 2.1, 1.9, 2.0]).compare(base)
+    nt.assert_almost_equal(ratio, 2.0)
+    nt.assert_true(significant)
+    ratio, significant = TimeitResult(10, [1.2, 0.8, 1.1, 0.9]).compare(base)
+    nt.assert_false(significant)
+    nt.assert_true('times faster' in
+                   TimeitResult(10, [0.5, 0.5]).format_comparison(base))
+
+def test_json():
+    r = TimeitResult(100, [1e-6, 2e-6], 0.5, 'x = 1', True, precision=5)
+    d = json.loads(r.to_json())
+    nt.assert_equal(d['mean'], r.mean)
+    nt.assert_equal(d['percentiles']['50'], r.percentile(50))
+    r2 = TimeitResult.from_dict(d)
+    nt.assert_equal((r2.loops, r2.timings, r2.compile_time, r2.stmt, r2.gc,
+                     r2.precision),
+                    (100, [1e-6, 2e-6], 0.5, 'x = 1', True, 5))
+    nt.assert_equal(str(r2), str(r))
+
+def test_step_timer():
+    clock = iter([0.0, 1.0, 3.0, 3.5, 4.0]).__next__
+    timer = StepTimer(clock)
+    nt.assert_equal(timer.call(max, 2, 3), 3)
+    nt.assert_equal(timer.call(min, 2, 3), 2)
+    nt.assert_equal(timer.steps, [('max', 2.0), ('min', 0.5)])
+    nt.assert_equal(timer.total, 4.0)
+    report = timer.report('Startup').splitlines()
+    nt.assert_equal(report[0].split(), ['Startup', '4', 's'])
+    nt.assert_equal(report[1].split(), ['max', '2', 's', '50.0%'])
+    nt.assert_equal(report[3].split(), ['(other)', '1.5', 's', '37.5%'])
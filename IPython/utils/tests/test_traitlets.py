@@ -209,6 +209,41 @@ class TestHasTraitsMeta(TestCase):
         self.assertEquals(B.tt.this_class, B)
         self.assertEquals(B.ttt.this_class, B)
 
+    def test_trait_table(self):
+        class A(HasTraits):
+            x = Int(1)
+            y = Int(2)
+        class B(A):
+            y = Unicode('b')
+            z = Float()
+        self.assertEquals([n for n, t in A._trait_table()], ['x', 'y'])
+        self.assertEquals(B._trait_table(), [('x', A.x), ('y', B.y),
+                                             ('z', B.z)])
+        # Changes made after the classes were created are seen
+        class C(HasTraits):
+            x = Int(1)
+        tables = C._trait_tables()
+        def _x_default(self):
+            return 10
+        A._x_default = _x_default
+        self.assertEquals(B().x, 10)
+        # by the class and its subclasses only
+        self.assertTrue(C._trait_tables() is tables)
+        del A._x_default
+        self.assertEquals(B().x, 1)
+        B.y = 5
+        self.assertEquals([n for n, t in B._trait_table()], ['x', 'z'])
+        self.assertEquals(sorted(B.class_trait_names()), ['x', 'z'])
+        self.assertEquals(B().y, 5)
+        # Shadowing an inherited trait, and uncovering it again
+        A()
+        B.x = 3
+        self.assertEquals([n for n, t in B._trait_table()], ['z'])
+        self.assertEquals(B().x, 3)
+        del B.x
+        self.assertEquals([n for n, t in B._trait_table()], ['x', 'z'])
+        self.assertEquals(B().x, 1)
+
 class TestHasTraitsNotify(TestCase):
 
     def setUp(self):
@@ -259,6 +294,63 @@ class TestHasTraitsNotify(TestCase):
         self.assert_(('a',0,10) in self._notify1)
         self.assertRaises(TraitError,setattr,a,'a','bad string')
 
+    def test_notify_repeated(self):
+        """Notifying doesn't add to the lists of notifiers"""
+
+        class A(HasTraits):
+            a = Int
+            count = 0
+            def _a_changed(self):
+                self.count += 1
+
+        a = A()
+        a.on_trait_change(self.notify1, 'a')
+        a.on_trait_change(self.notify1)
+        for i in range(1, 4):
+            a.a = i
+        self.assertEquals(len(self._notify1), 6)
+        self.assertEquals(a.count, 3)
+        self.assertEquals(len(a._trait_notifiers['a']), 1)
+        self.assertEquals(len(a._trait_notifiers['anytrait']), 1)
+
+    def test_notify_instance_handler(self):
+        """A _<name>_changed handler set on an instance is called"""
+
+        class A(HasTraits):
+            a = Int
+            b = Int
+            def _b_changed(self, name, new):
+                self.changes.append(('class', new))
+
+        a = A()
+        a.changes = []
+        a._a_changed = lambda name, old, new: a.changes.append((old, new))
+        a._b_changed = lambda name, new: a.changes.append(('instance', new))
+        a.a = 1
+        a.b = 2
+        self.assertEquals(a.changes, [(0, 1), ('instance', 2)])
+        del a._b_changed
+        a.b = 3
+        self.assertEquals(a.changes[-1], ('class', 3))
+
+    def test_notify_remove_during(self):
+        """A notifier can remove itself while being called"""
+
+        class A(HasTraits):
+            a = Int
+
+        a = A()
+        calls = []
+        def once(name, new):
+            calls.append(new)
+            a.on_trait_change(once, 'a', remove=True)
+        a.on_trait_change(once, 'a')
+        a.on_trait_change(self.notify1, 'a')
+        a.a = 1
+        a.a = 2
+        self.assertEquals(calls, [1])
+        self.assertEquals(len(self._notify1), 2)
+
     def test_subclass(self):
 
         class A(HasTraits):
@@ -14,6 +14,8 @@ Utilities for timing code execution.
 # Imports
 #-----------------------------------------------------------------------------
 
+import json
+import math
 import time
 
 #-----------------------------------------------------------------------------
@@ -114,3 +116,216 @@ def timing(func,*args,**kw):
 
     return timings_out(1,func,*args,**kw)[0]
 
+
+
+# XXX: Unfortunately the unicode 'micro' symbol can cause problems in certain
+# terminals (see https://bugs.launchpad.net/ipython/+bug/348466), so plain 'us'
+# is used for microseconds.
+_units = ["s", "ms", 'us', "ns"]
+_scaling = [1, 1e3, 1e6, 1e9]
+
+def format_time(timespan, precision=3):
+    """Format a time in seconds with a unit fitting its magnitude, e.g.
+    format_time(0.0000532) -> '53.2 us'."""
+    if timespan > 0.0 and timespan < 1000.0:
+        order = min(-int(math.floor(math.log10(timespan)) // 3), 3)
+    elif timespan >= 1000.0:
+        order = 0
+    else:
+        order = 3
+    return "%.*g %s" % (precision, timespan * _scaling[order], _units[order])
+
+
+class TimeitResult(object):
+    """The timings of a statement, as measured by %timeit.
+
+    Parameters
+    ----------
+    loops : int
+      The number of times the statement was executed in each run.
+    timings : list of floats
+      The time per loop of each run, in seconds.
+    compile_time : float
+      The time taken to compile the statement.
+    stmt : str
+      The timed statement.
+    gc : bool
+      Whether garbage collection was enabled during the runs.
+    precision : int
+      The number of digits of the times in the summaries.
+    """
+
+    def __init__(self, loops, timings, compile_time=0.0, stmt='', gc=False,
+                 precision=3):
+        self.loops = loops
+        self.timings = list(timings)
+        self.compile_time = compile_time
+        self.stmt = stmt
+        self.gc = gc
+        self.precision = precision
+
+    @property
+    def repeat(self):
+        """The number of runs."""
+        return len(self.timings)
+
+    @property
+    def best(self):
+        return min(self.timings)
+
+    @property
+    def worst(self):
+        return max(self.timings)
+
+    @property
+    def mean(self):
+        return math.fsum(self.timings) / len(self.timings)
+
+    @property
+    def stdev(self):
+        """The sample standard deviation of the runs."""
+        n = len(self.timings)
+        if n < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(math.fsum((t - mean)**2 for t in self.timings)
+                         / (n - 1))
+
+    @property
+    def rel_error(self):
+        """The standard error of the mean, relative to the mean."""
+        n = len(self.timings)
+        mean = self.mean
+        if n < 2 or mean <= 0:
+            return float('inf')
+        return self.stdev / math.sqrt(n) / mean
+
+    def percentile(self, p):
+        """Return the p-th percentile (0 <= p <= 100) of the runs,
+        interpolating between the closest ones."""
+        timings = sorted(self.timings)
+        k = (len(timings) - 1) * p / 100.0
+        lo = int(math.floor(k))
+        hi = min(lo + 1, len(timings) - 1)
+        return timings[lo] + (timings[hi] - timings[lo]) * (k - lo)
+
+    def compare(self, baseline, sigmas=2.0):
+        """Compare the mean time with that of baseline, another result.
+
+        Returns (ratio, significant): the ratio of the means (> 1 if slower
+        than baseline), and whether their difference exceeds `sigmas`
+        standard errors.
+        """
+        ratio = self.mean / baseline.mean
+        err = math.sqrt(sum(r.stdev**2 / r.repeat for r in (self, baseline)))
+        significant = abs(self.mean - baseline.mean) > sigmas * err
+        return ratio, significant
+
+    def format_comparison(self, baseline):
+        """Return a one-line comparison with baseline."""
+        ratio, significant = self.compare(baseline)
+        if ratio >= 1:
+            change = '%.3g times slower' % ratio
+        else:
+            change = '%.3g times faster' % (1 / ratio)
+        return 'vs. baseline: %s (mean %s vs. %s), %s' % (change,
+                self._fmt(self.mean), self._fmt(baseline.mean),
+                'significant' if significant else 'not significant')
+
+    def _fmt(self, timespan):
+        return format_time(timespan, self.precision)
+
+    def summary(self):
+        """Return the report printed by %timeit."""
+        fmt = self._fmt
+        lines = ["%d loops, best of %d: %s per loop" % (self.loops,
+                                                       self.repeat,
+                                                       fmt(self.best))]
+        if self.repeat > 1:
+            lines.append("mean %s, std %s (rel. error %.2g%%), worst %s" %
+                         (fmt(self.mean), fmt(self.stdev),
+                          self.rel_error * 100, fmt(self.worst)))
+            lines.append("percentiles: " + ", ".join(
+                "%i%% %s" % (p, fmt(self.percentile(p)))
+                for p in (5, 25, 50, 75, 95)))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return "<TimeitResult : %s +- %s per loop (%d runs, %d loops each)>" % (
+            self._fmt(self.mean), self._fmt(self.stdev), self.repeat,
+            self.loops)
+
+    #-------------------------------------------------------------------------
+    # Serialization
+    #-------------------------------------------------------------------------
+
+    def to_dict(self):
+        """Return the timings and their statistics as a dict."""
+        return dict(stmt=self.stmt, loops=self.loops, timings=self.timings,
+                    compile_time=self.compile_time, gc=self.gc,
+                    precision=self.precision, best=self.best, worst=self.worst, mean=self.mean,
+                    stdev=self.stdev,
+                    percentiles=dict((str(p), self.percentile(p))
+                                     for p in (5, 25, 50, 75, 95)))
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=1, sort_keys=True)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['loops'], d['timings'], d.get('compile_time', 0.0),
+                   d.get('stmt', ''), d.get('gc', False),
+                   d.get('precision', 3))
+
+    def save(self, filename):
+        """Save the result as JSON in filename."""
+        with open(filename, 'w') as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, filename):
+        """Load a result saved by save()."""
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+
+class StepTimer(object):
+    """Record the time taken by the successive steps of a process, e.g. the
+    initialization of the shell.
+
+    `steps` is a list of (name, seconds) pairs, in the order the steps ran.
+    The time elapsed since the creation of the timer which no step accounts
+    for is reported as '(other)'.
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self.start = self.end = timer()
+        self.steps = []
+
+    @property
+    def total(self):
+        """The time from the creation of the timer to the end of the last
+        step."""
+        return self.end - self.start
+
+    def call(self, func, *args, **kw):
+        """Call func(*args, **kw) as a step named after func, and return its
+        result."""
+        t0 = self.timer()
+        try:
+            return func(*args, **kw)
+        finally:
+            self.end = self.timer()
+            self.steps.append((func.__name__, self.end - t0))
+
+    def report(self, title='Total', precision=3):
+        """Return a table of the time taken by each step."""
+        total = self.total
+        other = max(total - sum(t for name, t in self.steps), 0.0)
+        percent = lambda t: 100 * t / total if total else 0.0
+        out = ['%-32s %10s\n' % (title, format_time(total, precision))]
+        for name, t in self.steps + [('(other)', other)]:
+            out.append('  %-30s %10s %6.1f%%\n' % (name,
+                       format_time(t, precision), percent(t)))
+        return ''.join(out)
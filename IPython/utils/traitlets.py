@@ -143,6 +143,36 @@ class _SimpleTest:
         return self.__repr__()
 
 
+def _notifier_nargs(c):
+    """Return the number of arguments a trait change callback takes, not
+    counting the 'self' of methods."""
+    if not isinstance(c, collections.Callable):
+        raise TraitError('a trait changed callback '
+                            'must be callable.')
+    nargs = len(inspect.getargspec(c)[0])
+    # Bound methods have an additional 'self' argument
+    # I don't know how to treat unbound methods, but they
+    # can't really be used for callbacks.
+    if isinstance(c, types.MethodType):
+        nargs -= 1
+    if nargs > 3:
+        raise TraitError('a trait changed callback '
+                            'must have 0-3 arguments.')
+    return nargs
+
+
+def _call_notifier(c, nargs, name, old_value, new_value):
+    """Call a trait change callback taking nargs arguments."""
+    if nargs == 0:
+        c()
+    elif nargs == 1:
+        c(name)
+    elif nargs == 2:
+        c(name, new_value)
+    else:
+        c(name, old_value, new_value)
+
+
 def getmembers(object, predicate=None):
     """A safe version of inspect.getmembers that handles missing attributes.
 
@@ -245,19 +275,29 @@ class TraitType(object):
         """
         # Check for a deferred initializer defined in the same class as the
         # trait declaration or above.
-        mro = type(obj).mro()
-        meth_name = '_%s_default' % self.name
-        for cls in mro[:mro.index(self.this_class)+1]:
-            if meth_name in cls.__dict__:
-                break
+        cls = type(obj)
+        if isinstance(cls, MetaHasTraits):
+            dyn_init = cls._trait_dyn_init(self)
         else:
+            dyn_init = self.find_dyn_init(cls)
+        if dyn_init is None:
             # We didn't find one. Do static initialization.
             dv = self.get_default_value()
             newdv = self._validate(obj, dv)
             obj._trait_values[self.name] = newdv
             return
         # Complete the dynamic initialization.
-        obj._trait_dyn_inits[self.name] = cls.__dict__[meth_name]
+        obj._trait_dyn_inits[self.name] = dyn_init
+
+    def find_dyn_init(self, cls):
+        """Return the deferred initializer (_<name>_default method) of this
+        trait in instances of cls, or None."""
+        mro = cls.mro()
+        meth_name = '_%s_default' % self.name
+        for c in mro[:mro.index(self.this_class)+1]:
+            if meth_name in c.__dict__:
+                return c.__dict__[meth_name]
+        return None
 
     def __get__(self, obj, cls=None):
         """Get the value of the trait by self.name for the instance.
@@ -343,6 +383,9 @@ class MetaHasTraits(type):
     
     This metaclass makes sure that any TraitType class attributes are
     instantiated and sets their name attribute.
+
+    It also keeps tables of the traits of each class, so that creating
+    instances doesn't have to look for them among all the class attributes.
     """
     
     def __new__(mcls, name, bases, classdict):
@@ -368,12 +411,117 @@ class MetaHasTraits(type):
         """Finish initializing the HasTraits class.
         
         This sets the :attr:`this_class` attribute of each TraitType in the
-        class dict to the newly created class ``cls``.
+        class dict to the newly created class ``cls``, and builds the trait
+        tables of the class.
         """
         for k, v in classdict.items():
             if isinstance(v, TraitType):
                 v.this_class = cls
         super(MetaHasTraits, cls).__init__(name, bases, classdict)
+        cls._build_trait_tables()
+
+    def __setattr__(cls, name, value):
+        if (isinstance(value, TraitType) or name.endswith(('_default',
+            '_changed')) or cls._is_trait_name(name)):
+            cls._invalidate_trait_tables()
+        super(MetaHasTraits, cls).__setattr__(name, value)
+
+    def __delattr__(cls, name):
+        if name.endswith(('_default', '_changed')) or cls._is_trait_name(name):
+            cls._invalidate_trait_tables()
+        super(MetaHasTraits, cls).__delattr__(name)
+
+    def _is_trait_name(cls, name):
+        """Whether a trait is defined as name in the class or in a base class,
+        even if shadowed (e.g. by ``B.x = 5`` in a subclass B)."""
+        return any(isinstance(c.__dict__.get(name), TraitType)
+                   for c in cls.__mro__)
+
+    def _invalidate_trait_tables(cls):
+        """Drop the trait tables of the class and its subclasses, after a
+        trait or a deferred initializer or notifier has been set or deleted;
+        they are built again on next use."""
+        classes = [cls]
+        while classes:
+            c = classes.pop()
+            type.__setattr__(c, '_trait_tables_cache', None)
+            classes.extend(type.__subclasses__(c))
+
+    def _build_trait_tables(cls):
+        """Compute the (traits, deferred initializers, static notifiers)
+        tables of the class."""
+        # Same order and semantics as looking up all of dir(cls)
+        traits = [memb for memb in getmembers(cls)
+                  if isinstance(memb[1], TraitType)]
+        dyn_inits = {}
+        for name, trait in traits:
+            try:
+                dyn_inits[name] = (trait, trait.find_dyn_init(cls))
+            except ValueError:
+                # trait.this_class is not a base of cls: leave the
+                # error to set_default_value
+                pass
+        tables = (traits, dyn_inits, {})
+        type.__setattr__(cls, '_trait_tables_cache', tables)
+        for name, trait in traits:
+            try:
+                cls._trait_static_notifier(name)
+            except TraitError:
+                # Bad signature: raise when the trait changes
+                pass
+        return tables
+
+    def _trait_tables(cls):
+        """Return the trait tables of the class, see _build_trait_tables()."""
+        tables = cls.__dict__.get('_trait_tables_cache')
+        if tables is None:
+            tables = cls._build_trait_tables()
+        return tables
+
+    def _trait_table(cls):
+        """Return the traits of the class, as a sorted list of (name, trait)
+        pairs."""
+        return cls._trait_tables()[0]
+
+    def _trait_static_notifier(cls, name):
+        """Return the static notifier of the trait name, as a (method name,
+        notifier) pair.
+
+        The notifier is the _<name>_changed function of the class, as a
+        (function, number of arguments besides self) pair, None if there is
+        none, or (None, None) if it isn't a plain function.  Instances may
+        have their own _<name>_changed attribute, which takes precedence.
+        """
+        notifiers = cls._trait_tables()[2]
+        try:
+            return notifiers[name]
+        except KeyError:
+            pass
+        meth_name = '_%s_changed' % name
+        for c in cls.__mro__:
+            if meth_name in c.__dict__:
+                func = c.__dict__[meth_name]
+                if type(func) is FunctionType:
+                    nargs = len(inspect.getargspec(func)[0]) - 1
+                    if nargs > 3:
+                        raise TraitError('a trait changed callback '
+                                            'must have 0-3 arguments.')
+                    notifier = (func, nargs)
+                else:
+                    notifier = (None, None)
+                break
+        else:
+            notifier = None
+        notifiers[name] = (meth_name, notifier)
+        return notifiers[name]
+
+    def _trait_dyn_init(cls, trait):
+        """Return the deferred initializer of trait in instances of cls, or
+        None."""
+        entry = cls._trait_tables()[1].get(trait.name)
+        if entry is not None and entry[0] is trait:
+            return entry[1]
+        return trait.find_dyn_init(cls)
 
 class HasTraits(object, metaclass=MetaHasTraits):
 
@@ -390,17 +538,8 @@ class HasTraits(object, metaclass=MetaHasTraits):
         inst._trait_dyn_inits = {}
         # Here we tell all the TraitType instances to set their default
         # values on the instance. 
-        for key in dir(cls):
-            # Some descriptors raise AttributeError like zope.interface's
-            # __provides__ attributes even though they exist.  This causes
-            # AttributeErrors even though they are listed in dir(cls).
-            try:
-                value = getattr(cls, key)
-            except AttributeError:
-                pass
-            else:
-                if isinstance(value, TraitType):
-                    value.instance_init(inst)
+        for key, value in cls._trait_table():
+            value.instance_init(inst)
 
         return inst
 
@@ -413,66 +552,48 @@ class HasTraits(object, metaclass=MetaHasTraits):
 
     def _notify_trait(self, name, old_value, new_value):
 
-        # First dynamic ones
-        callables = self._trait_notifiers.get(name,[])
-        more_callables = self._trait_notifiers.get('anytrait',[])
-        callables.extend(more_callables)
+        # First dynamic ones.  The lists are replaced, not changed, when
+        # notifiers are added or removed, so they can be iterated directly.
+        notifiers = self._trait_notifiers
+        if notifiers:
+            for c, nargs in notifiers.get(name, ()):
+                _call_notifier(c, nargs, name, old_value, new_value)
+            for c, nargs in notifiers.get('anytrait', ()):
+                _call_notifier(c, nargs, name, old_value, new_value)
 
         # Now static ones
-        try:
-            cb = getattr(self, '_%s_changed' % name)
-        except:
-            pass
+        meth_name, static = type(self)._trait_static_notifier(name)
+        if meth_name in self.__dict__:
+            # Set on the instance: not in the class table
+            static = (None, None)
+        elif static is None:
+            return
+        func, nargs = static
+        if func is None:
+            # Not a plain method: look it up and inspect it every time
+            c = getattr(self, meth_name)
+            _call_notifier(c, _notifier_nargs(c), name, old_value, new_value)
+        # Traits catches and logs errors here.  I allow them to raise
+        elif nargs == 0:
+            func(self)
+        elif nargs == 1:
+            func(self, name)
+        elif nargs == 2:
+            func(self, name, new_value)
         else:
-            callables.append(cb)
-
-        # Call them all now
-        for c in callables:
-            # Traits catches and logs errors here.  I allow them to raise
-            if isinstance(c, collections.Callable):
-                argspec = inspect.getargspec(c)
-                nargs = len(argspec[0])
-                # Bound methods have an additional 'self' argument
-                # I don't know how to treat unbound methods, but they
-                # can't really be used for callbacks.
-                if isinstance(c, types.MethodType):
-                    offset = -1
-                else:
-                    offset = 0
-                if nargs + offset == 0:
-                    c()
-                elif nargs + offset == 1:
-                    c(name)
-                elif nargs + offset == 2:
-                    c(name, new_value)
-                elif nargs + offset == 3:
-                    c(name, old_value, new_value)
-                else:
-                    raise TraitError('a trait changed callback '
-                                        'must have 0-3 arguments.')
-            else:
-                raise TraitError('a trait changed callback '
-                                    'must be callable.')
-                
+            func(self, name, old_value, new_value)
 
     def _add_notifiers(self, handler, name):
-        if name not in self._trait_notifiers:
-            nlist = []
-            self._trait_notifiers[name] = nlist
-        else:
-            nlist = self._trait_notifiers[name]
-        if handler not in nlist:
-            nlist.append(handler)
+        nlist = self._trait_notifiers.get(name, [])
+        if handler not in [c for c, nargs in nlist]:
+            self._trait_notifiers[name] = nlist + [(handler,
+                                                    _notifier_nargs(handler))]
 
     def _remove_notifiers(self, handler, name):
         if name in self._trait_notifiers:
-            nlist = self._trait_notifiers[name]
-            try:
-                index = nlist.index(handler)
-            except ValueError:
-                pass
-            else:
-                del nlist[index]
+            self._trait_notifiers[name] = [(c, nargs) for c, nargs
+                                           in self._trait_notifiers[name]
+                                           if c != handler]
 
     def on_trait_change(self, handler, name=None, remove=False):
         """Setup a handler to be called when a trait changes.
@@ -530,8 +651,7 @@ class HasTraits(object, metaclass=MetaHasTraits):
         exists, but has any value.  This is because get_metadata returns
         None if a metadata key doesn't exist.
         """
-        traits = dict([memb for memb in getmembers(cls) if \
-                     isinstance(memb[1], TraitType)])
+        traits = dict(cls._trait_table())
 
         if len(metadata) == 0:
             return traits
@@ -565,8 +685,7 @@ class HasTraits(object, metaclass=MetaHasTraits):
         exists, but has any value.  This is because get_metadata returns
         None if a metadata key doesn't exist.
         """
-        traits = dict([memb for memb in getmembers(self.__class__) if \
-                     isinstance(memb[1], TraitType)])
+        traits = dict(self.__class__._trait_table())
 
         if len(metadata) == 0:
             return traits
@@ -22,7 +22,8 @@ from IPython.utils import io
 from IPython.utils.traitlets import Type
 
 from .kernelmanager import (KernelManager, SubSocketChannel, HBSocketChannel,
-                           ShellSocketChannel, StdInSocketChannel)
+                           XReqSocketChannel, ShellSocketChannel,
+                           StdInSocketChannel, ControlSocketChannel)
 
 #-----------------------------------------------------------------------------
 # Functions and classes
@@ -61,10 +62,10 @@ class BlockingSubSocketChannel(SubSocketChannel):
         return msgs
 
 
-class BlockingShellSocketChannel(ShellSocketChannel):
+class BlockingXReqSocketChannel(XReqSocketChannel):
 
     def __init__(self, context, session, address=None):
-        super(BlockingShellSocketChannel, self).__init__(context, session,
+        super(BlockingXReqSocketChannel, self).__init__(context, session,
                                                         address)
         self._in_queue = Queue()
 
@@ -92,8 +93,18 @@ class BlockingShellSocketChannel(ShellSocketChannel):
             except Empty:
                 break
         return msgs
+
+
+class BlockingShellSocketChannel(ShellSocketChannel,
+                                 BlockingXReqSocketChannel):
+    pass
     
 
+class BlockingControlSocketChannel(ControlSocketChannel,
+                                   BlockingXReqSocketChannel):
+    pass
+
+
 class BlockingStdInSocketChannel(StdInSocketChannel):
     
     def call_handlers(self, msg):
@@ -118,4 +129,5 @@ class BlockingKernelManager(KernelManager):
     sub_channel_class = Type(BlockingSubSocketChannel)
     stdin_channel_class = Type(BlockingStdInSocketChannel)
     hb_channel_class = Type(BlockingHBSocketChannel)
+    control_channel_class = Type(BlockingControlSocketChannel)
   
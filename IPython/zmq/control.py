@@ -0,0 +1,128 @@
+"""A thread serving the kernel's control channel.
+
+The control channel is an XREP socket, separate from the shell channel, on
+which interrupts, connection info, completion, object info and history
+requests are answered immediately, even while the main thread is busy running
+an execute_request.  The thread has its own completer and object inspector,
+as those of the shell keep state while they work.
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+#-----------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------
+
+from _thread import interrupt_main
+from threading import Thread
+
+import zmq
+
+from IPython.core import oinspect
+from IPython.utils import PyColorize
+
+from .session import Message
+
+#-----------------------------------------------------------------------------
+# Code
+#-----------------------------------------------------------------------------
+
+class ControlThread(Thread):
+    """Serve the control channel of a kernel from a daemon thread.
+
+    The thread owns the control socket: it is the only one that ever reads
+    from or writes to it.  Requests are dispatched to the kernel handlers
+    listed in ``kernel.control_msg_types``, passing the control socket as the
+    stream to reply on.  The handlers use :meth:`complete` and
+    :meth:`object_inspect` for requests on the control socket, which only
+    read the shell's namespaces.
+    """
+
+    # Poll timeout, in milliseconds, so that stop() is honored promptly.
+    poll_timeout = 100
+
+    def __init__(self, kernel, socket):
+        Thread.__init__(self)
+        self.kernel = kernel
+        self.socket = socket
+        self.daemon = True
+        self._stop_now = False
+        # Created on first use, in this thread
+        self._completer = None
+        self._inspector = None
+
+    def run(self):
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        while not self._stop_now:
+            try:
+                events = dict(poller.poll(self.poll_timeout))
+            except zmq.ZMQError:
+                # e.g. EINTR, just poll again
+                continue
+            if self.socket in events:
+                self.do_one_request()
+
+    def stop(self):
+        self._stop_now = True
+
+    def do_one_request(self):
+        kernel = self.kernel
+        ident, msg = kernel.session.recv(self.socket, zmq.NOBLOCK)
+        if msg is None:
+            return
+        msg_type = msg['msg_type']
+        kernel.log.debug('*** CONTROL MESSAGE TYPE: %s ***' % msg_type)
+        if msg_type == 'interrupt_request':
+            self.interrupt_request(ident, msg)
+        elif msg_type in kernel.control_msg_types:
+            try:
+                kernel.handlers[msg_type](self.socket, ident, msg)
+            except Exception:
+                kernel.log.error("Error handling control message:\n%s" %
+                                 Message(msg), exc_info=True)
+                self._reply_status(ident, msg, 'error')
+        else:
+            kernel.log.error("UNKNOWN CONTROL MESSAGE TYPE: %r" % msg_type)
+            self._reply_status(ident, msg, 'error')
+
+    def complete(self, text, line=None, cursor_pos=None):
+        """Complete like the shell's complete(), with this thread's own
+        completer.
+
+        Unlike the shell's, it doesn't enter the shell's BuiltinTrap, which
+        the main thread may be entering and leaving meanwhile.
+        """
+        if self._completer is None:
+            self._completer = self.kernel.shell.new_completer()
+        return self._completer.complete(text, line, cursor_pos)
+
+    def object_inspect(self, oname):
+        """Inspect an object like the shell's object_inspect(), with this
+        thread's own inspector."""
+        shell = self.kernel.shell
+        if self._inspector is None:
+            self._inspector = oinspect.Inspector(oinspect.InspectColors,
+                                                 PyColorize.ANSICodeColors,
+                                                 'NoColor',
+                                                 shell.object_info_string_level)
+        info = shell._object_find(oname)
+        if info.found:
+            return self._inspector.info(info.obj, oname, info=info)
+        else:
+            return oinspect.object_info(name=oname, found=False)
+
+    def interrupt_request(self, ident, parent):
+        """Raise KeyboardInterrupt in the main thread."""
+        interrupt_main()
+        self.kernel.session.send(self.socket, 'interrupt_reply',
+                                 {'status' : 'ok'}, parent, ident=ident)
+
+    def _reply_status(self, ident, parent, status):
+        reply_type = parent['msg_type'].split('_')[0] + '_reply'
+        self.kernel.session.send(self.socket, reply_type,
+                                 {'status' : status}, parent, ident=ident)
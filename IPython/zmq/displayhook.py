@@ -3,6 +3,7 @@ from base64 import encodestring
 
 from IPython.core.displayhook import DisplayHook
 from IPython.utils.traitlets import Instance, Dict
+from .iostream import send_on_pub
 from .session import extract_header, Session
 
 class ZMQDisplayHook(object):
@@ -20,8 +21,9 @@ class ZMQDisplayHook(object):
             return
 
         builtins._ = obj
-        msg = self.session.send(self.pub_socket, 'pyout', {'data':repr(obj)},
-                               parent=self.parent_header, ident=self.topic)
+        msg = send_on_pub(self.session, self.pub_socket, 'pyout',
+                          {'data':repr(obj)}, parent=self.parent_header,
+                          ident=self.topic)
 
     def set_parent(self, parent):
         self.parent_header = extract_header(parent)
@@ -60,5 +62,5 @@ class ZMQShellDisplayHook(DisplayHook):
 
     def finish_displayhook(self):
         """Finish up all displayhook activities."""
-        self.session.send(self.pub_socket, self.msg)
+        send_on_pub(self.session, self.pub_socket, self.msg)
         self.msg = None
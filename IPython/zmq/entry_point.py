@@ -13,9 +13,24 @@ import sys
 from .parentpoller import ParentPollerWindows
 
 
+def select_random_ports(n):
+    """Return n random ports that are free to bind to."""
+    ports = []
+    for i in range(n):
+        sock = socket.socket()
+        sock.bind(('', 0))
+        ports.append(sock)
+    for i, sock in enumerate(ports):
+        port = sock.getsockname()[1]
+        sock.close()
+        ports[i] = port
+    return ports
+
+
 def base_launch_kernel(code, shell_port=0, iopub_port=0, stdin_port=0, hb_port=0,
                         ip=None, stdin=None, stdout=None, stderr=None,
-                        executable=None, independent=False, extra_arguments=[]):
+                        executable=None, independent=False, extra_arguments=[],
+                        control_port=0):
     """ Launches a localhost kernel, binding to the specified ports.
 
     Parameters
@@ -35,6 +50,11 @@ def base_launch_kernel(code, shell_port=0, iopub_port=0, stdin_port=0, hb_port=0
     hb_port : int, optional
         The port to use for the hearbeat REP channel.
 
+    control_port : int, optional
+        The port to use for the control XREP channel, for kernels that have
+        one.  If not given, the kernel picks a random port, which is not
+        returned: use :func:`select_random_ports` to know it.
+
     ip  : str, optional
         The ip address the kernel will bind to.
 
@@ -60,17 +80,9 @@ def base_launch_kernel(code, shell_port=0, iopub_port=0, stdin_port=0, hb_port=0
     where kernel_process is a Popen object and the ports are integers.
     """
     # Find open ports as necessary.
-    ports = []
     ports_needed = int(shell_port <= 0) + int(iopub_port <= 0) + \
                    int(stdin_port <= 0) + int(hb_port <= 0)
-    for i in range(ports_needed):
-        sock = socket.socket()
-        sock.bind(('', 0))
-        ports.append(sock)
-    for i, sock in enumerate(ports):
-        port = sock.getsockname()[1]
-        sock.close()
-        ports[i] = port
+    ports = select_random_ports(ports_needed)
     if shell_port <= 0:
         shell_port = ports.pop(0)
     if iopub_port <= 0:
@@ -87,6 +99,8 @@ def base_launch_kernel(code, shell_port=0, iopub_port=0, stdin_port=0, hb_port=0
                   'iopub=%i'%iopub_port, 'stdin=%i'%stdin_port,
                   'hb=%i'%hb_port
     ]
+    if control_port > 0:
+        arguments.append('control=%i'%control_port)
     if ip is not None:
         arguments.append('ip=%s'%ip)
     arguments.extend(extra_arguments)
@@ -1,7 +1,10 @@
 import logging
+import os
 import sys
+import tempfile
+import threading
 import time
-from io import StringIO
+from collections import OrderedDict
 
 from .session import extract_header, Message
 
@@ -18,21 +21,304 @@ logger =  logging.getLogger(__name__)
 # Stream classes
 #-----------------------------------------------------------------------------
 
-class OutStream(object):
-    """A file like object that publishes the stream to a 0MQ PUB socket."""
+class StreamPublisher(object):
+    """Coalescing buffer shared by all the OutStreams on one PUB socket.
+
+    Writes from every stream are appended to a single ordered list of runs,
+    where a run is a (name, parent_header, topic, chunks) tuple.  Consecutive
+    writes to the same stream with the same parent are merged into one run, so a
+    flush sends one 'stream' message per run instead of one per stream and per
+    interval.  stdout/stderr interleaving is preserved.
+
+    The write path never looks at the clock.  A flush happens:
+
+    * when the buffered size reaches :attr:`max_buffer_size`,
+    * from a timer thread, :attr:`flush_interval` seconds after the buffer
+      stopped being empty, even while the main thread is busy running code.
+      The buffer and the sends are guarded by a lock, which the other
+      messages sent on the socket take too (see :func:`send_on_pub`), so
+      that the socket is never used by two threads at once.  When the PUB
+      socket is a ZMQStream (as in engines), the messages are sent on its
+      underlying socket: the stream queues its sends for its IOLoop, which
+      is busy running the code, and isn't thread-safe,
+    * whenever :meth:`flush` is called explicitly (e.g. at the end of each
+      execute request).
+
+    Output can also be budgeted per request (i.e. per parent header), see
+    :attr:`rate_limit` and :attr:`total_limit`.  Output beyond the budget is
+    not published; a one-line marker is sent instead each time suppression
+    starts, and a summary when the request ends (:meth:`end_request`).  If
+    :attr:`spool_dir` is set, the suppressed text is written to a file there,
+    whose path is given in the markers and in :attr:`spool_files`, and which
+    can be read back with :meth:`read_spool` (see the kernel's
+    ``spool_request``).  Only the files of the last :attr:`max_spool_files`
+    requests are kept.
+    """
 
     # The time interval between automatic flushes, in seconds.
     flush_interval = 0.05
+    # Number of buffered characters that triggers an immediate flush.
+    max_buffer_size = 64 * 1024
+
+    # Output budget per request, in characters per second and in characters.
+    # 0 means unlimited.  The rate is enforced as a token bucket refilled at
+    # flush time, allowing bursts of up to one second worth of output.
+    rate_limit = 0
+    total_limit = 0
+    # Directory where suppressed output is spooled, None to discard it.
+    spool_dir = None
+    # Number of spool files kept; older ones are deleted.
+    max_spool_files = 20
+
+    def __init__(self, session, pub_socket):
+        self.session = session
+        self.pub_socket = pub_socket
+        # The socket the messages are sent on: that of a ZMQStream, or
+        # pub_socket itself
+        self._socket = getattr(pub_socket, 'socket', pub_socket)
+        # Number of 'stream' messages sent so far, mostly for benchmarking.
+        self.msg_count = 0
+        self._runs = []
+        self._size = 0
+        # Guards the buffer, and the sends of the timer and other threads.
+        self._lock = threading.RLock()
+        # Set while the buffer is not empty.
+        self._pending = threading.Event()
+        self._timer = None
+        # Map of parent msg_id -> path of the file holding its suppressed
+        # output, for the requests that had any, oldest first.
+        self.spool_files = OrderedDict()
+        self._reset_budget()
+
+    @classmethod
+    def for_socket(cls, session, pub_socket):
+        """Return the publisher shared by all streams writing to pub_socket.
+
+        The publishers are kept on the session, so they go away with it.
+        """
+        publishers = session.__dict__.setdefault('_stream_publishers', [])
+        for inst in publishers:
+            if inst.pub_socket is pub_socket:
+                return inst
+        inst = cls(session, pub_socket)
+        publishers.append(inst)
+        return inst
+
+    def send(self, *args, **kwargs):
+        """Send a message other than stream output on the PUB socket.
+
+        The arguments are those of ``session.send``, without the socket.
+        """
+        with self._lock:
+            return self.session.send(self._socket, *args, **kwargs)
+
+    def write(self, name, parent_header, topic, string):
+        with self._lock:
+            runs = self._runs
+            last = runs[-1] if runs else None
+            if (last is not None and last[0] == name and
+                last[1] is parent_header and last[2] == topic):
+                last[3].append(string)
+            else:
+                runs.append((name, parent_header, topic, [string]))
+            self._size += len(string)
+            if self._size >= self.max_buffer_size:
+                self.flush()
+            elif not self._pending.is_set():
+                self._start_timer()
+
+    def flush(self):
+        """Send everything that is buffered, one message per run."""
+        with self._lock:
+            runs, self._runs = self._runs, []
+            self._size = 0
+            self._pending.clear()
+            limited = self.rate_limit or self.total_limit
+            if limited:
+                self._refill()
+            for name, parent_header, topic, chunks in runs:
+                data = ''.join(chunks)
+                if limited:
+                    data = self._apply_budget(name, parent_header, topic, data)
+                if data:
+                    self._send(name, parent_header, topic, data)
+
+    def end_request(self):
+        """Flush, and close the output budget of the current request.
+
+        If any output was suppressed, a summary marker is published.
+        """
+        with self._lock:
+            self.flush()
+            self._close_budget()
+
+    def read_spool(self, msg_id, offset=0, limit=None):
+        """Return the text of the output of request msg_id which was spooled,
+        from offset, and at most limit characters of it, or None if there is
+        no such output (any more)."""
+        fname = self.spool_files.get(msg_id)
+        if fname is None:
+            return None
+        try:
+            with open(fname) as f:
+                # text files can't seek to a character offset
+                f.read(offset)
+                return f.read() if limit is None else f.read(limit)
+        except (IOError, OSError):
+            return None
+
+    def _send(self, name, parent_header, topic, data):
+        content = {'name':name, 'data':data}
+        msg = self.session.send(self._socket, 'stream', content=content,
+                                parent=parent_header, ident=topic)
+        self.msg_count += 1
+        logger.debug(msg)
+
+    #--------------------------------------------------------------------------
+    # Output budget
+    #--------------------------------------------------------------------------
+
+    def _reset_budget(self):
+        self._budget_parent = None
+        self._sent = 0
+        self._suppressed = 0
+        self._suppressing = False
+        self._spool = None
+        self._last_run = None
+        self._tokens = self.rate_limit
+        self._last_refill = time.time()
+
+    def _close_budget(self):
+        """Publish the summary of the suppressed output of the current
+        request, if any, and start a new budget."""
+        if self._suppressed:
+            name, parent_header, topic = self._last_run
+            msg = '\n[... %i characters of output suppressed' % self._suppressed
+            if self._spool is not None:
+                msg += ', full text in %s' % self._spool.name
+            self._send(name, parent_header, topic, msg + ' ...]\n')
+        if self._spool is not None:
+            self._spool.close()
+        self._reset_budget()
+
+    def _refill(self):
+        if self.rate_limit:
+            now = time.time()
+            self._tokens = min(self.rate_limit, self._tokens +
+                               self.rate_limit * (now - self._last_refill))
+            self._last_refill = now
+
+    def _apply_budget(self, name, parent_header, topic, data):
+        """Return the part of data that fits the budget, spool the rest."""
+        msg_id = parent_header.get('msg_id') if parent_header else None
+        if msg_id != self._budget_parent:
+            if self._budget_parent is not None:
+                # The previous runs are already sent: no need to flush
+                self._close_budget()
+            self._budget_parent = msg_id
+        self._last_run = (name, parent_header, topic)
+        allowed = len(data)
+        if self.total_limit:
+            allowed = min(allowed, max(0, self.total_limit - self._sent))
+        if self.rate_limit:
+            allowed = min(allowed, int(self._tokens))
+            self._tokens -= allowed
+        self._sent += allowed
+        if allowed:
+            # Output goes through again, e.g. after a rate-limited gap
+            self._suppressing = False
+        if allowed == len(data):
+            return data
+        excess = data[allowed:]
+        data = data[:allowed]
+        if not self._suppressing:
+            marker = '\n[output limit exceeded, suppressing further output'
+            if self._spool is None and not self._suppressed:
+                self._open_spool(msg_id)
+            if self._spool is not None:
+                marker += ', spooling to %s' % self._spool.name
+            data += marker + ']\n'
+            self._suppressing = True
+        self._suppressed += len(excess)
+        if self._spool is not None:
+            self._spool.write(excess)
+        return data
+
+    def _open_spool(self, msg_id):
+        if not self.spool_dir:
+            return
+        try:
+            if not os.path.isdir(self.spool_dir):
+                os.makedirs(self.spool_dir)
+            self._spool = tempfile.NamedTemporaryFile('w', prefix='output-',
+                                suffix='.txt', dir=self.spool_dir, delete=False)
+        except (IOError, OSError):
+            logger.error("Could not open output spool file", exc_info=True)
+            return
+        self.spool_files.pop(msg_id, None)
+        self.spool_files[msg_id] = self._spool.name
+        while len(self.spool_files) > self.max_spool_files:
+            old_id, fname = self.spool_files.popitem(last=False)
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+    #--------------------------------------------------------------------------
+    # Flush timer
+    #--------------------------------------------------------------------------
+
+    def _start_timer(self):
+        self._pending.set()
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(target=self._timer_loop,
+                                           name='OutStreamFlushTimer')
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_loop(self):
+        while True:
+            self._pending.wait()
+            # Give writes flush_interval seconds to accumulate, then flush if
+            # nobody did in the meantime.
+            time.sleep(self.flush_interval)
+            with self._lock:
+                if self._pending.is_set() and self.pub_socket is not None:
+                    self.flush()
+
+
+def send_on_pub(session, pub_socket, *args, **kwargs):
+    """Send a message on a PUB socket, with ``session.send``.
+
+    The message is sent under the lock of the socket's
+    :class:`StreamPublisher`, as the latter may be flushing output from its
+    timer thread at the same time.
+    """
+    return StreamPublisher.for_socket(session, pub_socket).send(*args,
+                                                                **kwargs)
+
+
+class OutStream(object):
+    """A file like object that publishes the stream to a 0MQ PUB socket.
+
+    All the OutStreams sharing a PUB socket buffer into the same
+    :class:`StreamPublisher`, see its docstring for the flushing policy.
+    """
+
     topic=None
 
-    def __init__(self, session, pub_socket, name):
+    def __init__(self, session, pub_socket, name, publisher=None):
         self.session = session
         self.pub_socket = pub_socket
         self.name = name
         self.parent_header = {}
-        self._new_buffer()
+        if publisher is None:
+            publisher = StreamPublisher.for_socket(session, pub_socket)
+        self.publisher = publisher
 
     def set_parent(self, parent):
+        # Flush output belonging to the previous parent before switching.
+        self.publisher.flush()
         self.parent_header = extract_header(parent)
 
     def close(self):
@@ -43,15 +329,7 @@ class OutStream(object):
         if self.pub_socket is None:
             raise ValueError('I/O operation on closed file')
         else:
-            data = self._buffer.getvalue()
-            if data:
-                content = {'name':self.name, 'data':data}
-                msg = self.session.send(self.pub_socket, 'stream', content=content,
-                                       parent=self.parent_header, ident=self.topic)
-                logger.debug(msg)
-
-                self._buffer.close()
-                self._new_buffer()
+            self.publisher.flush()
 
     def isatty(self):
         return False
@@ -73,13 +351,8 @@ class OutStream(object):
             if not isinstance(string, str):
                 enc = sys.stdin.encoding or sys.getdefaultencoding()
                 string = string.decode(enc, 'replace')
-            
-            self._buffer.write(string)
-            current_time = time.time()
-            if self._start <= 0:
-                self._start = current_time
-            elif current_time - self._start > self.flush_interval:
-                self.flush()
+            self.publisher.write(self.name, self.parent_header, self.topic,
+                                 string)
 
     def writelines(self, sequence):
         if self.pub_socket is None:
@@ -87,7 +360,3 @@ class OutStream(object):
         else:
             for string in sequence:
                 self.write(string)
-
-    def _new_buffer(self):
-        self._buffer = StringIO()
-        self._start = -1
@@ -6,8 +6,6 @@ Things to do:
 * Implement `set_parent` logic. Right before doing exec, the Kernel should
   call set_parent on all the PUB objects with the message about to be executed.
 * Implement random port and security key logic.
-* Implement control messages.
-* Implement event loop and poll version.
 """
 
 #-----------------------------------------------------------------------------
@@ -24,6 +22,7 @@ import traceback
 import logging
 # System library imports.
 import zmq
+from zmq.eventloop import ioloop, zmqstream
 
 # Local imports.
 from IPython.config.configurable import Configurable
@@ -39,9 +38,10 @@ from IPython.utils.traitlets import (
     List, Instance, Float, Dict, Bool, Int, Unicode, CaselessStrEnum
 )
 
+from .control import ControlThread
 from .entry_point import base_launch_kernel
 from .kernelapp import KernelApp, kernel_flags, kernel_aliases
-from .iostream import OutStream
+from .iostream import OutStream, send_on_pub
 from .session import Session, Message
 from .zmqshell import ZMQInteractiveShell
 
@@ -62,8 +62,19 @@ class Kernel(Configurable):
     shell_socket = Instance('zmq.Socket')
     iopub_socket = Instance('zmq.Socket')
     stdin_socket = Instance('zmq.Socket')
+    # Optional XREP socket for the control channel, see control_msg_types.
+    control_socket = Instance('zmq.Socket')
     log = Instance(logging.Logger)
 
+    # The event loop running the kernel, set by start().
+    loop = Instance('zmq.eventloop.ioloop.IOLoop')
+
+    # Requests that only read kernel state, and can therefore be served on the
+    # control channel, from the control thread, while an execute_request is
+    # running in the main thread.
+    control_msg_types = List(['complete_request', 'object_info_request',
+                              'history_request', 'connect_request'])
+
     # Private interface
 
     # Time to sleep after flushing the stdout/err buffers in each execute
@@ -113,18 +124,24 @@ class Kernel(Configurable):
         # Build dict of handlers for message types
         msg_types = [ 'execute_request', 'complete_request', 
                       'object_info_request', 'history_request',
-                      'connect_request', 'shutdown_request']
+                      'connect_request', 'shutdown_request', 'spool_request']
         self.handlers = {}
         for msg_type in msg_types:
             self.handlers[msg_type] = getattr(self, msg_type)
 
     def do_one_iteration(self):
         """Do one iteration of the kernel's evaluation loop.
+
+        This is used by the GUI kernels, which poll the shell socket from
+        their toolkit's timer instead of running the zmq event loop.
         """
         ident,msg = self.session.recv(self.shell_socket, zmq.NOBLOCK)
         if msg is None:
             return
-        
+        self.dispatch_shell(ident, msg)
+
+    def dispatch_shell(self, ident, msg):
+        """Handle one message received on the shell socket."""
         # This assert will raise in versions of zeromq 2.0.7 and lesser.
         # We now require 2.0.8 or above, so we can uncomment for safety.
         # print(ident,msg, file=sys.__stdout__)
@@ -141,8 +158,8 @@ class Kernel(Configurable):
         if handler is None:
             self.log.error("UNKNOWN MESSAGE TYPE:" +str(msg))
         else:
-            handler(ident, msg)
-            
+            handler(self.shell_socket, ident, msg)
+
         # Check whether we should exit, in case the incoming message set the
         # exit flag on
         if self.shell.exit_now:
@@ -152,22 +169,40 @@ class Kernel(Configurable):
             sys.exit(0)
 
 
+    def _on_shell_recv(self, msg):
+        """ZMQStream callback for the shell socket."""
+        try:
+            idents, msg = self.session.feed_identities(msg, copy=False)
+            msg = self.session.unpack_message(msg, content=True, copy=False)
+        except:
+            self.log.error("Invalid Message", exc_info=True)
+            return
+        self.dispatch_shell(idents, msg)
+
+    def start_control(self):
+        """Start serving the control channel, if there is one."""
+        if self.control_socket is not None:
+            self.control_thread = ControlThread(self, self.control_socket)
+            self.control_thread.start()
+
     def start(self):
         """ Start the kernel main loop.
+
+        The shell socket is served by the zmq event loop in the main thread,
+        and the control socket by a separate thread.
         """
-        poller = zmq.Poller()
-        poller.register(self.shell_socket, zmq.POLLIN)
+        self.loop = ioloop.IOLoop.instance()
+        self.shell_stream = zmqstream.ZMQStream(self.shell_socket, self.loop)
+        self.shell_stream.on_recv(self._on_shell_recv, copy=False)
+        self.start_control()
         while True:
             try:
-                # scale by extra factor of 10, because there is no
-                # reason for this to be anything less than ~ 0.1s
-                # since it is a real poller and will respond
-                # to events immediately
-                poller.poll(10*1000*self._poll_interval)
-                self.do_one_iteration()
+                self.loop.start()
             except KeyboardInterrupt:
                 # Ctrl-C shouldn't crash the kernel
                 io.raw_print("KeyboardInterrupt caught in kernel")
+            else:
+                break
 
     def record_ports(self, ports):
         """Record the ports that this kernel is using.
@@ -184,11 +219,12 @@ class Kernel(Configurable):
     def _publish_pyin(self, code, parent):
         """Publish the code request on the pyin stream."""
 
-        pyin_msg = self.session.send(self.iopub_socket, 'pyin',{'code':code}, parent=parent)
+        pyin_msg = send_on_pub(self.session, self.iopub_socket, 'pyin',
+                               {'code':code}, parent=parent)
 
-    def execute_request(self, ident, parent):
+    def execute_request(self, stream, ident, parent):
         
-        status_msg = self.session.send(self.iopub_socket,
+        status_msg = send_on_pub(self.session, self.iopub_socket,
             'status',
             {'execution_state':'busy'},
             parent=parent
@@ -205,6 +241,13 @@ class Kernel(Configurable):
 
         shell = self.shell # we'll need this a lot here
 
+        # Only compute the representations the frontend can show.
+        formatter = shell.display_formatter
+        saved_types = formatter.active_types
+        accepted_types = content.get('accepted_types')
+        if accepted_types:
+            formatter.active_types = accepted_types
+
         # Replace raw_input. Note that is not sufficient to replace 
         # raw_input in the user namespace.
         raw_input = lambda prompt='': self._raw_input(prompt, ident, parent)
@@ -244,6 +287,8 @@ class Kernel(Configurable):
             reply_content.update(shell._showtraceback(etype, evalue, tb_list))
         else:
             status = 'ok'
+        finally:
+            formatter.active_types = saved_types
 
         reply_content['status'] = status
         
@@ -278,9 +323,13 @@ class Kernel(Configurable):
         # it to sit in memory until the next execute_request comes in.
         shell.payload_manager.clear_payload()
 
-        # Flush output before sending the reply.
+        # Flush output before sending the reply, and close this request's
+        # output budget.
         sys.stdout.flush()
         sys.stderr.flush()
+        publisher = getattr(sys.stdout, 'publisher', None)
+        if publisher is not None:
+            publisher.end_request()
         # FIXME: on rare occasions, the flush doesn't seem to make it to the
         # clients... This seems to mitigate the problem, but we definitely need
         # to better understand what's going on.
@@ -288,75 +337,115 @@ class Kernel(Configurable):
             time.sleep(self._execute_sleep)
         
         # Send the reply.
-        reply_msg = self.session.send(self.shell_socket, 'execute_reply',
+        reply_msg = self.session.send(stream, 'execute_reply',
                                       reply_content, parent, ident=ident)
         self.log.debug(str(reply_msg))
 
         if reply_msg['content']['status'] == 'error':
             self._abort_queue()
 
-        status_msg = self.session.send(self.iopub_socket,
+        status_msg = send_on_pub(self.session, self.iopub_socket,
             'status',
             {'execution_state':'idle'},
             parent=parent
         )
 
-    def complete_request(self, ident, parent):
-        txt, matches = self._complete(parent)
+    def complete_request(self, stream, ident, parent):
+        txt, matches = self._complete(parent, stream is self.control_socket)
         matches = {'matches' : matches,
                    'matched_text' : txt,
                    'status' : 'ok'}
-        completion_msg = self.session.send(self.shell_socket, 'complete_reply',
+        completion_msg = self.session.send(stream, 'complete_reply',
                                            matches, parent, ident)
         self.log.debug(str(completion_msg))
 
-    def object_info_request(self, ident, parent):
-        object_info = self.shell.object_inspect(parent['content']['oname'])
+    def object_info_request(self, stream, ident, parent):
+        oname = parent['content']['oname']
+        if stream is self.control_socket:
+            object_info = self.control_thread.object_inspect(oname)
+        else:
+            object_info = self.shell.object_inspect(oname)
         # Before we send this object over, we scrub it for JSON usage
         oinfo = json_clean(object_info)
-        msg = self.session.send(self.shell_socket, 'object_info_reply',
+        msg = self.session.send(stream, 'object_info_reply',
                                 oinfo, parent, ident)
         self.log.debug(msg)
 
-    def history_request(self, ident, parent):
+    def history_request(self, stream, ident, parent):
         # We need to pull these out, as passing **kwargs doesn't work with
         # unicode keys before Python 2.6.5.
-        hist_access_type = parent['content']['hist_access_type']
-        raw = parent['content']['raw']
-        output = parent['content']['output']
+        content = parent['content']
+        hist_access_type = content['hist_access_type']
+        raw = content['raw']
+        output = content['output']
+        # If the client asks for a page of the results, fetch one more entry
+        # to know whether there is a next page, which the client gets by
+        # repeating the request with offset=next_offset.
+        offset = content.get('offset') or 0
+        limit = content.get('limit')
+        fetch = None if limit is None else limit + 1
         if hist_access_type == 'tail':
-            n = parent['content']['n']
+            n = content['n']
             hist = self.shell.history_manager.get_tail(n, raw=raw, output=output,
-                                                            include_latest=True)
+                        include_latest=True, limit=fetch, offset=offset)
         
         elif hist_access_type == 'range':
-            session = parent['content']['session']
-            start = parent['content']['start']
-            stop = parent['content']['stop']
+            session = content['session']
+            start = content['start']
+            stop = content['stop']
             hist = self.shell.history_manager.get_range(session, start, stop,
-                                                        raw=raw, output=output)
+                        raw=raw, output=output, limit=fetch, offset=offset)
         
         elif hist_access_type == 'search':
-            pattern = parent['content']['pattern']
-            hist = self.shell.history_manager.search(pattern, raw=raw, output=output)
+            pattern = content['pattern']
+            hist = self.shell.history_manager.search(pattern, raw=raw,
+                        output=output, n=content.get('n'),
+                        unique=content.get('unique', False),
+                        limit=fetch, offset=offset)
         
         else:
             hist = []
-        content = {'history' : list(hist)}
-        msg = self.session.send(self.shell_socket, 'history_reply',
+
+        hist = list(hist)
+        next_offset = None
+        if limit is not None and len(hist) > limit:
+            del hist[limit:]
+            next_offset = offset + limit
+        content = {'history' : hist, 'next_offset' : next_offset}
+        msg = self.session.send(stream, 'history_reply',
                                 content, parent, ident)
         self.log.debug(str(msg))
 
-    def connect_request(self, ident, parent):
+    def spool_request(self, stream, ident, parent):
+        content = parent['content']
+        offset = content.get('offset', 0) or 0
+        limit = content.get('limit')
+        publisher = getattr(sys.stdout, 'publisher', None)
+        data = None
+        if publisher is not None:
+            # one more character, to know if there is a next page
+            data = publisher.read_spool(content['msg_id'], offset,
+                                        limit + 1 if limit else None)
+        if data is None:
+            reply = {'status' : 'error', 'data' : '', 'next_offset' : None}
+        elif limit and len(data) > limit:
+            reply = {'status' : 'ok', 'data' : data[:limit],
+                     'next_offset' : offset + limit}
+        else:
+            reply = {'status' : 'ok', 'data' : data, 'next_offset' : None}
+        msg = self.session.send(stream, 'spool_reply', reply, parent, ident)
+        self.log.debug(str(msg))
+
+    def connect_request(self, stream, ident, parent):
         if self._recorded_ports is not None:
             content = self._recorded_ports.copy()
         else:
             content = {}
-        msg = self.session.send(self.shell_socket, 'connect_reply',
+        msg = self.session.send(stream, 'connect_reply',
                                 content, parent, ident)
         self.log.debug(msg)
 
-    def shutdown_request(self, ident, parent):
+    def shutdown_request(self, stream, ident, parent):
         self.shell.exit_now = True
         self._shutdown_message = self.session.msg('shutdown_reply', parent['content'], parent)
         sys.exit(0)
@@ -403,7 +492,7 @@ class Kernel(Configurable):
             value = ''
         return value
     
-    def _complete(self, msg):
+    def _complete(self, msg, control=False):
         c = msg['content']
         try:
             cpos = int(c['cursor_pos'])
@@ -414,6 +503,8 @@ class Kernel(Configurable):
             cpos = len(c['text'])
             if cpos==0:
                 cpos = len(c['line'])
+        if control:
+            return self.control_thread.complete(c['text'], c['line'], cpos)
         return self.shell.complete(c['text'], c['line'], cpos)
 
     def _object_info(self, context):
@@ -452,7 +543,8 @@ class Kernel(Configurable):
         # io.rprint("Kernel at_shutdown") # dbg
         if self._shutdown_message is not None:
             self.session.send(self.shell_socket, self._shutdown_message)
-            self.session.send(self.iopub_socket, self._shutdown_message)
+            send_on_pub(self.session, self.iopub_socket,
+                        self._shutdown_message)
             self.log.debug(str(self._shutdown_message))
             # A very short sleep to give zmq time to flush its message buffers
             # before Python truly shuts down.
@@ -465,6 +557,8 @@ class QtKernel(Kernel):
     def start(self):
         """Start a kernel with QtPy4 event loop integration."""
 
+        self.start_control()
+
         from PyQt4 import QtCore
         from IPython.lib.guisupport import get_app_qt4, start_event_loop_qt4
 
@@ -483,6 +577,8 @@ class WxKernel(Kernel):
     def start(self):
         """Start a kernel with wx event loop support."""
 
+        self.start_control()
+
         import wx
         from IPython.lib.guisupport import start_event_loop_wx
 
@@ -524,6 +620,8 @@ class TkKernel(Kernel):
     def start(self):
         """Start a Tk enabled event loop."""
 
+        self.start_control()
+
         import tkinter
         doi = self.do_one_iteration
         # Tk uses milliseconds
@@ -552,6 +650,8 @@ class GTKKernel(Kernel):
     
     def start(self):
         """Start the kernel, coordinating with the GTK event loop"""
+        self.start_control()
+
         from .gui.gtkembed import GTKEmbed
         
         gtk_kernel = GTKEmbed(self)
@@ -587,6 +687,7 @@ aliases.update(dict(
 
 class IPKernelApp(KernelApp, InteractiveShellApp):
     name = 'ipkernel'
+    control_channel = True
 
     aliases = Dict(aliases)
     flags = Dict(flags)
@@ -599,10 +700,12 @@ class IPKernelApp(KernelApp, InteractiveShellApp):
         """
     )
     def initialize(self, argv=None):
-        super(IPKernelApp, self).initialize(argv)
-        self.init_shell()
-        self.init_extensions()
-        self.init_code()
+        timed = self.startup_timer.call
+        timed(super(IPKernelApp, self).initialize, argv)
+        timed(self.init_shell)
+        timed(self.init_extensions)
+        timed(self.init_code)
+        self.print_startup_profile()
 
     def init_kernel(self):
         kernel_factory = Kernel
@@ -629,6 +732,7 @@ class IPKernelApp(KernelApp, InteractiveShellApp):
                                 shell_socket=self.shell_socket,
                                 iopub_socket=self.iopub_socket,
                                 stdin_socket=self.stdin_socket,
+                                control_socket=self.control_socket,
                                 log=self.log
         )
         self.kernel = kernel
@@ -50,6 +50,7 @@ kernel_aliases.update({
     'shell' : 'KernelApp.shell_port',
     'iopub' : 'KernelApp.iopub_port',
     'stdin' : 'KernelApp.stdin_port',
+    'control' : 'KernelApp.control_port',
     'parent': 'KernelApp.parent',
 })
 if sys.platform.startswith('win'):
@@ -83,6 +84,11 @@ class KernelApp(BaseIPythonApplication):
     session = Instance('IPython.zmq.session.Session')
     ports = Dict()
 
+    # Whether the kernel serves a control channel; the control socket is only
+    # bound, and its port advertised, if it does.
+    control_channel = False
+    control_socket = None
+
     # connection info:
     ip = Unicode(LOCALHOST, config=True,
         help="Set the IP or interface on which the kernel will listen.")
@@ -90,6 +96,8 @@ class KernelApp(BaseIPythonApplication):
     shell_port = Int(0, config=True, help="set the shell (XREP) port [default: random]")
     iopub_port = Int(0, config=True, help="set the iopub (PUB) port [default: random]")
     stdin_port = Int(0, config=True, help="set the stdin (XREQ) port [default: random]")
+    control_port = Int(0, config=True,
+        help="set the control (XREP) port [default: random]")
 
     # streams, etc.
     no_stdout = Bool(False, config=True, help="redirect stdout to the null device")
@@ -98,6 +106,21 @@ class KernelApp(BaseIPythonApplication):
         config=True, help="The importstring for the OutStream factory")
     displayhook_class = DottedObjectName('IPython.zmq.displayhook.ZMQDisplayHook',
         config=True, help="The importstring for the DisplayHook factory")
+    output_rate_limit = Int(0, config=True,
+        help="""Maximum rate of stdout/stderr output published per execute
+        request, in characters per second.  Output beyond it is suppressed.
+        0 means unlimited.""")
+    output_total_limit = Int(0, config=True,
+        help="""Maximum amount of stdout/stderr output published per execute
+        request, in characters.  Output beyond it is suppressed.
+        0 means unlimited.""")
+    output_spool_dir = Unicode('', config=True,
+        help="""Directory where output suppressed by the output limits is
+        saved, one file per request.  If empty, suppressed output is
+        discarded.""")
+    output_spool_files = Int(20, config=True,
+        help="""Number of requests whose suppressed output is kept in
+        output_spool_dir; the files of older ones are deleted.""")
 
     # polling
     parent = Int(0, config=True,
@@ -148,6 +171,13 @@ class KernelApp(BaseIPythonApplication):
         self.stdin_port = self._bind_socket(self.stdin_socket, self.stdin_port)
         self.log.debug("stdin XREQ Channel on port: %i"%self.stdin_port)
 
+        if self.control_channel:
+            self.control_socket = context.socket(zmq.XREP)
+            self.control_port = self._bind_socket(self.control_socket,
+                                                  self.control_port)
+            self.log.debug("control XREP Channel on port: %i" %
+                           self.control_port)
+
         self.heartbeat = Heartbeat(context, (self.ip, self.hb_port))
         self.hb_port = self.heartbeat.port
         self.log.debug("Heartbeat REP Channel on port: %i"%self.hb_port)
@@ -157,10 +187,14 @@ class KernelApp(BaseIPythonApplication):
         self.log.info("To connect another client to this kernel, use:")
         self.log.info("--external shell={0} iopub={1} stdin={2} hb={3}".format(
             self.shell_port, self.iopub_port, self.stdin_port, self.hb_port))
+        if self.control_channel:
+            self.log.info("control={0}".format(self.control_port))
 
 
         self.ports = dict(shell=self.shell_port, iopub=self.iopub_port,
                                 stdin=self.stdin_port, hb=self.hb_port)
+        if self.control_channel:
+            self.ports['control'] = self.control_port
 
     def init_session(self):
         """create our session object"""
@@ -181,6 +215,12 @@ class KernelApp(BaseIPythonApplication):
             outstream_factory = import_item(str(self.outstream_class))
             sys.stdout = outstream_factory(self.session, self.iopub_socket, 'stdout')
             sys.stderr = outstream_factory(self.session, self.iopub_socket, 'stderr')
+            publisher = getattr(sys.stdout, 'publisher', None)
+            if publisher is not None:
+                publisher.rate_limit = self.output_rate_limit
+                publisher.total_limit = self.output_total_limit
+                publisher.spool_dir = self.output_spool_dir or None
+                publisher.max_spool_files = self.output_spool_files
         if self.displayhook_class:
             displayhook_factory = import_item(str(self.displayhook_class))
             sys.displayhook = displayhook_factory(self.session, self.iopub_socket)
@@ -36,6 +36,7 @@ from IPython.config.loader import Config
 from IPython.utils import io
 from IPython.utils.localinterfaces import LOCALHOST, LOCAL_IPS
 from IPython.utils.traitlets import HasTraits, Any, Instance, Type, TCPAddress
+from .entry_point import select_random_ports
 from .session import Session, Message
 
 #-----------------------------------------------------------------------------
@@ -174,14 +175,18 @@ class ZMQSocketChannel(Thread):
         self.ioloop.add_callback(drop_io_state_callback)
 
 
-class ShellSocketChannel(ZMQSocketChannel):
-    """The XREQ channel for issues request/replies to the kernel.
+class XReqSocketChannel(ZMQSocketChannel):
+    """The base class for the XREQ channels, on which requests are sent to the
+    kernel and their replies received.
+
+    Besides the plumbing, it has the requests which only read the kernel's
+    state, which both the shell and the control channel accept.
     """
 
     command_queue = None
 
     def __init__(self, context, session, address):
-        super(ShellSocketChannel, self).__init__(context, session, address)
+        super(XReqSocketChannel, self).__init__(context, session, address)
         self.command_queue = Queue()
         self.ioloop = ioloop.IOLoop()
 
@@ -197,7 +202,7 @@ class ShellSocketChannel(ZMQSocketChannel):
 
     def stop(self):
         self.ioloop.stop()
-        super(ShellSocketChannel, self).stop()
+        super(XReqSocketChannel, self).stop()
 
     def call_handlers(self, msg):
         """This method is called in the ioloop thread when a message arrives.
@@ -209,52 +214,6 @@ class ShellSocketChannel(ZMQSocketChannel):
         """
         raise NotImplementedError('call_handlers must be defined in a subclass.')
 
-    def execute(self, code, silent=False,
-                user_variables=None, user_expressions=None):
-        """Execute code in the kernel.
-
-        Parameters
-        ----------
-        code : str
-            A string of Python code.
-            
-        silent : bool, optional (default False)
-            If set, the kernel will execute the code as quietly possible.
-
-        user_variables : list, optional
-            A list of variable names to pull from the user's namespace.  They
-            will come back as a dict with these names as keys and their
-            :func:`repr` as values.
-            
-        user_expressions : dict, optional
-            A dict with string keys and  to pull from the user's
-            namespace.  They will come back as a dict with these names as keys
-            and their :func:`repr` as values.
-
-        Returns
-        -------
-        The msg_id of the message sent.
-        """
-        if user_variables is None:
-            user_variables = []
-        if user_expressions is None:
-            user_expressions = {}
-            
-        # Don't waste network traffic if inputs are invalid
-        if not isinstance(code, str):
-            raise ValueError('code %r must be a string' % code)
-        validate_string_list(user_variables)
-        validate_string_dict(user_expressions)
-
-        # Create class for content/msg creation. Related to, but possibly
-        # not in Session.
-        content = dict(code=code, silent=silent,
-                       user_variables=user_variables,
-                       user_expressions=user_expressions)
-        msg = self.session.msg('execute_request', content)
-        self._queue_request(msg)
-        return msg['header']['msg_id']
-
     def complete(self, text, line, cursor_pos, block=None):
         """Tab complete text in the kernel's namespace.
 
@@ -324,6 +283,15 @@ class ShellSocketChannel(ZMQSocketChannel):
             
         pattern : str
             The glob-syntax pattern for a search request.
+        unique : bool
+            For a search request, only return the most recent occurrence of
+            each distinct input.
+
+        limit : int
+            The maximum number of entries in the reply.  If more are
+            available, the reply's 'next_offset' is set.
+        offset : int
+            The number of entries to skip, e.g. a previous 'next_offset'.
 
         Returns
         -------
@@ -335,23 +303,6 @@ class ShellSocketChannel(ZMQSocketChannel):
         self._queue_request(msg)
         return msg['header']['msg_id']
 
-    def shutdown(self, restart=False):
-        """Request an immediate kernel shutdown.
-
-        Upon receipt of the (empty) reply, client code can safely assume that
-        the kernel has shut down and it's safe to forcefully terminate it if
-        it's still alive.
-
-        The kernel will send the reply via a function registered with Python's
-        atexit module, ensuring it's truly done as the kernel is done with all
-        normal operation.
-        """
-        # Send quit message to kernel. Once we implement kernel-side setattr,
-        # this should probably be done that way, but for now this will do.
-        msg = self.session.msg('shutdown_request', {'restart':restart})
-        self._queue_request(msg)
-        return msg['header']['msg_id']
-
     def _handle_events(self, socket, events):
         if events & POLLERR:
             self._handle_err()
@@ -383,6 +334,142 @@ class ShellSocketChannel(ZMQSocketChannel):
         self.add_io_state(POLLOUT)
 
 
+class ShellSocketChannel(XReqSocketChannel):
+    """The XREQ channel for issues request/replies to the kernel.
+    """
+
+    def execute(self, code, silent=False,
+                user_variables=None, user_expressions=None,
+                accepted_types=None):
+        """Execute code in the kernel.
+
+        Parameters
+        ----------
+        code : str
+            A string of Python code.
+            
+        silent : bool, optional (default False)
+            If set, the kernel will execute the code as quietly possible.
+
+        user_variables : list, optional
+            A list of variable names to pull from the user's namespace.  They
+            will come back as a dict with these names as keys and their
+            :func:`repr` as values.
+            
+        user_expressions : dict, optional
+            A dict with string keys and  to pull from the user's
+            namespace.  They will come back as a dict with these names as keys
+            and their :func:`repr` as values.
+
+        accepted_types : list, optional
+            The MIME types this frontend can display.  If given, the kernel
+            only computes these representations (and text/plain) of the
+            results and displayed objects of this request.
+
+        Returns
+        -------
+        The msg_id of the message sent.
+        """
+        if user_variables is None:
+            user_variables = []
+        if user_expressions is None:
+            user_expressions = {}
+            
+        # Don't waste network traffic if inputs are invalid
+        if not isinstance(code, str):
+            raise ValueError('code %r must be a string' % code)
+        validate_string_list(user_variables)
+        validate_string_dict(user_expressions)
+        if accepted_types is not None:
+            validate_string_list(accepted_types)
+
+        # Create class for content/msg creation. Related to, but possibly
+        # not in Session.
+        content = dict(code=code, silent=silent,
+                       user_variables=user_variables,
+                       user_expressions=user_expressions)
+        if accepted_types is not None:
+            content['accepted_types'] = accepted_types
+        msg = self.session.msg('execute_request', content)
+        self._queue_request(msg)
+        return msg['header']['msg_id']
+
+    def spooled_output(self, msg_id, offset=0, limit=None):
+        """Get the output of an execute request which was suppressed by the
+        kernel's output limits, and saved.
+
+        Parameters
+        ----------
+        msg_id : str
+            The msg_id of the execute request.
+        offset : int, optional
+            The number of characters to skip, e.g. a previous 'next_offset'.
+        limit : int, optional
+            The maximum number of characters in the reply.
+
+        Returns
+        -------
+        The msg_id of the message sent.
+        """
+        content = dict(msg_id=msg_id, offset=offset, limit=limit)
+        msg = self.session.msg('spool_request', content)
+        self._queue_request(msg)
+        return msg['header']['msg_id']
+
+    def shutdown(self, restart=False):
+        """Request an immediate kernel shutdown.
+
+        Upon receipt of the (empty) reply, client code can safely assume that
+        the kernel has shut down and it's safe to forcefully terminate it if
+        it's still alive.
+
+        The kernel will send the reply via a function registered with Python's
+        atexit module, ensuring it's truly done as the kernel is done with all
+        normal operation.
+        """
+        # Send quit message to kernel. Once we implement kernel-side setattr,
+        # this should probably be done that way, but for now this will do.
+        msg = self.session.msg('shutdown_request', {'restart':restart})
+        self._queue_request(msg)
+        return msg['header']['msg_id']
+
+
+class ControlSocketChannel(XReqSocketChannel):
+    """The XREQ channel for the requests served by the kernel's control
+    thread.
+
+    Only the requests which don't change the kernel's state are accepted:
+    :meth:`complete`, :meth:`object_info`, :meth:`history` and
+    :meth:`connect`, plus :meth:`interrupt`.  They are answered right away,
+    even while the kernel is running code.
+    """
+
+    def connect(self):
+        """Request the ports the kernel is listening on.
+
+        Returns
+        -------
+        The msg_id of the message sent.
+        """
+        msg = self.session.msg('connect_request', {})
+        self._queue_request(msg)
+        return msg['header']['msg_id']
+
+    def interrupt(self):
+        """Interrupt the code running in the kernel, as with Ctrl-C.
+
+        Unlike :meth:`KernelManager.interrupt_kernel`, this works for kernels
+        started by another process too.
+
+        Returns
+        -------
+        The msg_id of the message sent.
+        """
+        msg = self.session.msg('interrupt_request', {})
+        self._queue_request(msg)
+        return msg['header']['msg_id']
+
+
 class SubSocketChannel(ZMQSocketChannel):
     """The SUB channel which listens for messages that the kernel publishes.
     """
@@ -676,6 +763,9 @@ class KernelManager(HasTraits):
     
     The REP channel is for the kernel to request stdin (raw_input) from the
     frontend.
+
+    The control channel, which is optional and only started on request, is
+    for the requests the kernel answers while it is busy, e.g. interrupts.
     """
     # config object for passing to child configurables
     config = Instance(Config)
@@ -696,12 +786,14 @@ class KernelManager(HasTraits):
     sub_address = TCPAddress((LOCALHOST, 0))
     stdin_address = TCPAddress((LOCALHOST, 0))
     hb_address = TCPAddress((LOCALHOST, 0))
+    control_address = TCPAddress((LOCALHOST, 0))
 
     # The classes to use for the various channels.
     shell_channel_class = Type(ShellSocketChannel)
     sub_channel_class = Type(SubSocketChannel)
     stdin_channel_class = Type(StdInSocketChannel)
     hb_channel_class = Type(HBSocketChannel)
+    control_channel_class = Type(ControlSocketChannel)
 
     # Protected traits.
     _launch_args = Any
@@ -709,6 +801,7 @@ class KernelManager(HasTraits):
     _sub_channel = Any
     _stdin_channel = Any
     _hb_channel = Any
+    _control_channel = Any
 
     def __init__(self, **kwargs):
         super(KernelManager, self).__init__(**kwargs)
@@ -721,7 +814,8 @@ class KernelManager(HasTraits):
     # Channel management methods:
     #--------------------------------------------------------------------------
 
-    def start_channels(self, shell=True, sub=True, stdin=True, hb=True):
+    def start_channels(self, shell=True, sub=True, stdin=True, hb=True,
+                       control=False):
         """Starts the channels for this kernel.
 
         This will create the channels if they do not exist and then start
@@ -737,6 +831,8 @@ class KernelManager(HasTraits):
             self.stdin_channel.start()
         if hb:
             self.hb_channel.start()
+        if control:
+            self.control_channel.start()
 
     def stop_channels(self):
         """Stops all the running channels for this kernel.
@@ -749,6 +845,9 @@ class KernelManager(HasTraits):
             self.stdin_channel.stop()
         if self.hb_channel.is_alive():
             self.hb_channel.stop()
+        if self._control_channel is not None and \
+                self._control_channel.is_alive():
+            self._control_channel.stop()
 
     @property
     def channels_running(self):
@@ -776,6 +875,7 @@ class KernelManager(HasTraits):
         """
         shell, sub, stdin, hb = self.shell_address, self.sub_address, \
             self.stdin_address, self.hb_address
+        control = self.control_address
         if shell[0] not in LOCAL_IPS or sub[0] not in LOCAL_IPS or \
                 stdin[0] not in LOCAL_IPS or hb[0] not in LOCAL_IPS:
             raise RuntimeError("Can only launch a kernel on a local interface. "
@@ -787,6 +887,11 @@ class KernelManager(HasTraits):
         self._launch_args = kw.copy()
         if kw.pop('ipython', True):
             from .ipkernel import launch_kernel
+            # Only the IPython kernel has a control channel
+            if control[1] <= 0:
+                control = (control[0], select_random_ports(1)[0])
+            self.control_address = control
+            kw['control_port'] = control[1]
         else:
             from .pykernel import launch_kernel
         self.kernel, xrep, pub, req, _hb = launch_kernel(
@@ -974,3 +1079,13 @@ class KernelManager(HasTraits):
                                                        self.session,
                                                        self.hb_address)
         return self._hb_channel
+
+    @property
+    def control_channel(self):
+        """Get the control socket channel object, for the requests the
+        kernel answers while it is busy."""
+        if self._control_channel is None:
+            self._control_channel = self.control_channel_class(self.context,
+                                                         self.session,
+                                                         self.control_address)
+        return self._control_channel
@@ -28,6 +28,7 @@ import zmq
 from IPython.utils.traitlets import HasTraits, Instance, Dict, Float
 from .completer import KernelCompleter
 from .entry_point import base_launch_kernel
+from .iostream import send_on_pub
 from .session import Session, Message
 from .kernelapp import KernelApp
 
@@ -108,7 +109,8 @@ class Kernel(HasTraits):
         except:
             self.log.error("Got bad msg: %s"%Message(parent))
             return
-        pyin_msg = self.session.send(self.iopub_socket, 'pyin',{'code':code}, parent=parent)
+        pyin_msg = send_on_pub(self.session, self.iopub_socket, 'pyin',
+                               {'code':code}, parent=parent)
 
         try:
             comp_code = self.compiler(code, '<zmq-kernel>')
@@ -133,7 +135,8 @@ class Kernel(HasTraits):
                 'ename' : str(etype.__name__),
                 'evalue' : str(evalue)
             }
-            exc_msg = self.session.send(self.iopub_socket, 'pyerr', exc_content, parent)
+            exc_msg = send_on_pub(self.session, self.iopub_socket, 'pyerr',
+                                  exc_content, parent)
             reply_content = exc_content
         else:
             reply_content = { 'status' : 'ok', 'payload' : {} }
@@ -171,8 +174,8 @@ class Kernel(HasTraits):
         content = dict(parent['content'])
         msg = self.session.send(self.shell_socket, 'shutdown_reply',
                                 content, parent, ident)
-        msg = self.session.send(self.iopub_socket, 'shutdown_reply',
-                                content, parent, ident)
+        msg = send_on_pub(self.session, self.iopub_socket, 'shutdown_reply',
+                          content, parent, ident)
         self.log.debug(msg)
         time.sleep(0.1)
         sys.exit(0)
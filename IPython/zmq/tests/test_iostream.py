@@ -0,0 +1,217 @@
+"""Tests for the coalescing OutStream/StreamPublisher"""
+
+#-------------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING, distributed as part of this software.
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+# Imports
+#-------------------------------------------------------------------------------
+
+import os
+import time
+
+import nose.tools as nt
+
+from IPython.utils.tempdir import TemporaryDirectory
+from IPython.zmq.iostream import OutStream, StreamPublisher
+
+#-------------------------------------------------------------------------------
+# Tests
+#-------------------------------------------------------------------------------
+
+class RecordingSession(object):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, socket, msg_type, content=None, parent=None, ident=None):
+        self.sent.append((msg_type, content['name'], content['data'], ident))
+        return {}
+
+
+def make_streams():
+    session = RecordingSession()
+    pub = StreamPublisher(session, object())
+    out = OutStream(session, pub.pub_socket, 'stdout', pub)
+    err = OutStream(session, pub.pub_socket, 'stderr', pub)
+    return session, pub, out, err
+
+
+def test_coalesce_runs():
+    session, pub, out, err = make_streams()
+    for i in range(10):
+        out.write('a')
+    err.write('e')
+    out.write('b')
+    nt.assert_equal(session.sent, [])
+    out.flush()
+    nt.assert_equal(session.sent, [('stream', 'stdout', 'a'*10, None),
+                                   ('stream', 'stderr', 'e', None),
+                                   ('stream', 'stdout', 'b', None)])
+    nt.assert_equal(pub.msg_count, 3)
+
+
+def test_size_flush():
+    session, pub, out, err = make_streams()
+    pub.max_buffer_size = 10
+    out.write('x'*9)
+    nt.assert_equal(session.sent, [])
+    out.write('x')
+    nt.assert_equal(len(session.sent), 1)
+
+
+def test_timer_flushes():
+    session, pub, out, err = make_streams()
+    pub.flush_interval = 0.01
+    out.write('trailing')
+    # No further writes or flushes from this thread, as while a cell runs
+    time.sleep(0.1)
+    nt.assert_equal(session.sent, [('stream', 'stdout', 'trailing', None)])
+    # and again, once the buffer is filled again
+    out.write('more')
+    time.sleep(0.1)
+    nt.assert_equal(session.sent[-1], ('stream', 'stdout', 'more', None))
+
+
+def test_timer_takes_lock():
+    """Other messages on the socket and timer flushes don't overlap"""
+    session, pub, out, err = make_streams()
+    pub.flush_interval = 0.01
+    out.write('a')
+    with pub._lock:
+        time.sleep(0.1)
+        nt.assert_equal(session.sent, [])
+    time.sleep(0.1)
+    nt.assert_equal(session.sent, [('stream', 'stdout', 'a', None)])
+
+
+class StreamStub(object):
+    """Stand-in for the ZMQStream of an engine's PUB socket."""
+    def __init__(self):
+        self.socket = object()
+
+    def send_multipart(self, *args, **kwargs):
+        raise AssertionError("ZMQStream used from the timer thread")
+
+
+def test_timer_zmqstream():
+    """With a ZMQStream, the timer sends on its socket"""
+    sockets = []
+    class Session(RecordingSession):
+        def send(self, socket, *args, **kwargs):
+            sockets.append(socket)
+            return RecordingSession.send(self, socket, *args, **kwargs)
+    session = Session()
+    stream = StreamStub()
+    pub = StreamPublisher.for_socket(session, stream)
+    pub.flush_interval = 0.01
+    out = OutStream(session, stream, 'stdout')
+    nt.assert_true(out.publisher is pub)
+    out.write('trailing')
+    time.sleep(0.1)
+    nt.assert_equal(session.sent, [('stream', 'stdout', 'trailing', None)])
+    nt.assert_equal(sockets, [stream.socket])
+    pub.send('pyin', {'name': None, 'data': 'x = 1'})
+    nt.assert_equal(sockets, [stream.socket, stream.socket])
+
+
+def test_for_socket():
+    session = RecordingSession()
+    socket = object()
+    pub = StreamPublisher.for_socket(session, socket)
+    nt.assert_true(StreamPublisher.for_socket(session, socket) is pub)
+    nt.assert_false(StreamPublisher.for_socket(session, object()) is pub)
+
+
+def test_topics():
+    session, pub, out, err = make_streams()
+    out.topic = 'engine.0.stdout'
+    err.topic = 'engine.0.stderr'
+    out.write('o')
+    err.write('e')
+    pub.flush()
+    nt.assert_equal([s[3] for s in session.sent],
+                    ['engine.0.stdout', 'engine.0.stderr'])
+
+
+def test_total_limit():
+    session, pub, out, err = make_streams()
+    pub.total_limit = 5
+    out.set_parent({'header': {'msg_id': 'a'}})
+    out.write('0123456789')
+    pub.end_request()
+    data = [s[2] for s in session.sent]
+    nt.assert_true(data[0].startswith('01234\n[output limit exceeded'))
+    nt.assert_true('5 characters of output suppressed' in data[1])
+    # the budget is per request
+    out.set_parent({'header': {'msg_id': 'b'}})
+    out.write('abc')
+    pub.flush()
+    nt.assert_equal(session.sent[-1][2], 'abc')
+
+
+def test_spool():
+    with TemporaryDirectory() as td:
+        session, pub, out, err = make_streams()
+        pub.total_limit = 2
+        pub.spool_dir = td
+        out.set_parent({'header': {'msg_id': 'a'}})
+        out.write('abcdef')
+        pub.flush()
+        out.write('gh')
+        pub.end_request()
+        fname = pub.spool_files['a']
+        with open(fname) as f:
+            nt.assert_equal(f.read(), 'cdefgh')
+        nt.assert_true(fname in session.sent[-1][2])
+
+
+def test_rate_limit_markers():
+    session, pub, out, err = make_streams()
+    pub.rate_limit = 4
+    pub._tokens = 4
+    out.set_parent({'header': {'msg_id': 'a'}})
+    out.write('0123456789')
+    pub.flush()
+    # a gap in the output, then the limit is exceeded again
+    pub._tokens = 4
+    out.write('abcdefgh')
+    pub.flush()
+    data = [s[2] for s in session.sent]
+    nt.assert_true(data[0].startswith('0123\n[output limit exceeded'))
+    nt.assert_true(data[1].startswith('abcd\n[output limit exceeded'))
+
+
+def test_budget_new_parent():
+    """Switching parents during a flush closes the previous budget"""
+    session, pub, out, err = make_streams()
+    pub.total_limit = 2
+    out.set_parent({'header': {'msg_id': 'a'}})
+    out.write('abcd')
+    err.set_parent({'header': {'msg_id': 'b'}})
+    err.write('xy')
+    pub.flush()
+    data = [s[2] for s in session.sent]
+    nt.assert_equal(len(data), 3)
+    nt.assert_true('2 characters of output suppressed' in data[1])
+    nt.assert_equal(data[2], 'xy')
+
+
+def test_spool_expiry():
+    with TemporaryDirectory() as td:
+        session, pub, out, err = make_streams()
+        pub.total_limit = 1
+        pub.spool_dir = td
+        pub.max_spool_files = 2
+        for msg_id in 'abc':
+            out.set_parent({'header': {'msg_id': msg_id}})
+            out.write('0123')
+            pub.end_request()
+        nt.assert_equal(list(pub.spool_files), ['b', 'c'])
+        nt.assert_equal(len(os.listdir(td)), 2)
+        nt.assert_equal(pub.read_spool('a'), None)
+        nt.assert_equal(pub.read_spool('c'), '123')
+        nt.assert_equal(pub.read_spool('c', 1, 1), '2')
@@ -38,3 +38,25 @@ def test_execute():
     KM.shell_channel.execute(code='x=1')
     KM.shell_channel.execute(code='print 1')
     
+
+
+def test_complete_during_execute():
+    """The control channel completes while the kernel runs code"""
+    control = KM.control_channel
+    if not control.is_alive():
+        control.start()
+    KM.shell_channel.get_msgs()
+    exec_id = KM.shell_channel.execute(code='import time\n'
+                                            'control_test_var = 1\n'
+                                            'time.sleep(3)\n')
+    # Let the execution start
+    time.sleep(1)
+    msg_id = control.complete('control_test_', 'control_test_', 13)
+    reply = control.get_msg(timeout=2)
+    nt.assert_equal(reply['parent_header']['msg_id'], msg_id)
+    nt.assert_equal(reply['content']['status'], 'ok')
+    nt.assert_equal(reply['content']['matches'], ['control_test_var'])
+    # The execution was still running when the completion was answered
+    nt.assert_false(KM.shell_channel.msg_ready())
+    reply = KM.shell_channel.get_msg(timeout=5)
+    nt.assert_equal(reply['parent_header']['msg_id'], exec_id)
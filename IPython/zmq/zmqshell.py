@@ -34,6 +34,7 @@ from IPython.utils.path import get_py_filename
 from IPython.utils.traitlets import Instance, Type, Dict
 from IPython.utils.warn import warn
 from IPython.zmq.displayhook import ZMQShellDisplayHook, _encode_png
+from IPython.zmq.iostream import send_on_pub
 from IPython.zmq.session import extract_header
 from .session import Session
 
@@ -68,8 +69,8 @@ class ZMQDisplayPublisher(DisplayPublisher):
         _encode_png(data)
         content['data'] = data
         content['metadata'] = metadata
-        self.session.send(
-            self.pub_socket, 'display_data', content,
+        send_on_pub(
+            self.session, self.pub_socket, 'display_data', content,
             parent=self.parent_header
         )
 
@@ -133,7 +134,8 @@ class ZMQInteractiveShell(InteractiveShell):
         dh = self.displayhook
         # Send exception info over pub socket for other clients than the caller
         # to pick up
-        exc_msg = dh.session.send(dh.pub_socket, 'pyerr', exc_content, dh.parent_header)
+        exc_msg = send_on_pub(dh.session, dh.pub_socket, 'pyerr', exc_content,
+                              dh.parent_header)
 
         # FIXME - Hack: store exception info in shell object.  Right now, the
         # caller is reading this info after the fact, we need to fix this logic
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Benchmark tab-completion latency on large objects: attributes of an
+instance of a deep class hierarchy with many members, and of an instance with
+many attributes, and global names in a namespace with many names.  For the
+attributes, also compare dir2() using the per-class cache of members with
+walking the class hierarchy each time.
+
+Usage::
+
+    python bench_completer.py [nnames [nrepeat]]
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import sys
+import time
+
+from IPython.core.interactiveshell import InteractiveShell
+from IPython.utils import dir2
+
+
+def make_deep_class(depth=20, nmembers=100):
+    """Return a class with depth bases, each with nmembers methods."""
+    cls = object
+    for i in range(depth):
+        members = dict(('method_%i_%i' % (i, j), lambda self: None)
+                       for j in range(nmembers))
+        cls = type('Level%i' % i, (cls,), members)
+    return cls
+
+
+def timed(shell, text, nrepeat):
+    """Return the mean time to complete text, and the number of matches."""
+    shell.complete(text)
+    t0 = time.time()
+    for i in range(nrepeat):
+        matches = shell.complete(text)[1]
+    return (time.time() - t0) / nrepeat, len(matches)
+
+
+def timed_dir2(obj, nrepeat):
+    """Return the mean time of dir2(obj), with the class members cached and
+    with the class hierarchy walked each time."""
+    dir2.dir2(obj)
+    t0 = time.time()
+    for i in range(nrepeat):
+        dir2.dir2(obj)
+    cached = (time.time() - t0) / nrepeat
+    cached_class_members = dir2.cached_class_members
+    dir2.cached_class_members = lambda cls: sorted(set(
+                                            dir2.get_class_members(cls)))
+    try:
+        t0 = time.time()
+        for i in range(nrepeat):
+            dir2.dir2(obj)
+        uncached = (time.time() - t0) / nrepeat
+    finally:
+        dir2.cached_class_members = cached_class_members
+    return cached, uncached
+
+
+def main(nnames=100000, nrepeat=20):
+    shell = InteractiveShell.instance()
+    deep = make_deep_class()()
+    wide = make_deep_class(1, 10)()
+    for i in range(nnames // 10):
+        setattr(wide, 'attr_%i' % i, i)
+    shell.user_ns.update(deep=deep, wide=wide)
+    shell.user_ns.update(('name_%i' % i, i) for i in range(nnames))
+
+    for text in ['deep.method_1', 'deep.', 'wide.attr_99', 'wide.',
+                 'name_999', 'name_']:
+        elapsed, nmatches = timed(shell, text, nrepeat)
+        print("%-15s %7i matches %9.2f ms" % (text, nmatches, elapsed * 1000))
+
+    for name, obj in [('deep', deep), ('wide', wide)]:
+        cached, uncached = timed_dir2(obj, nrepeat)
+        print("dir2(%s)       cached %9.2f ms, uncached %9.2f ms" % (name,
+              cached * 1000, uncached * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Benchmark run_cell latency with history enabled, with several processes
+(standing in for kernels) sharing one history.sqlite.
+
+Usage::
+
+    python bench_history.py [nprocs [ncells [journal_mode [synchronous]]]]
+
+e.g. compare ``python bench_history.py 8 500 delete full`` with the default
+``python bench_history.py 8 500 wal normal``.
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from IPython.utils.tempdir import TemporaryDirectory
+
+
+def run_kernel(args):
+    """Run ncells cells in a fresh shell, return the list of latencies."""
+    hist_file, ncells, journal_mode, synchronous = args
+    from IPython.core.history import HistoryManager
+    from IPython.core.interactiveshell import InteractiveShell
+    shell = InteractiveShell.instance()
+    shell.history_manager.end_session()
+    shell.history_manager = HistoryManager(shell=shell, hist_file=hist_file,
+                                           db_journal_mode=journal_mode,
+                                           db_synchronous=synchronous)
+    times = []
+    for i in range(ncells):
+        t0 = time.time()
+        shell.run_cell('x = %i' % i, store_history=True)
+        # %history reads the database, as frontends do
+        if i % 10 == 0:
+            list(shell.history_manager.get_tail(10))
+        times.append(time.time() - t0)
+    shell.history_manager.end_session()
+    return times
+
+
+def percentile(data, p):
+    return data[min(len(data)-1, int(p * len(data)))]
+
+
+def main(nprocs=4, ncells=500, journal_mode='wal', synchronous='normal'):
+    with TemporaryDirectory() as td:
+        hist_file = os.path.join(td, 'history.sqlite')
+        pool = Pool(nprocs)
+        t0 = time.time()
+        results = pool.map(run_kernel, [(hist_file, ncells, journal_mode,
+                                        synchronous)] * nprocs)
+        elapsed = time.time() - t0
+    times = sorted(t for r in results for t in r)
+    print("processes     : %i, %i cells each" % (nprocs, ncells))
+    print("journal mode  : %s, synchronous=%s" % (journal_mode, synchronous))
+    print("wall time     : %.3f s" % elapsed)
+    for p in (0.5, 0.9, 0.99):
+        print("p%-12i: %.3f ms" % (100*p, 1e3*percentile(times, p)))
+    print("max          : %.3f ms" % (1e3*times[-1]))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*[int(a) for a in args[:2]] + args[2:4])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Benchmark pasting large cells: time pushing 5000-line cells line by line
+into an IPythonInputSplitter (as run_cell does), and in one push in cell mode
+(as the Qt console's completeness check does).
+
+Usage::
+
+    python bench_inputsplitter.py [nlines]
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import sys
+import time
+
+from IPython.core.inputsplitter import IPythonInputSplitter
+
+
+def make_cells(nlines):
+    """Return a dict of sample cells of about nlines lines each."""
+    flat = ['x%i = %i * 2' % (i, i) for i in range(nlines)]
+    literal = ['data = {'] + ['    %i: "%i",' % (i, i)
+                              for i in range(nlines-2)] + ['}']
+    function = ['def f(x):'] + ['    x = x + %i' % i
+                                for i in range(nlines-2)] + ['    return x']
+    blocks = []
+    for i in range(nlines // 5):
+        blocks += ['for i in range(%i):' % i,
+                   '    if i % 2:',
+                   '        print(i)',
+                   '    else:',
+                   '        pass']
+    return dict(flat=flat, literal=literal, function=function, blocks=blocks)
+
+
+def main(nlines=5000):
+    for name, lines in sorted(make_cells(nlines).items()):
+        isp = IPythonInputSplitter()
+        t0 = time.time()
+        for line in lines:
+            isp.push(line)
+        isp.push_accepts_more()
+        isp.source_raw_reset()
+        line_time = time.time() - t0
+
+        isp = IPythonInputSplitter(input_mode='cell')
+        t0 = time.time()
+        isp.push('\n'.join(lines))
+        isp.push_accepts_more()
+        cell_time = time.time() - t0
+        print("%-10s %6i lines: line by line %8.3f s, whole cell %8.3f s" %
+              (name, len(lines), line_time, cell_time))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
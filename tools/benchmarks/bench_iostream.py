@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Benchmark the kernel's OutStream: print many short lines and report how
+many 'stream' messages reach the iopub socket.
+
+Usage::
+
+    python bench_iostream.py [nlines]
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import sys
+import time
+
+from IPython.zmq.iostream import OutStream, StreamPublisher
+
+
+class CountingSession(object):
+    """Stand-in for a Session that only records what would be sent."""
+
+    def __init__(self):
+        self.nmsgs = 0
+        self.nbytes = 0
+
+    def send(self, socket, msg_type, content=None, parent=None, ident=None):
+        self.nmsgs += 1
+        self.nbytes += len(content['data'])
+        return {}
+
+
+def main(nlines=1000000):
+    session = CountingSession()
+    publisher = StreamPublisher(session, object())
+    out = OutStream(session, publisher.pub_socket, 'stdout', publisher)
+    err = OutStream(session, publisher.pub_socket, 'stderr', publisher)
+    t0 = time.time()
+    for i in range(nlines):
+        print('line', i, file=out)
+        if i % 1000 == 0:
+            print('warning', i, file=err)
+    out.flush()
+    elapsed = time.time() - t0
+    print("lines written : %i" % nlines)
+    print("messages sent : %i" % session.nmsgs)
+    print("bytes sent    : %i" % session.nbytes)
+    print("elapsed       : %.3f s (%.2f us/line)" % (elapsed, 1e6*elapsed/nlines))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Benchmark the cold start of the terminal shell and of the kernel, with and
+without --deferred-init: each start runs in a new Python process, which is
+timed from its launch until the application is initialized.
+
+The kernel needs pyzmq, and is skipped if it can't be imported.  A temporary
+IPython directory is used, so that the user's configuration doesn't affect
+the timings.
+
+Usage::
+
+    python bench_startup.py [nrepeat]
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Run in the child process: initialize the application, and exit
+terminal_code = """\
+import sys
+from IPython.frontend.terminal.ipapp import TerminalIPythonApp
+app = TerminalIPythonApp.instance()
+app.initialize(sys.argv[1:])
+"""
+
+kernel_code = """\
+import sys
+from IPython.zmq.ipkernel import IPKernelApp
+app = IPKernelApp.instance()
+app.initialize(sys.argv[1:])
+"""
+
+
+def timed(code, args, env, nrepeat):
+    """Return the best and mean times to run code in a new process."""
+    cmd = [sys.executable, '-c', code] + args
+    times = []
+    for i in range(nrepeat):
+        t0 = time.time()
+        subprocess.check_call(cmd, env=env, stdout=subprocess.PIPE)
+        times.append(time.time() - t0)
+    return min(times), sum(times) / nrepeat
+
+
+def main(nrepeat=10):
+    ipython_dir = tempfile.mkdtemp()
+    env = dict(os.environ, IPYTHON_DIR=ipython_dir)
+    try:
+        import zmq
+    except ImportError:
+        print("pyzmq is not available: skipping the kernel.")
+        apps = [('terminal', terminal_code, ['--no-banner'])]
+    else:
+        apps = [('terminal', terminal_code, ['--no-banner']),
+                ('kernel', kernel_code, [])]
+    try:
+        for name, code, args in apps:
+            # The first start creates the profile
+            timed(code, args, env, 1)
+            for flag in ['--no-deferred-init', '--deferred-init']:
+                best, mean = timed(code, args + [flag], env, nrepeat)
+                print("%-8s %-19s best %7.1f ms, mean %7.1f ms" % (name,
+                      flag, best * 1000, mean * 1000))
+    finally:
+        shutil.rmtree(ipython_dir)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
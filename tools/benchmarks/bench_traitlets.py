@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Benchmark the creation of HasTraits objects: small ones with a few traits,
+and Configurables with a deeper class hierarchy and deferred initializers, and
+the notification of trait changes.
+
+Usage::
+
+    python bench_traitlets.py [ninstances]
+"""
+#-----------------------------------------------------------------------------
+#  Copyright (C) 2011  The IPython Development Team
+#
+#  Distributed under the terms of the BSD License.  The full license is in
+#  the file COPYING.txt, distributed as part of this software.
+#-----------------------------------------------------------------------------
+
+import sys
+import time
+
+from IPython.config.configurable import Configurable
+from IPython.utils.traitlets import (HasTraits, Int, Float, Unicode, List,
+                                     Bool, Instance)
+
+
+class Small(HasTraits):
+    a = Int(1)
+    b = Float(2.0)
+    c = Unicode('c')
+
+
+class Base(Configurable):
+    enabled = Bool(True, config=True)
+    size = Int(10, config=True)
+    names = List()
+
+
+class Derived(Base):
+    label = Unicode('derived', config=True)
+    parent = Instance(Base)
+    ratio = Float(0.5)
+
+    def _names_default(self):
+        return ['x', 'y']
+
+    def _size_changed(self, name, old, new):
+        pass
+
+
+def timed(cls, n):
+    """Return the time to create n instances of cls, in seconds."""
+    t0 = time.time()
+    for i in range(n):
+        cls()
+    return time.time() - t0
+
+
+def timed_changes(obj, n):
+    """Return the time to change the size trait of obj n times, in seconds."""
+    t0 = time.time()
+    for i in range(n):
+        obj.size = i
+    return time.time() - t0
+
+
+def main(n=100000):
+    for cls in (Small, Base, Derived):
+        elapsed = timed(cls, n)
+        print("%-8s %i instances: %7.3f s, %6.2f us each" % (cls.__name__, n,
+              elapsed, elapsed / n * 1e6))
+
+    obj = Derived()
+    obj.on_trait_change(lambda name, new: None, 'size')
+    obj.on_trait_change(lambda: None)
+    elapsed = timed_changes(obj, n)
+    print("%-8s %i changes:   %7.3f s, %6.2f us each" % ('notify', n,
+          elapsed, elapsed / n * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])